@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "django.middleware.gzip.GZipMiddleware",  # first, so it compresses the final response body
+    "core.middleware.RequestTimingMiddleware",  # next, so its total covers everything but compression
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,6 +85,74 @@ DATABASES = {
     }
 }
 
+# DuckDB analytics store, opened by core.services.duckdb_connection. DuckDB lets one process
+# at a time open the file, read-only or not, so web workers, the finance_duckdb.py loader and
+# the management commands take turns: a process holding the file closes it while idle as soon
+# as another one waits for it (finance_duckdb.StoreLock).
+DUCKDB_PATH = BASE_DIR / "db" / "finance.duckdb"
+
+DUCKDB_READ_ONLY = False
+
+# Seconds a request waits for another process (e.g. a running load) to close the store before
+# its DuckDB call fails with StoreBusyError
+DUCKDB_LOCK_TIMEOUT = 30
+
+# Users are spread over this many DuckDB files by username hash (core.services.duckdb_shards);
+# with 1 the store is DUCKDB_PATH itself. Load shards with finance_duckdb.py --shards N.
+DUCKDB_SHARDS = 1
+
+# DuckDB statements slower than this go to a rotating JSON-lines log with the
+# DuckDB profile of that run (core.services.slow_queries); None switches it off
+DUCKDB_SLOW_QUERY_MS = 250
+
+DUCKDB_SLOW_QUERY_LOG = BASE_DIR / "logs" / "duckdb_slow_queries.jsonl"
+
+DUCKDB_SLOW_QUERY_LOG_BYTES = 10 * 1024 * 1024
+
+DUCKDB_SLOW_QUERY_LOG_BACKUPS = 5
+
+# Server-Timing header and one JSON log line per request (core.middleware.RequestTimingMiddleware)
+REQUEST_TIMING = True
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.request_timing": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Parquet copy of the analytics data (core.services.parquet_lake), hive-partitioned by user bucket/year/month
+ANALYTICS_LAKE_PATH = BASE_DIR / "db" / "lake"
+
+ANALYTICS_LAKE_BUCKETS = 16
+
+# Copy committed Transaction changes into DuckDB in the background (core.services.transaction_replication)
+DUCKDB_REPLICATE_ON_COMMIT = True
+
+# Rendered chart fragments kept per worker by core.services.chart_cache (LRU)
+CHART_CACHE_MAX_ENTRIES = 512
+
+# Seconds a cached chart fragment is served before it is rendered again
+CHART_CACHE_TTL = 300
+
+# 'json' sends only figure specs drawn by one shared plotly.js; 'inline' embeds plotly.js in every chart
+CHART_OUTPUT_MODE = 'json'
+
+# Most points a chart series shows; longer ranges are summed into quarters or years (core.charts.traces)
+CHART_MAX_POINTS = 24
+
+# Uploads are imported by a local thread pool (core.services.import_jobs); eager runs them in the request
+IMPORT_WORKERS = 2
+
+IMPORT_JOBS_EAGER = False
+
+# An import still pending, or running without progress, after this many seconds lost its worker and is marked failed
+IMPORT_JOB_STALE_AFTER = 15 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
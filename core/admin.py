@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction, Budget, Goal
+from .models import Transaction, Budget, Goal, ImportJob
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -8,4 +8,10 @@ class TransactionAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'category', 'description')
 
 admin.site.register(Budget)
-admin.site.register(Goal)
\ No newline at end of file
+admin.site.register(Goal)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'filename', 'status', 'rows_processed', 'rows_failed', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    exclude = ('rejected_report',)
@@ -1,40 +1,23 @@
+import numpy as np
 import plotly.graph_objects as go
-from plotly.offline import plot
-import pandas as pd
-import duckdb
+from core.charts.rendering import render_figure
+from core.charts.traces import bucket_months, pivot_dense
+from core.services.dashboard_bundle import DashboardBundle, fetch_dashboard_bundle
 
-def generate_budget_vs_actual_chart(username_or_df):
-    """Generate budget vs actual chart - accepts either username or DataFrame"""
+def generate_budget_vs_actual_chart(username_or_df, period=None):
+    """Generate budget vs actual chart - accepts a username (with an optional DateRange), a DashboardBundle or a DataFrame"""
     
     # If a string is passed, fetch data from database
     if isinstance(username_or_df, str):
-        username = username_or_df
-        con = duckdb.connect("db/finance.duckdb")
-        
-        query = """
-        SELECT 
-            ue.month,
-            e.category,
-            SUM(ue.budget_amount) as budget_amount,
-            SUM(ue.actual_amount) as actual_amount
-        FROM user_expenses ue
-        JOIN users u ON ue.user_id = u.id
-        JOIN expenses e ON ue.expenses_id = e.id
-        WHERE u.username = ? AND ue.year = 2025
-        GROUP BY ue.month, e.category
-        ORDER BY ue.month, e.category
-        """
-        
         try:
-            df = con.execute(query, [username]).fetchdf()
-            con.close()
-            
-            if df.empty:
-                return "<div><p>No budget vs actual data available for this user.</p></div>"
-                
+            username_or_df = fetch_dashboard_bundle(username_or_df, period=period)
         except Exception as e:
-            con.close()
             return f"<div><p>Error generating budget vs actual chart: {str(e)}</p></div>"
+
+    if isinstance(username_or_df, DashboardBundle):
+        if not username_or_df.has_expenses:
+            return "<div><p>No budget vs actual data available for this user.</p></div>"
+        df = username_or_df.monthly_category()
     else:
         # DataFrame was passed directly
         df = username_or_df
@@ -46,42 +29,18 @@ def generate_budget_vs_actual_chart(username_or_df):
     if missing_cols:
         return f"<div><p>Missing columns in data: {missing_cols}</p></div>"
 
-    # Group data by month and category
-    grouped = df.groupby(['month', 'category'])[['budget_amount', 'actual_amount']].sum().reset_index()
+    # One pass into dense category x period arrays; every trace is a row of them
+    df, bucket = bucket_months(df)
+    pivot = pivot_dense(df, 'category', 'period', ['budget_amount', 'actual_amount'])
+    budget = pivot.bars('budget_amount', '{series} Budget', group=True, marker_color='lightblue')
+    actual = pivot.bars('actual_amount', '{series} Actual', group=True, marker_color='orange')
 
-    fig = go.Figure()
-    
-    # Get unique categories and months for better organization
-    categories = grouped['category'].unique()
-    months = sorted(grouped['month'].unique())
-    
-    # Create grouped bar chart
-    for category in categories:
-        category_df = grouped[grouped['category'] == category]
-        
-        # Budget bars
-        fig.add_trace(go.Bar(
-            x=[f"{month}" for month in category_df['month']],
-            y=category_df['budget_amount'],
-            name=f'{category.title()} Budget',
-            marker_color='lightblue',
-            offsetgroup=category,
-            legendgroup=category
-        ))
-        
-        # Actual bars
-        fig.add_trace(go.Bar(
-            x=[f"{month}" for month in category_df['month']],
-            y=category_df['actual_amount'],
-            name=f'{category.title()} Actual',
-            marker_color='orange',
-            offsetgroup=category,
-            legendgroup=category
-        ))
+    # Budget and actual bars of a category sit next to each other in the legend
+    fig = go.Figure(data=[trace for pair in zip(budget, actual) for trace in pair])
 
     fig.update_layout(
         barmode='group',
-        xaxis_title='Month',
+        xaxis_title=bucket.title(),
         yaxis_title='Amount (DKK)',
         template='plotly_white',
         height=500,
@@ -95,50 +54,30 @@ def generate_budget_vs_actual_chart(username_or_df):
         )
     )
 
-    return plot(fig, output_type='div')
+    return render_figure(fig)
 
-def generate_monthly_variance_chart(username):
+def generate_monthly_variance_chart(username_or_bundle, period=None):
     """Generate a chart showing budget variance (over/under budget) by month"""
-    con = duckdb.connect("db/finance.duckdb")
-    
-    query = """
-    SELECT 
-        ue.month,
-        e.category,
-        SUM(ue.budget_amount) as budget_amount,
-        SUM(ue.actual_amount) as actual_amount,
-        SUM(ue.actual_amount) - SUM(ue.budget_amount) as variance
-    FROM user_expenses ue
-    JOIN users u ON ue.user_id = u.id
-    JOIN expenses e ON ue.expenses_id = e.id
-    WHERE u.username = ? AND ue.year = 2025
-    GROUP BY ue.month, e.category
-    ORDER BY ue.month, e.category
-    """
     
     try:
-        df = con.execute(query, [username]).fetchdf()
-        con.close()
+        bundle = username_or_bundle
+        if isinstance(bundle, str):
+            bundle = fetch_dashboard_bundle(bundle, period=period)
+
+        df = bundle.monthly_category()
         
         if df.empty:
             return "<div><p>No variance data available.</p></div>"
         
-        fig = go.Figure()
-        
-        categories = df['category'].unique()
+        df, bucket = bucket_months(df)
+        pivot = pivot_dense(df, 'category', 'period', ['budget_amount', 'actual_amount'])
+        pivot.values['variance'] = pivot.values['actual_amount'] - pivot.values['budget_amount']
         
-        for category in categories:
-            category_df = df[df['category'] == category]
-            
-            # Color code: red for over budget, green for under budget
-            colors = ['red' if var > 0 else 'green' for var in category_df['variance']]
-            
-            fig.add_trace(go.Bar(
-                x=[f"{month}" for month in category_df['month']],
-                y=category_df['variance'],
-                name=f'{category.title()}',
-                marker_color=colors
-            ))
+        # Color code: red for over budget, green for under budget
+        fig = go.Figure(data=pivot.bars(
+            'variance', '{series}',
+            color=lambda row: np.where(row > 0, 'red', 'green'),
+        ))
         
         fig.update_layout(
             title={
@@ -147,14 +86,13 @@ def generate_monthly_variance_chart(username):
                 'xanchor': 'center',
                 'font': {'size': 12}
             },
-            xaxis_title='Month',
+            xaxis_title=bucket.title(),
             yaxis_title='Variance (DKK)',
             template='plotly_white',
             height=400
         )
         
-        return plot(fig, output_type='div')
+        return render_figure(fig)
         
     except Exception as e:
-        con.close()
         return f"<div><p>Error generating variance chart: {str(e)}</p></div>"
\ No newline at end of file
@@ -1,53 +1,19 @@
 import plotly.graph_objs as go
-from plotly.offline import plot
-import duckdb
-import pandas as pd
+from core.charts.rendering import render_figure
+from core.charts.traces import cycle_colors
+from core.services.dashboard_bundle import fetch_dashboard_bundle
 
-def generate_sunburst_chart(username):
+def generate_sunburst_chart(username_or_bundle, period=None):
     """Generate a sunburst chart showing expense categories as % of total income"""
-    con = duckdb.connect("db/finance.duckdb")
-    
-    # Get user's total income and expenses by category
-    query = """
-    WITH user_totals AS (
-        SELECT 
-            u.username,
-            SUM(i.income_after_tax + i.additional_income) as total_income,
-            SUM(ue.actual_amount) as total_expenses
-        FROM users u
-        LEFT JOIN income i ON u.id = i.user_id
-        LEFT JOIN user_expenses ue ON u.id = ue.user_id
-        WHERE u.username = ?
-        GROUP BY u.username
-    ),
-    category_expenses AS (
-        SELECT 
-            u.username,
-            e.category,
-            SUM(ue.actual_amount) as category_spent,
-            ut.total_income,
-            ut.total_expenses
-        FROM users u
-        JOIN user_expenses ue ON u.id = ue.user_id
-        JOIN expenses e ON ue.expenses_id = e.id
-        CROSS JOIN user_totals ut
-        WHERE u.username = ? AND ut.username = u.username
-        GROUP BY u.username, e.category, ut.total_income, ut.total_expenses
-    )
-    SELECT 
-        category,
-        category_spent,
-        total_income,
-        total_expenses,
-        ROUND((category_spent / total_income) * 100, 1) as pct_of_income,
-        ROUND((category_spent / total_expenses) * 100, 1) as pct_of_total_expenses
-    FROM category_expenses
-    ORDER BY category_spent DESC
-    """
     
     try:
-        df = con.execute(query, [username, username]).fetchdf()
-        con.close()
+        bundle = username_or_bundle
+        if isinstance(bundle, str):
+            bundle = fetch_dashboard_bundle(bundle, period=period)
+        username = bundle.username
+
+        # Get user's total income and expenses by category
+        df = bundle.category_breakdown().rename(columns={'actual_amount': 'category_spent'})
         
         if df.empty:
             return "<div><p>No expense data available for sunburst chart.</p></div>"
@@ -72,11 +38,10 @@ def generate_sunburst_chart(username):
         
         # Add expense categories under "Expenses"
         category_colors = ['#ff7f0e', '#ffbb78', '#c49c94', '#f7b6d3', '#c7c7c7', '#dbdb8d', '#17becf']
-        for i, row in df.iterrows():
-            labels.append(f"{row['category'].title()}")
-            parents.append('Expenses')
-            values.append(row['category_spent'])
-            colors.append(category_colors[i % len(category_colors)])
+        labels.extend(df['category'].str.title())
+        parents.extend(['Expenses'] * len(df))
+        values.extend(df['category_spent'].tolist())
+        colors.extend(cycle_colors(category_colors, len(df)))
         
         # Create sunburst chart
         fig = go.Figure(go.Sunburst(
@@ -116,46 +81,22 @@ def generate_sunburst_chart(username):
             ]
         )
         
-        return plot(fig, output_type='div')
+        return render_figure(fig)
         
     except Exception as e:
-        con.close()
         return f"<div><p>Error generating sunburst chart: {str(e)}</p></div>"
 
-def generate_detailed_breakdown_table(username):
+def generate_detailed_breakdown_table(username_or_bundle, period=None):
     """Generate a detailed table showing expense breakdown with percentages"""
-    con = duckdb.connect("db/finance.duckdb")
-    
-    query = """
-    WITH user_totals AS (
-        SELECT 
-            u.username,
-            SUM(i.income_after_tax + i.additional_income) as total_income
-        FROM users u
-        LEFT JOIN income i ON u.id = i.user_id
-        WHERE u.username = ?
-        GROUP BY u.username
-    )
-    SELECT 
-        e.category,
-        SUM(ue.budget_amount) as budgeted,
-        SUM(ue.actual_amount) as actual_spent,
-        SUM(ue.actual_amount) - SUM(ue.budget_amount) as variance,
-        ut.total_income,
-        ROUND((SUM(ue.actual_amount) / ut.total_income) * 100, 1) as pct_of_income,
-        ROUND((SUM(ue.budget_amount) / ut.total_income) * 100, 1) as budget_pct_of_income
-    FROM users u
-    JOIN user_expenses ue ON u.id = ue.user_id
-    JOIN expenses e ON ue.expenses_id = e.id
-    CROSS JOIN user_totals ut
-    WHERE u.username = ? AND ut.username = u.username
-    GROUP BY e.category, ut.total_income
-    ORDER BY actual_spent DESC
-    """
     
     try:
-        df = con.execute(query, [username, username]).fetchdf()
-        con.close()
+        bundle = username_or_bundle
+        if isinstance(bundle, str):
+            bundle = fetch_dashboard_bundle(bundle, period=period)
+        username = bundle.username
+
+        df = bundle.category_breakdown().rename(columns={'budget_amount': 'budgeted', 'actual_amount': 'actual_spent'})
+        df['variance'] = df['actual_spent'] - df['budgeted']
         
         if df.empty:
             return "<div><p>No data available for breakdown table.</p></div>"
@@ -200,5 +141,4 @@ def generate_detailed_breakdown_table(username):
         return html
         
     except Exception as e:
-        con.close()
         return f"<div><p>Error generating breakdown table: {str(e)}</p></div>"
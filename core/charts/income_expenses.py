@@ -1,19 +1,32 @@
 import plotly.graph_objs as go
 import pandas as pd
-from core.models import Transaction
+from django.db.models import Q, Sum
+from core.models import MonthlyRollup
 from django.contrib.auth.models import User
+from core.charts.rendering import render_figure
+from core.charts.traces import bucket_months
+from core.services.transaction_summary import month_window
 
-def generate_monthly_income_vs_expense(user: User) -> str:
-    qs = Transaction.objects.filter(user=user)
+def generate_monthly_income_vs_expense(user: User, period=None) -> str:
+    # One row per month and type from the rollup, however many transactions there are
+    window = month_window(period.start, period.end) if period else Q()
+    qs = (
+        MonthlyRollup.objects.filter(window, user=user, type__in=['income', 'expense'])
+        .values('year', 'month', 'type')
+        .annotate(amount=Sum('total'))
+        .order_by('year', 'month')
+    )
 
-    if not qs.exists():
+    rows = list(qs)
+    if not rows:
         return "<p>No data for chart.</p>"
 
-    df = pd.DataFrame(list(qs.values('amount', 'type', 'date')))
-    df['month'] = pd.to_datetime(df['date']).dt.to_period('M').astype(str)
+    df = pd.DataFrame(rows)
+    df['amount'] = df['amount'].astype(float)
+    df, bucket = bucket_months(df)
 
     summary = (
-        df.groupby(['month', 'type'])['amount']
+        df.groupby(['period', 'type'])['amount']
         .sum()
         .unstack(fill_value=0)
         .reset_index()
@@ -21,16 +34,16 @@ def generate_monthly_income_vs_expense(user: User) -> str:
 
     fig = go.Figure()
     if 'income' in summary.columns:
-        fig.add_trace(go.Bar(name='Income', x=summary['month'], y=summary['income']))
+        fig.add_trace(go.Bar(name='Income', x=summary['period'], y=summary['income']))
     if 'expense' in summary.columns:
-        fig.add_trace(go.Bar(name='Expense', x=summary['month'], y=summary['expense']))
+        fig.add_trace(go.Bar(name='Expense', x=summary['period'], y=summary['expense']))
 
     fig.update_layout(
         barmode='group',
         title='Monthly Income vs Expenses',
-        xaxis_title='Month',
+        xaxis_title=bucket.title(),
         yaxis_title='Amount',
         template='plotly_white'
     )
 
-    return fig.to_html(full_html=False)
+    return render_figure(fig)
@@ -0,0 +1,38 @@
+import os
+
+import plotly
+from django.conf import settings
+from plotly.offline import get_plotlyjs_version, plot
+
+from core.services.request_timing import timed_function
+
+PLOTLY_JS_PATH = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+PLOTLY_JS_VERSION = get_plotlyjs_version()
+
+# Same escapes as django.utils.html.json_script, so the spec can't close the <script>
+_JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+def figure_spec(fig):
+    """Compact JSON of a figure (data + layout only, no plotly.js)"""
+    return fig.to_json(pretty=False)
+
+
+@timed_function('render')
+def render_figure(fig, mode=None):
+    """Render a Plotly figure as an HTML fragment.
+
+    ``'json'`` (the default) emits only the figure spec, drawn in the browser by
+    the shared plotly.js loaded once per page (see ``{% plotly_scripts %}``).
+    ``'inline'`` is the old behaviour, embedding the whole plotly.js library.
+    """
+    mode = mode or getattr(settings, 'CHART_OUTPUT_MODE', 'json')
+    if mode == 'inline':
+        return plot(fig, output_type='div')
+
+    spec = figure_spec(fig).translate(_JSON_SCRIPT_ESCAPES)
+    return f'<div class="js-plotly-figure"><script type="application/json">{spec}</script></div>'
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+from django.conf import settings
+
+# Buckets tried from finest to coarsest: (name, sequential index, x label) from year and month columns
+_BUCKETS = [
+    ('month', lambda y, m: y * 12 + m - 1, lambda y, m: y.astype(str) + '-' + m.astype(str).str.zfill(2)),
+    ('quarter', lambda y, m: y * 4 + (m - 1) // 3, lambda y, m: y.astype(str) + '-Q' + ((m - 1) // 3 + 1).astype(str)),
+    ('year', lambda y, m: y, lambda y, m: y.astype(str)),
+]
+
+
+@dataclass
+class DensePivot:
+    """Series values laid out as one dense ``[series, x]`` array per measure"""
+
+    series: np.ndarray  # one entry per trace, e.g. categories
+    x: np.ndarray  # shared x axis, e.g. months
+    values: dict  # measure -> float array of shape (len(series), len(x)), NaN where there are no rows
+
+    @property
+    def x_labels(self):
+        return [f"{x}" for x in self.x]
+
+    def bars(self, measure, name, group=False, color=None, **bar_kwargs):
+        """One ``go.Bar`` per series of ``measure``, named ``name.format(series=<Series>)``.
+
+        ``group`` puts each series in its own offset and legend group, and
+        ``color(row)`` maps a whole row of values to bar colours at once.
+        Empty cells stay NaN, which plotly leaves out, so a series only shows
+        bars where it has data.
+        """
+        x = self.x_labels
+        traces = []
+        for series, row in zip(self.series, self.values[measure]):
+            kwargs = dict(bar_kwargs)
+            if group:
+                kwargs.update(offsetgroup=series, legendgroup=series)
+            if color is not None:
+                kwargs['marker_color'] = color(row)
+            traces.append(go.Bar(x=x, y=row, name=name.format(series=str(series).title()), **kwargs))
+        return traces
+
+
+def bucket_months(df, max_points=None):
+    """``(df with a 'period' label per row, bucket name)`` for the x axis of a monthly series.
+
+    Picks the finest of month, quarter and year whose span fits in
+    ``max_points`` (``CHART_MAX_POINTS`` by default), so a multi-year range
+    is summed server-side into a few dozen bars instead of shipping every
+    month. Frames without a ``year`` column keep their month numbers.
+    """
+    if 'year' not in df.columns:
+        return df.assign(period=df['month']), 'month'
+    if max_points is None:
+        max_points = getattr(settings, 'CHART_MAX_POINTS', 24)
+
+    year, month = df['year'].astype(int), df['month'].astype(int)
+    for name, index, label in _BUCKETS:
+        keys = index(year, month)
+        if df.empty or keys.max() - keys.min() < max_points:
+            break
+    return df.assign(period=label(year, month)), name
+
+
+def pivot_dense(df, series, x, measures):
+    """Sum ``measures`` of ``df`` per (``series``, ``x``) in one pass over the rows.
+
+    Series keep the order they first appear in; x values are sorted. Each
+    measure is accumulated with a single ``np.bincount`` over the flattened
+    (series, x) cell index instead of filtering ``df`` once per series.
+    """
+    series_codes, series_values = pd.factorize(df[series], sort=False)
+    x_codes, x_values = pd.factorize(df[x], sort=True)
+    shape = (len(series_values), len(x_values))
+    cells = series_codes * shape[1] + x_codes
+    size = shape[0] * shape[1]
+
+    present = np.bincount(cells, minlength=size) > 0
+    values = {}
+    for measure in measures:
+        sums = np.bincount(cells, weights=df[measure].to_numpy(dtype=float), minlength=size)
+        values[measure] = np.where(present, sums, np.nan).reshape(shape)
+    return DensePivot(series=np.asarray(series_values), x=np.asarray(x_values), values=values)
+
+
+def cycle_colors(palette, n):
+    """The first ``n`` colours of ``palette`` repeated as often as needed"""
+    return np.take(np.asarray(palette), np.arange(n) % len(palette)).tolist()
@@ -0,0 +1,9 @@
+CREATE TABLE expense_rollup (
+  user_id INTEGER NOT NULL,
+  year INTEGER NOT NULL,
+  month INTEGER NOT NULL,
+  expenses_id INTEGER NOT NULL,
+  budget_amount DECIMAL(18,2) NOT NULL,
+  actual_amount DECIMAL(18,2),
+  row_count BIGINT NOT NULL
+);
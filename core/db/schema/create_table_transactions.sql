@@ -0,0 +1,12 @@
+TABLE transactions (
+  id BIGINT NOT NULL
+  user_id INTEGER NOT NULL
+  username VARCHAR NOT NULL
+  type VARCHAR NOT NULL
+  category VARCHAR NOT NULL
+  amount decimal(12,2) NOT NULL
+  date DATE NOT NULL
+  month integer NOT NULL
+  year integer NOT NULL
+  updated_at TIMESTAMP NOT NULL
+);
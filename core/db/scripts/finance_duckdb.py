@@ -1,273 +1,472 @@
+import argparse
 import duckdb
+import fcntl
+import glob
+import hashlib
 import os
+import time
+import uuid
+import zlib
 
-def setup_database():
-    # Clean start - remove existing database
-    if os.path.exists("db/finance.duckdb"):
-        os.remove("db/finance.duckdb")
-        print("🗑️ Removed existing database")
-
-    os.makedirs('db', exist_ok=True)
-
-    # CSV file paths
-    data_path = 'core/db/data/'
-    expenses_csv = os.path.join(data_path, 'mock_expenses.csv')
-    income_csv = os.path.join(data_path, 'mock_additional_income.csv')
-    goals_csv = os.path.join(data_path, 'mock_goals_income.csv')
-
-    con = duckdb.connect("db/finance.duckdb")
-
-    print("Creating database schema...")
-
-    # 1. CREATE TABLES WITH DATE, MONTH, YEAR COLUMNS
-    
-    # Users table
-    con.execute("""
-        CREATE SEQUENCE user_seq START 1;
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY DEFAULT nextval('user_seq'),
-            username VARCHAR UNIQUE NOT NULL
-        );
-    """)
-
-    # Household lookup table
-    con.execute("""
-        CREATE SEQUENCE household_seq START 1;
-        CREATE TABLE household (
-            id INTEGER PRIMARY KEY DEFAULT nextval('household_seq'),
-            type VARCHAR UNIQUE
-        );
-    """)
-
-    # Goal types lookup table
-    con.execute("""
-        CREATE SEQUENCE goal_seq START 1;
-        CREATE TABLE goal (
-            id INTEGER PRIMARY KEY DEFAULT nextval('goal_seq'),
-            type VARCHAR UNIQUE
-        );
-    """)
-
-    # Expenses categories lookup table
-    con.execute("""
-        CREATE SEQUENCE expenses_seq START 1;
-        CREATE TABLE expenses (
-            id INTEGER PRIMARY KEY DEFAULT nextval('expenses_seq'),
-            category VARCHAR UNIQUE
-        );
-    """)
-
-    # Income table - WITH DATE, MONTH, YEAR
-    con.execute("""
-        CREATE SEQUENCE income_seq START 1;
-        CREATE TABLE income (
-            id INTEGER PRIMARY KEY DEFAULT nextval('income_seq'),
-            user_id INTEGER NOT NULL,
-            date DATE NOT NULL,
-            month INTEGER NOT NULL,
-            year INTEGER NOT NULL,
-            income_after_tax DECIMAL(10,2) NOT NULL,
-            additional_income DECIMAL(10,2) DEFAULT 0,
-            household_id INTEGER,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (household_id) REFERENCES household(id)
-        );
-    """)
-
-    # User expenses table - WITH DATE, MONTH, YEAR
-    con.execute("""
-        CREATE SEQUENCE user_expenses_seq START 1;
-        CREATE TABLE user_expenses (
-            id INTEGER PRIMARY KEY DEFAULT nextval('user_expenses_seq'),
-            user_id INTEGER NOT NULL,
-            expenses_id INTEGER NOT NULL,
-            date DATE NOT NULL,
-            month INTEGER NOT NULL,
-            year INTEGER NOT NULL,
-            budget_amount DECIMAL(10,2) NOT NULL,
-            actual_amount DECIMAL(10,2),
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (expenses_id) REFERENCES expenses(id)
-        );
-    """)
-
-    # Goal progress table - WITH DATE, MONTH, YEAR
-    con.execute("""
-        CREATE SEQUENCE goal_progress_seq START 1;
-        CREATE TABLE goal_progress (
-            id INTEGER PRIMARY KEY DEFAULT nextval('goal_progress_seq'),
-            user_id INTEGER NOT NULL,
-            goal_id INTEGER NOT NULL,
-            goal_target DECIMAL(12,2) NOT NULL,
-            current_amount DECIMAL(12,2) NOT NULL,
-            date DATE NOT NULL,
-            month INTEGER NOT NULL,
-            year INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (goal_id) REFERENCES goal(id)
-        );
-    """)
-
-    print("✅ Database schema created!")
-
-    # 2. POPULATE LOOKUP TABLES
-
-    # Check and load goals CSV to extract data
-    if os.path.exists(goals_csv):
-        # Extract unique household types
-        households = con.execute(f"""
-            SELECT DISTINCT household_type 
-            FROM read_csv_auto('{goals_csv}', HEADER=TRUE)
-        """).fetchall()
-        
-        for household_type, in households:
-            con.execute("INSERT INTO household (type) VALUES (?)", [household_type])
-        
-        # Extract unique goal types
-        goal_types = con.execute(f"""
-            SELECT DISTINCT goal_type 
-            FROM read_csv_auto('{goals_csv}', HEADER=TRUE)
-        """).fetchall()
-        
-        for goal_type, in goal_types:
-            con.execute("INSERT INTO goal (type) VALUES (?)", [goal_type])
-        
-        print("✅ Household and goal types populated")
-
-    # Extract expense categories from expenses CSV
-    if os.path.exists(expenses_csv):
-        expense_categories = con.execute(f"""
-            SELECT DISTINCT expenses_category 
-            FROM read_csv_auto('{expenses_csv}', HEADER=TRUE)
-        """).fetchall()
-        
-        for category, in expense_categories:
-            con.execute("INSERT INTO expenses (category) VALUES (?)", [category])
-        
-        print("✅ Expense categories populated")
-
-    # 3. POPULATE MAIN TABLES
-
-    # Populate users from goals CSV
-    if os.path.exists(goals_csv):
-        users = con.execute(f"""
-            SELECT DISTINCT user 
-            FROM read_csv_auto('{goals_csv}', HEADER=TRUE)
-        """).fetchall()
-        
-        for username, in users:
-            con.execute("INSERT INTO users (username) VALUES (?)", [username])
-        
-        print("✅ Users populated")
-
-        # FIXED: Populate income table - Force date column as VARCHAR first
-        con.execute(f"""
-            INSERT INTO income (user_id, date, month, year, income_after_tax, household_id)
-            SELECT 
-                u.id as user_id,
-                strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE as date,
-                EXTRACT(month FROM strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE) as month,
-                EXTRACT(year FROM strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE) as year,
-                g.income_after_tax,
-                h.id as household_id
-            FROM read_csv_auto('{goals_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) g
-            JOIN users u ON u.username = g.user
-            JOIN household h ON h.type = g.household_type
-        """)
-        print("✅ Income data loaded with date/month/year")
-
-        # FIXED: Populate goal progress
-        con.execute(f"""
-            INSERT INTO goal_progress (user_id, goal_id, goal_target, current_amount, date, month, year)
-            SELECT 
-                u.id as user_id,
-                gl.id as goal_id,
-                g.goal_target,
-                g.goal_current_amount,
-                strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE as date,
-                EXTRACT(month FROM strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE) as month,
-                EXTRACT(year FROM strptime(CAST(g.date AS VARCHAR), '%d/%m/%Y')::DATE) as year
-            FROM read_csv_auto('{goals_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) g
-            JOIN users u ON u.username = g.user
-            JOIN goal gl ON gl.type = g.goal_type
-        """)
-        print("✅ Goal progress loaded with date/month/year")
-
-    # FIXED: Load additional income 
-    if os.path.exists(income_csv):
-        # First, create users from additional income CSV that don't exist
-        con.execute(f"""
-            INSERT INTO users (username)
-            SELECT DISTINCT ai.user
-            FROM read_csv_auto('{income_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) ai
-            WHERE ai.user NOT IN (SELECT username FROM users)
-        """)
-        
-        # Create income records for additional income users
-        con.execute(f"""
-            INSERT INTO income (user_id, date, month, year, income_after_tax, additional_income)
-            SELECT 
-                u.id as user_id,
-                strptime(ai.date, '%d/%m/%Y')::DATE as date,
-                EXTRACT(month FROM strptime(ai.date, '%d/%m/%Y')::DATE) as month,
-                EXTRACT(year FROM strptime(ai.date, '%d/%m/%Y')::DATE) as year,
-                0 as income_after_tax,
-                ai.additional_income
-            FROM read_csv_auto('{income_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) ai
-            JOIN users u ON u.username = ai.user
-            WHERE NOT EXISTS (
-                SELECT 1 FROM income i 
-                WHERE i.user_id = u.id 
-                AND i.date = strptime(ai.date, '%d/%m/%Y')::DATE
+# Mirror of the Django Transaction table, kept up to date by
+# core.services.transaction_replication (not loaded from the CSVs)
+TRANSACTIONS_MIRROR_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id BIGINT NOT NULL,
+        user_id INTEGER NOT NULL,
+        username VARCHAR NOT NULL,
+        type VARCHAR NOT NULL,
+        category VARCHAR NOT NULL,
+        amount DECIMAL(12,2) NOT NULL,
+        date DATE NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS replication_state (
+        name VARCHAR PRIMARY KEY,
+        updated_at TIMESTAMP,
+        last_id BIGINT,
+        synced_at TIMESTAMP
+    );
+"""
+
+SCHEMA = """
+    CREATE SEQUENCE IF NOT EXISTS user_seq START 1;
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY DEFAULT nextval('user_seq'),
+        username VARCHAR UNIQUE NOT NULL
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS household_seq START 1;
+    CREATE TABLE IF NOT EXISTS household (
+        id INTEGER PRIMARY KEY DEFAULT nextval('household_seq'),
+        type VARCHAR UNIQUE
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS goal_seq START 1;
+    CREATE TABLE IF NOT EXISTS goal (
+        id INTEGER PRIMARY KEY DEFAULT nextval('goal_seq'),
+        type VARCHAR UNIQUE
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS expenses_seq START 1;
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY DEFAULT nextval('expenses_seq'),
+        category VARCHAR UNIQUE
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS income_seq START 1;
+    CREATE TABLE IF NOT EXISTS income (
+        id INTEGER PRIMARY KEY DEFAULT nextval('income_seq'),
+        user_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        income_after_tax DECIMAL(10,2) NOT NULL,
+        additional_income DECIMAL(10,2) DEFAULT 0,
+        household_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (household_id) REFERENCES household(id)
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS user_expenses_seq START 1;
+    CREATE TABLE IF NOT EXISTS user_expenses (
+        id INTEGER PRIMARY KEY DEFAULT nextval('user_expenses_seq'),
+        user_id INTEGER NOT NULL,
+        expenses_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        budget_amount DECIMAL(10,2) NOT NULL,
+        actual_amount DECIMAL(10,2),
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (expenses_id) REFERENCES expenses(id)
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS goal_progress_seq START 1;
+    CREATE TABLE IF NOT EXISTS goal_progress (
+        id INTEGER PRIMARY KEY DEFAULT nextval('goal_progress_seq'),
+        user_id INTEGER NOT NULL,
+        goal_id INTEGER NOT NULL,
+        goal_target DECIMAL(12,2) NOT NULL,
+        current_amount DECIMAL(12,2) NOT NULL,
+        date DATE NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (goal_id) REFERENCES goal(id)
+    );
+
+    -- Budget and actual spend per user, month and category, kept in step with
+    -- user_expenses by refresh_expense_rollup; reports read this, not the raw rows
+    CREATE TABLE IF NOT EXISTS expense_rollup (
+        user_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        expenses_id INTEGER NOT NULL,
+        budget_amount DECIMAL(18,2) NOT NULL,
+        actual_amount DECIMAL(18,2),
+        row_count BIGINT NOT NULL
+    );
+
+    -- Natural keys the loader upserts on (also added to databases built before they existed)
+    CREATE UNIQUE INDEX IF NOT EXISTS income_user_date ON income (user_id, date);
+    CREATE UNIQUE INDEX IF NOT EXISTS user_expenses_user_category_date ON user_expenses (user_id, expenses_id, date);
+    CREATE UNIQUE INDEX IF NOT EXISTS goal_progress_user_goal_date ON goal_progress (user_id, goal_id, date);
+
+    -- Input files already loaded, by content
+    CREATE TABLE IF NOT EXISTS load_log (
+        kind VARCHAR NOT NULL,
+        checksum VARCHAR NOT NULL,
+        path VARCHAR NOT NULL,
+        rows BIGINT NOT NULL,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (kind, checksum)
+    );
+"""
+
+# Input kind -> default file pattern inside data_path; many files may match each one
+INPUT_PATTERNS = {
+    'goals': 'mock_goals_income*.csv',
+    'additional_income': 'mock_additional_income*.csv',
+    'expenses': 'mock_expenses*.csv',
+}
+
+# Each file is read and its dates parsed exactly once, into a temp staging table.
+# Rows repeating a natural key keep the last one, as a later file would: file_row
+# is numbered while reading, which DuckDB does in file order.
+STAGE_QUERIES = {
+    'goals': """
+        SELECT
+            "user" as username,
+            strptime(date, '%d/%m/%Y')::DATE as date,
+            household_type,
+            goal_type,
+            goal_target,
+            goal_current_amount,
+            income_after_tax,
+            file_row
+        FROM (SELECT *, row_number() OVER () as file_row FROM read_csv($path, HEADER=TRUE, types={'date': 'VARCHAR'}))
+        QUALIFY row_number() OVER (PARTITION BY "user", date, goal_type ORDER BY file_row DESC) = 1
+    """,
+    'additional_income': """
+        SELECT
+            "user" as username,
+            strptime(date, '%d/%m/%Y')::DATE as date,
+            additional_income,
+            file_row
+        FROM (SELECT *, row_number() OVER () as file_row FROM read_csv($path, HEADER=TRUE, types={'date': 'VARCHAR'}))
+        QUALIFY row_number() OVER (PARTITION BY "user", date ORDER BY file_row DESC) = 1
+    """,
+    'expenses': """
+        SELECT
+            "user" as username,
+            strptime(date, '%d/%m/%Y')::DATE as date,
+            expenses_category as category,
+            budget_amount,
+            actual_amount_spent,
+            file_row
+        FROM (SELECT *, row_number() OVER () as file_row FROM read_csv($path, HEADER=TRUE, types={'date': 'VARCHAR'}))
+        QUALIFY row_number() OVER (PARTITION BY "user", date, expenses_category ORDER BY file_row DESC) = 1
+    """,
+}
+
+# Set-based upserts from the staging table, dimensions first
+UPSERTS = {
+    'goals': [
+        "INSERT INTO users (username) SELECT DISTINCT username FROM stage ON CONFLICT DO NOTHING",
+        "INSERT INTO household (type) SELECT DISTINCT household_type FROM stage ON CONFLICT DO NOTHING",
+        "INSERT INTO goal (type) SELECT DISTINCT goal_type FROM stage ON CONFLICT DO NOTHING",
+        """
+        INSERT INTO income (user_id, date, month, year, income_after_tax, household_id)
+        SELECT u.id, s.date, month(s.date), year(s.date), s.income_after_tax, h.id
+        FROM (SELECT * FROM stage QUALIFY row_number() OVER (PARTITION BY username, date ORDER BY file_row DESC) = 1) s
+        JOIN users u ON u.username = s.username
+        JOIN household h ON h.type = s.household_type
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            income_after_tax = excluded.income_after_tax,
+            household_id = excluded.household_id
+        """,
+        """
+        INSERT INTO goal_progress (user_id, goal_id, goal_target, current_amount, date, month, year)
+        SELECT u.id, gl.id, s.goal_target, s.goal_current_amount, s.date, month(s.date), year(s.date)
+        FROM stage s
+        JOIN users u ON u.username = s.username
+        JOIN goal gl ON gl.type = s.goal_type
+        ON CONFLICT (user_id, goal_id, date) DO UPDATE SET
+            goal_target = excluded.goal_target,
+            current_amount = excluded.current_amount,
+            updated_at = now()
+        """,
+    ],
+    'additional_income': [
+        "INSERT INTO users (username) SELECT DISTINCT username FROM stage ON CONFLICT DO NOTHING",
+        # Months without a goals row get an income row of their own
+        """
+        INSERT INTO income (user_id, date, month, year, income_after_tax, additional_income)
+        SELECT u.id, s.date, month(s.date), year(s.date), 0, s.additional_income
+        FROM stage s
+        JOIN users u ON u.username = s.username
+        ON CONFLICT (user_id, date) DO UPDATE SET additional_income = excluded.additional_income
+        """,
+    ],
+    'expenses': [
+        "INSERT INTO users (username) SELECT DISTINCT username FROM stage ON CONFLICT DO NOTHING",
+        "INSERT INTO expenses (category) SELECT DISTINCT category FROM stage ON CONFLICT DO NOTHING",
+        """
+        INSERT INTO user_expenses (user_id, expenses_id, date, month, year, budget_amount, actual_amount)
+        SELECT u.id, e.id, s.date, month(s.date), year(s.date), s.budget_amount, s.actual_amount_spent
+        FROM stage s
+        JOIN users u ON u.username = s.username
+        JOIN expenses e ON e.category = s.category
+        ON CONFLICT (user_id, expenses_id, date) DO UPDATE SET
+            budget_amount = excluded.budget_amount,
+            actual_amount = excluded.actual_amount
+        """,
+    ],
+}
+
+
+# Recomputes the expense_rollup rows of every (user_id, year, month) in the rollup_keys temp table
+EXPENSE_ROLLUP_REFRESH = [
+    """
+    DELETE FROM expense_rollup r USING rollup_keys k
+    WHERE r.user_id = k.user_id AND r.year = k.year AND r.month = k.month
+    """,
+    """
+    INSERT INTO expense_rollup (user_id, year, month, expenses_id, budget_amount, actual_amount, row_count)
+    SELECT ue.user_id, ue.year, ue.month, ue.expenses_id, SUM(ue.budget_amount), SUM(ue.actual_amount), COUNT(*)
+    FROM user_expenses ue
+    JOIN rollup_keys k USING (user_id, year, month)
+    GROUP BY ue.user_id, ue.year, ue.month, ue.expenses_id
+    """,
+]
+
+# Input kind -> the (user_id, year, month) keys a staged file touches in user_expenses
+ROLLUP_KEYS = {
+    'expenses': "SELECT u.id as user_id, year(s.date) as year, month(s.date) as month "
+                "FROM stage s JOIN users u ON u.username = s.username",
+}
+
+
+def refresh_expense_rollup(con, keys_query, params=None):
+    """Recompute expense_rollup for the (user_id, year, month) rows ``keys_query`` returns.
+
+    Runs inside the caller's transaction, so the rollup never disagrees with
+    user_expenses for readers.
+    """
+    con.execute(
+        f"CREATE OR REPLACE TEMP TABLE rollup_keys AS SELECT DISTINCT user_id, year, month FROM ({keys_query})",
+        params,
+    )
+    for statement in EXPENSE_ROLLUP_REFRESH:
+        con.execute(statement)
+    con.execute("DROP TABLE rollup_keys")
+
+
+def shard_of(username, shards):
+    """Shard holding a user's rows; crc32 is the same in every process and DuckDB version"""
+    return zlib.crc32(username.encode()) % shards
+
+
+def shard_paths(db_path, shards=1):
+    """Database files of a store split into ``shards`` (``finance.shard0.duckdb``, ...)"""
+    db_path = str(db_path)
+    if shards == 1:
+        return [db_path]
+    stem, suffix = os.path.splitext(db_path)
+    return [f"{stem}.shard{i}{suffix}" for i in range(shards)]
+
+
+def epoch_path(db_path):
+    """File that changes whenever a bulk load changes the store at ``db_path``"""
+    return f"{db_path}.epoch"
+
+
+def touch_epoch(db_path):
+    # A fresh token rather than the mtime, which is too coarse on some filesystems
+    with open(epoch_path(db_path), 'w') as f:
+        f.write(uuid.uuid4().hex)
+
+
+class StoreBusyError(duckdb.IOException):
+    """Another process kept the store open for longer than the caller would wait"""
+
+
+class StoreLock:
+    """Hands one DuckDB file from process to process.
+
+    DuckDB lets only one process open a database file, read-only or not. The
+    process that has it open holds an exclusive flock on ``<path>.lock``; a
+    process waiting for it holds a shared flock on ``<path>.wait`` meanwhile,
+    which is how the holder (``others_waiting``) knows to close the file.
+    flocks go away with their process, so a crashed holder never blocks the store.
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, db_path):
+        self.path = str(db_path)
+        self.held = False
+        self._fds = None
+        self._pid = None
+
+    def _descriptors(self):
+        if self._pid != os.getpid():
+            # Descriptors inherited over a fork share their locks with the parent; only drop them
+            for fd in self._fds or ():
+                os.close(fd)
+            self._fds = tuple(os.open(f"{self.path}.{name}", os.O_RDWR | os.O_CREAT, 0o644) for name in ('lock', 'wait'))
+            self._pid = os.getpid()
+            self.held = False
+        return self._fds
+
+    @staticmethod
+    def _try(fd, operation):
+        try:
+            fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def acquire(self, timeout=None):
+        """Wait until no other process has the file open; raises StoreBusyError after ``timeout`` seconds"""
+        lock_fd, wait_fd = self._descriptors()
+        if not self._try(lock_fd, fcntl.LOCK_EX):
+            fcntl.flock(wait_fd, fcntl.LOCK_SH)
+            try:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while not self._try(lock_fd, fcntl.LOCK_EX):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise StoreBusyError(f"{self.path} stayed open in another process for {timeout}s")
+                    time.sleep(self.POLL_SECONDS)
+            finally:
+                fcntl.flock(wait_fd, fcntl.LOCK_UN)
+        self.held = True
+
+    def others_waiting(self):
+        """Whether another process is waiting in ``acquire`` for this file"""
+        wait_fd = self._descriptors()[1]
+        if not self._try(wait_fd, fcntl.LOCK_EX):
+            return True
+        fcntl.flock(wait_fd, fcntl.LOCK_UN)
+        return False
+
+    def release(self):
+        if self.held and self._pid == os.getpid():
+            fcntl.flock(self._fds[0], fcntl.LOCK_UN)
+        self.held = False
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_file(con, kind, path, shard=None):
+    """Load one input file unless its content was loaded before; returns rows staged or None.
+
+    The whole file is applied in one transaction, so readers see either none
+    of it or all of it. With ``shard=(index, shards)`` only the rows of users
+    belonging to that shard are kept.
+    """
+    checksum = file_checksum(path)
+    if con.execute("SELECT 1 FROM load_log WHERE kind = ? AND checksum = ?", [kind, checksum]).fetchone():
+        return None
+
+    con.begin()
+    try:
+        con.execute(f"CREATE OR REPLACE TEMP TABLE stage AS {STAGE_QUERIES[kind]}", {'path': str(path)})
+        if shard is not None:
+            index, shards = shard
+            usernames = [username for username, in con.execute("SELECT DISTINCT username FROM stage").fetchall()]
+            con.execute(
+                "DELETE FROM stage WHERE NOT list_contains(?, username)",
+                [[username for username in usernames if shard_of(username, shards) == index]],
             )
-        """)
-        
-        # Update existing records with additional income
-        con.execute(f"""
-            UPDATE income 
-            SET additional_income = ai.additional_income
-            FROM (
-                SELECT 
-                    u.id as user_id, 
-                    strptime(ai.date, '%d/%m/%Y')::DATE as date,
-                    ai.additional_income
-                FROM read_csv_auto('{income_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) ai
-                JOIN users u ON u.username = ai.user
-            ) ai
-            WHERE income.user_id = ai.user_id 
-            AND income.date = ai.date
-        """)
-        print("✅ Additional income updated with date/month/year")
-
-    # FIXED: Load expenses
-    if os.path.exists(expenses_csv):
-        con.execute(f"""
-            INSERT INTO user_expenses (user_id, expenses_id, date, month, year, budget_amount, actual_amount)
-            SELECT 
-                u.id as user_id,
-                e.id as expenses_id,
-                strptime(ex.date, '%d/%m/%Y')::DATE as date,
-                EXTRACT(month FROM strptime(ex.date, '%d/%m/%Y')::DATE) as month,
-                EXTRACT(year FROM strptime(ex.date, '%d/%m/%Y')::DATE) as year,
-                ex.budget_amount,
-                ex.actual_amount_spent
-            FROM read_csv_auto('{expenses_csv}', HEADER=TRUE, types={{'date': 'VARCHAR'}}) ex
-            JOIN users u ON u.username = ex.user
-            JOIN expenses e ON e.category = ex.expenses_category
-        """)
-        print("✅ Expenses data loaded with date/month/year")
-
-    # 4. VERIFICATION
+        rows = con.execute("SELECT COUNT(*) FROM stage").fetchone()[0]
+        for statement in UPSERTS[kind]:
+            con.execute(statement)
+        if kind in ROLLUP_KEYS:
+            refresh_expense_rollup(con, ROLLUP_KEYS[kind])
+        con.execute("INSERT INTO load_log (kind, checksum, path, rows) VALUES (?, ?, ?, ?)", [kind, checksum, str(path), rows])
+        con.execute("DROP TABLE stage")
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return rows
+
+
+def load_inputs(con, data_path='core/db/data/', patterns=None, shard=None):
+    """Create missing tables and load every new input file; returns {path: rows} of loaded files"""
+    con.execute(SCHEMA)
+    con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+    if not con.execute("SELECT 1 FROM expense_rollup LIMIT 1").fetchone():
+        # Stores loaded before the rollup existed
+        refresh_expense_rollup(con, "SELECT user_id, year, month FROM user_expenses")
+
+    loaded = {}
+    for kind, pattern in (patterns or INPUT_PATTERNS).items():
+        for path in sorted(glob.glob(os.path.join(str(data_path), pattern))):
+            rows = load_file(con, kind, path, shard)
+            if rows is None:
+                print(f"⏭️ {path} already loaded")
+            else:
+                loaded[path] = rows
+                print(f"✅ {path}: {rows} rows loaded")
+    return loaded
+
+
+def setup_database(db_path="db/finance.duckdb", data_path='core/db/data/', patterns=None, shards=1):
+    """Bring the DuckDB store up to date with the input files, without rebuilding it.
+
+    Safe to run repeatedly (e.g. nightly): files whose content is already in
+    load_log are skipped and everything else is upserted on natural keys.
+    ``patterns`` maps input kinds to globs relative to ``data_path``. With
+    ``shards`` > 1 every user's rows go to one of the ``shard_paths`` files.
+    """
+    for index, path in enumerate(shard_paths(db_path, shards)):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Running app processes close the file when they see the loader waiting for it
+        store_lock = StoreLock(path)
+        store_lock.acquire()
+        try:
+            con = duckdb.connect(path)
+
+            print(f"Loading new input files into {path}...")
+            loaded = load_inputs(con, data_path, patterns, shard=(index, shards) if shards > 1 else None)
+            print(f"✅ {len(loaded)} file(s) loaded")
+            if loaded:
+                # Lets running app processes drop charts cached from the old data (core.services.chart_cache)
+                touch_epoch(path)
+            print_summary(con)
+            con.close()
+        finally:
+            store_lock.release()
+
+    print("\n✅ Database setup completed successfully!")
+
+
+def print_summary(con):
+    """Row counts and a few sample aggregates, to eyeball a load"""
     print("\n=== DATABASE VERIFICATION ===")
 
-    tables = ['users', 'household', 'goal', 'expenses', 'income', 'user_expenses', 'goal_progress']
+    tables = [
+        'users', 'household', 'goal', 'expenses', 'income', 'user_expenses', 'expense_rollup', 'goal_progress',
+        'transactions', 'load_log',
+    ]
     for table in tables:
         count = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
         print(f"{table}: {count} rows")
 
-    # 5. SAMPLE QUERIES WITH DATE/MONTH/YEAR
+    # Sample queries with date/month/year
     print("\n=== SAMPLE QUERIES ===")
 
     print("\nMonthly income summary:")
@@ -304,8 +503,13 @@ def setup_database():
     for row in monthly_expenses:
         print(f"  {row[0]}/{row[1]}: {row[2]} transactions, Budget: {row[3]}, Actual: {row[4]}")
 
-    con.close()
-    print("\n✅ Database setup completed successfully!")
 
 if __name__ == "__main__":
-    setup_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load new CSV inputs into the DuckDB store")
+    parser.add_argument('--db-path', default="db/finance.duckdb")
+    parser.add_argument('--data-path', default='core/db/data/')
+    parser.add_argument('--shards', type=int, default=1, help="Split users across this many database files")
+    for kind, pattern in INPUT_PATTERNS.items():
+        parser.add_argument(f"--{kind.replace('_', '-')}", default=pattern, help=f"Glob of {kind} files (default {pattern})")
+    args = parser.parse_args()
+    setup_database(args.db_path, args.data_path, {kind: getattr(args, kind) for kind in INPUT_PATTERNS}, args.shards)
@@ -12,4 +12,7 @@ class TransactionForm(forms.ModelForm):
 
 
 class UploadFileForm(forms.Form):
-    file = forms.FileField()
\ No newline at end of file
+    file = forms.FileField(
+        help_text='Excel (.xlsx) or CSV with columns: type, amount, date, category',
+        widget=forms.ClearableFileInput(attrs={'accept': '.xlsx,.xlsm,.csv'}),
+    )
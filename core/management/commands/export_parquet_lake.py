@@ -0,0 +1,23 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from core.services.parquet_lake import LAKE_DATASETS, export_lake
+
+
+class Command(BaseCommand):
+    help = "Export the DuckDB analytics data as Parquet, partitioned by user bucket, year and month"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rewrite this month (YYYY-MM) and later ones")
+        parser.add_argument('--dataset', action='append', choices=sorted(LAKE_DATASETS), help="Defaults to all")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            match = re.fullmatch(r'(\d{4})-(\d{1,2})', options['since'])
+            if not match or not 1 <= int(match[2]) <= 12:
+                raise CommandError("--since must look like YYYY-MM")
+            since = (int(match[1]), int(match[2]))
+
+        written = export_lake(since=since, datasets=options['dataset'])
+        for name, rows in written.items():
+            self.stdout.write(self.style.SUCCESS(f"Exported {rows} {name} rows"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.services.synthetic_data import generate_synthetic_data, remove_synthetic_data
+
+
+class Command(BaseCommand):
+    help = "Replace the seeded synthetic users and transactions in the Django database and the DuckDB store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--transactions-per-user', type=int, default=100)
+        parser.add_argument('--months', type=int, default=12, help="Months of history, from January 2020")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-replicate', action='store_true', help="Don't copy the transactions into DuckDB")
+        parser.add_argument('--remove', action='store_true', help="Only delete the synthetic data")
+
+    def handle(self, *args, **options):
+        if options['remove']:
+            remove_synthetic_data()
+            self.stdout.write(self.style.SUCCESS("Removed synthetic data"))
+            return
+
+        summary = generate_synthetic_data(
+            options['users'], options['transactions_per_user'], options['months'],
+            seed=options['seed'], replicate=not options['no_replicate'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {summary.users} users, {summary.transactions} transactions "
+            f"and {summary.duckdb_expense_rows} DuckDB expense rows"
+        ))
@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.services.monthly_rollup import rebuild_monthly_rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the MonthlyRollup table from Transaction (backfills and repairs)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild this username's rollup")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+
+        buckets = rebuild_monthly_rollup(user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} monthly rollup rows"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.services.transaction_replication import BATCH_SIZE, prune_replicated, replicate_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy new and changed Transactions into the DuckDB store from the last high-water mark "
+        "(catch-up after downtime). DuckDB allows one writing process, so run it while the site is stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows appended per micro-batch")
+        parser.add_argument('--prune', action='store_true', help="Also drop mirrored rows deleted from Django")
+
+    def handle(self, *args, **options):
+        copied = replicate_transactions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Replicated {copied} transactions to DuckDB"))
+        if options['prune']:
+            pruned = prune_replicated()
+            self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} deleted transactions"))
@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from core.services.benchmarks import SEED, run_benchmark_suite
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time db_query functions, chart generators, the dashboard and uploads at several synthetic data sizes "
+        "and write the results as JSON. Replaces the synthetic data set, so point it at a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=_int_list, default=[10, 100, 1000], help="Comma-separated user counts")
+        parser.add_argument('--transactions-per-user', type=int, default=100)
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--upload-rows', type=_int_list, default=[100, 1000])
+        parser.add_argument('--seed', type=int, default=SEED)
+        parser.add_argument('--duckdb-path', help="Use this DuckDB file instead of settings.DUCKDB_PATH")
+        parser.add_argument('--output', default='benchmark_results.json')
+
+    def handle(self, *args, **options):
+        overrides = {'DUCKDB_PATH': options['duckdb_path']} if options['duckdb_path'] else {}
+        with override_settings(**overrides):
+            report = run_benchmark_suite(
+                options['sizes'],
+                transactions_per_user=options['transactions_per_user'],
+                months=options['months'],
+                repeat=options['repeat'],
+                upload_rows=options['upload_rows'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['results'])} results to {options['output']}"))
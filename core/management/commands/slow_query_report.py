@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services.slow_queries import read_slow_queries, summarize_slow_queries
+
+
+class Command(BaseCommand):
+    help = "Summarize the DuckDB slow-query log: the query shapes that cost the most time in total"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help="Number of fingerprints to show")
+        parser.add_argument('--log', default=None, help="Defaults to settings.DUCKDB_SLOW_QUERY_LOG")
+        parser.add_argument('--profiles', action='store_true', help="Print the slowest run's DuckDB profile")
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.DUCKDB_SLOW_QUERY_LOG
+        summary = summarize_slow_queries(read_slow_queries(path), top=options['top'])
+        if not summary:
+            self.stdout.write(f"No slow queries logged in {path}")
+            return
+
+        for rank, group in enumerate(summary, 1):
+            self.stdout.write(self.style.SUCCESS(
+                f"#{rank} {group['fingerprint_id']}: {group['total_ms']} ms total, {group['count']} runs, "
+                f"mean {group['mean_ms']} ms, max {group['max_ms']} ms"
+            ))
+            if group['callers']:
+                self.stdout.write(f"  called from: {', '.join(group['callers'])}")
+            self.stdout.write(f"  {group['fingerprint'][:500]}")
+            slowest = group['slowest']
+            if options['profiles']:
+                self.stdout.write(slowest['profile'] or f"  no profile: {slowest['profile_error'] or 'not a read'}")
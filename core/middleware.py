@@ -0,0 +1,50 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.services.request_timing import server_timing_header, start_request_timing, stop_request_timing, timed
+
+logger = logging.getLogger('core.request_timing')
+
+
+def _time_orm_query(execute, sql, params, many, context):
+    with timed('orm'):
+        return execute(sql, params, many, context)
+
+
+class RequestTimingMiddleware:
+    """Break each request's time down into ORM, DuckDB, chart code and Plotly rendering.
+
+    The totals go out as a Server-Timing header (shown in the browser's network
+    panel) and as one JSON log line on the ``core.request_timing`` logger.
+    With REQUEST_TIMING off the middleware unloads itself and the hooks stay idle.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_request_timing()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_time_orm_query))
+                response = self.get_response(request)
+        finally:
+            timings = stop_request_timing(token)
+
+        breakdown = timings.as_dict()
+        response['Server-Timing'] = server_timing_header(breakdown)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'timings': breakdown,
+        }))
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:21
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_alter_transaction_household_type_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="transaction",
+            name="date",
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="rows_skipped",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="fingerprint",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_monthly_rollup(apps, schema_editor):
+    Transaction = apps.get_model("core", "Transaction")
+    MonthlyRollup = apps.get_model("core", "MonthlyRollup")
+    buckets = (
+        Transaction.objects.annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+        .values("user_id", "year", "month", "type", "category")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    MonthlyRollup.objects.bulk_create([MonthlyRollup(**bucket) for bucket in buckets], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_transaction_fingerprint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("year", models.PositiveSmallIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                ("type", models.CharField(choices=[("income", "Income"), ("expense", "Expense"), ("saving", "Saving"), ("investment", "Investment"), ("debt", "Debt"), ("loan", "Loan Payment")], max_length=20)),
+                ("category", models.CharField(max_length=50)),
+                ("total", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("user", "year", "month", "type", "category"), name="unique_monthly_rollup")],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_monthlyrollup"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="budget",
+            index=models.Index(fields=["user", "month", "category"], name="budget_user_month_cat_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="goal",
+            index=models.Index(fields=["user", "due_date"], name="goal_user_due_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["user", "date", "type", "amount"], name="tx_user_date_type_amt_idx"),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from datetime import date
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Transaction(models.Model):
     HOUSEHOLD_CHOICES = [
@@ -25,9 +27,18 @@ class Transaction(models.Model):
     category = models.CharField(max_length=50)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(blank=True, null=True)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=date.today)  # not auto_now_add, imports carry their own dates
     is_recurring = models.BooleanField(default=False)
     household_type = models.CharField(max_length=10, choices=HOUSEHOLD_CHOICES, default='single')
+    fingerprint = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # set on imported rows
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # high-water mark for DuckDB replication
+
+    class Meta:
+        indexes = [
+            # Serves both the dashboard's latest transactions (user, ORDER BY date) and the
+            # date-windowed per-type totals, which it covers without reading the table
+            models.Index(fields=['user', 'date', 'type', 'amount'], name='tx_user_date_type_amt_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} | {self.type} | {self.amount:.2f} | {self.category}"
@@ -39,6 +50,11 @@ class Budget(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     month = models.DateField()  # used to tie it to time
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month', 'category'], name='budget_user_month_cat_idx'),
+        ]
+
 class Goal(models.Model):
     
     GOAL_TYPE_CHOICES = [
@@ -59,3 +75,71 @@ class Goal(models.Model):
     current_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     due_date = models.DateField()
     goal_type = models.CharField(max_length=50, choices=GOAL_TYPE_CHOICES)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'due_date'], name='goal_user_due_date_idx'),
+        ]
+
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)  # already imported by an earlier upload
+    error = models.TextField(blank=True)
+    rejected_report = models.TextField(blank=True)  # CSV of the rows that failed validation
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # last progress write while running
+
+    @property
+    def duration_seconds(self):
+        if self.started_at is None:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    def __str__(self):
+        return f"{self.user.username} | {self.filename} | {self.status}"
+
+
+class MonthlyRollup(models.Model):
+    """Per user, month, type and category sum of Transaction amounts, kept up to date incrementally"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    type = models.CharField(max_length=20, choices=Transaction.TYPE_CHOICES)
+    category = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'month', 'type', 'category'], name='unique_monthly_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} | {self.year}-{self.month:02d} | {self.type} | {self.category} | {self.total:.2f}"
+
+
+class ChartDataVersion(models.Model):
+    """Current data version of a user's charts (core.services.chart_cache), shared by every process"""
+
+    # No FK constraint: replication may bump a user whose deletion is still being committed
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, db_constraint=False)
+    version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.user_id} | {self.version}"
@@ -0,0 +1,191 @@
+import io
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass
+
+import django
+import duckdb
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.charts.budget_vs_actual_expenses import generate_budget_vs_actual_chart, generate_monthly_variance_chart
+from core.charts.expenses_breakdown_category import generate_detailed_breakdown_table, generate_sunburst_chart
+from core.charts.income_expenses import generate_monthly_income_vs_expense
+from core.services import db_query
+from core.services.chart_cache import chart_cache
+from core.services.dashboard_bundle import fetch_dashboard_bundle
+from core.services.date_range import ALL_TIME
+from core.services.parquet_lake import export_lake
+from core.services.synthetic_data import START_MONTH, generate_synthetic_data, synthetic_usernames, transaction_frame
+from core.views.charts import DASHBOARD_CHARTS, chart_data_view
+from core.views.dashboard import dashboard_view
+from core.views.upload import upload_excel_view
+
+SEED = 0
+
+
+@dataclass
+class BenchmarkResult:
+    size: int  # synthetic users
+    group: str
+    name: str
+    runs: int
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    max_ms: float
+
+
+def time_call(func, repeat, setup=None):
+    """Wall-clock seconds of ``repeat`` calls; ``setup`` runs untimed before each one"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _cold_caches():
+    chart_cache.clear()
+    cache.clear()
+
+
+def db_query_benchmarks(username):
+    start, end = START_MONTH, START_MONTH.replace(year=START_MONTH.year + 1)
+    return {
+        'fetch_user_summary': db_query.fetch_user_summary,
+        'fetch_monthly_expenses_by_user': lambda: db_query.fetch_monthly_expenses_by_user(username),
+        'fetch_monthly_expenses_all_users': db_query.fetch_monthly_expenses_by_user,
+        'fetch_monthly_income_by_user': lambda: db_query.fetch_monthly_income_by_user(username),
+        'fetch_goal_progress_by_user': lambda: db_query.fetch_goal_progress_by_user(username),
+        'fetch_user_data_for_dashboard': lambda: db_query.fetch_user_data_for_dashboard(username),
+        'fetch_all_users': db_query.fetch_all_users,
+        'fetch_expense_categories': db_query.fetch_expense_categories,
+        'fetch_monthly_expenses_from_lake': lambda: db_query.fetch_monthly_expenses_from_lake(username, start, end),
+        'fetch_transactions_from_lake': lambda: db_query.fetch_transactions_from_lake(username, start, end),
+    }
+
+
+def chart_benchmarks(user):
+    bundle = fetch_dashboard_bundle(user.username, year=None)
+    return {
+        'fetch_dashboard_bundle': lambda: fetch_dashboard_bundle(user.username, year=None),
+        'generate_monthly_income_vs_expense': lambda: generate_monthly_income_vs_expense(user),
+        'generate_budget_vs_actual_chart': lambda: generate_budget_vs_actual_chart(bundle),
+        'generate_monthly_variance_chart': lambda: generate_monthly_variance_chart(bundle),
+        'generate_sunburst_chart': lambda: generate_sunburst_chart(bundle),
+        'generate_detailed_breakdown_table': lambda: generate_detailed_breakdown_table(bundle),
+    }
+
+
+def _get(view, user, path, *args):
+    request = RequestFactory().get(path)
+    request.user = user
+    response = view(request, *args)
+    assert response.status_code == 200, f"{path} returned {response.status_code}"
+    return response
+
+
+def view_benchmarks(user):
+    dashboard = reverse('dashboard')
+
+    def dashboard_with_charts():
+        # What a browser does: the shell, then every chart endpoint
+        _get(dashboard_view, user, dashboard)
+        for name in DASHBOARD_CHARTS:
+            _get(chart_data_view, user, reverse('dashboard_chart', args=[name]), name)
+
+    return {
+        'dashboard_view': lambda: _get(dashboard_view, user, dashboard),
+        'dashboard_view_with_charts': dashboard_with_charts,
+    }
+
+
+def upload_csv(rows, seed=SEED):
+    """A valid upload of ``rows`` synthetic transactions"""
+    df = transaction_frame(np.random.default_rng(seed), [0], rows, months=12).drop(columns='user_id')
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def upload_benchmark(user, rows):
+    content = upload_csv(rows)
+    path = reverse('upload_excel')
+
+    def upload():
+        request = RequestFactory().post(path, {'file': SimpleUploadedFile('benchmark.csv', content)})
+        request.user = user
+        # Imported inside the request and rolled back, so every run starts from the same data
+        with override_settings(IMPORT_JOBS_EAGER=True), transaction.atomic():
+            response = upload_excel_view(request)
+            transaction.set_rollback(True)
+        assert response.status_code == 302, "upload was rejected"
+
+    return upload
+
+
+def _summarize(size, group, name, timings):
+    ms = [t * 1000 for t in timings]
+    return BenchmarkResult(
+        size=size, group=group, name=name, runs=len(ms),
+        min_ms=round(min(ms), 3), median_ms=round(statistics.median(ms), 3),
+        mean_ms=round(statistics.fmean(ms), 3), max_ms=round(max(ms), 3),
+    )
+
+
+def run_benchmark_suite(sizes, transactions_per_user=100, months=12, repeat=5, upload_rows=(100, 1000),
+                        seed=SEED, log=None):
+    """Generate each data size in turn and time every benchmark against it.
+
+    Returns a JSON-serialisable dict with the environment and one entry per
+    (size, benchmark). Synthetic data is left in place from the last size.
+    """
+    results = []
+    for size in sizes:
+        if log:
+            log(f"Generating {size} users x {transactions_per_user} transactions")
+        generate_synthetic_data(size, transactions_per_user, months, seed=seed)
+        export_lake()
+        user = User.objects.get(username=synthetic_usernames(1)[0])
+
+        groups = {
+            'db_query': (db_query_benchmarks(user.username), None),
+            'charts': (chart_benchmarks(user), None),
+            'views': (view_benchmarks(user), _cold_caches),
+            'upload': ({f'upload_excel_view[{rows}]': upload_benchmark(user, rows) for rows in upload_rows}, None),
+        }
+        for group, (benchmarks, setup) in groups.items():
+            for name, func in benchmarks.items():
+                results.append(_summarize(size, group, name, time_call(func, repeat, setup)))
+                if log:
+                    log(f"  {group}.{name}: {results[-1].median_ms} ms")
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'seed': seed,
+            'sizes': list(sizes),
+            'transactions_per_user': transactions_per_user,
+            'months': months,
+            'repeat': repeat,
+            'dashboard_period': str(ALL_TIME),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'django': django.get_version(),
+            'duckdb': duckdb.__version__,
+            'pandas': pd.__version__,
+        },
+        'results': [asdict(result) for result in results],
+    }
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.db.scripts.finance_duckdb import epoch_path, touch_epoch
+from core.models import ChartDataVersion
+
+# Chart generators catch their own exceptions and return this instead of a chart
+ERROR_FRAGMENT_PREFIX = '<div><p>Error'
+
+
+class ChartFragmentCache:
+    """Bounded LRU cache for rendered chart fragments with hit/miss counters.
+
+    Entries older than ``ttl`` seconds (if set) count as misses.
+    """
+
+    def __init__(self, max_entries=512, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                expires_at, value = self._entries[key]
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+            self._stats['misses'] += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl if self.ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_or_render(self, key, render, cacheable=None):
+        """Return the cached fragment for ``key``, rendering and storing it on a miss.
+
+        A rendered value for which ``cacheable(value)`` is false is returned
+        but not stored, so the next request renders again.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = render()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), max_entries=self.max_entries)
+
+
+chart_cache = ChartFragmentCache(
+    getattr(settings, 'CHART_CACHE_MAX_ENTRIES', 512), ttl=getattr(settings, 'CHART_CACHE_TTL', None),
+)
+
+
+def _new_version():
+    # Random rather than a counter, so a version can never be re-issued and
+    # match fragments rendered from older data
+    return uuid.uuid4().hex
+
+
+def get_data_version(user):
+    """Current data version for a user; changes whenever their data changes.
+
+    Kept in the database rather than the cache, which is per process, so a
+    change handled by one worker invalidates the charts of every other one.
+    """
+    user_id = getattr(user, 'pk', user)
+    return ChartDataVersion.objects.get_or_create(user_id=user_id, defaults={'version': _new_version()})[0].version
+
+
+def bump_data_versions(user_ids):
+    """Invalidate every cached chart of ``user_ids`` in one upsert; returns {user_id: new version}"""
+    versions = {int(user_id): _new_version() for user_id in user_ids}
+    if versions:
+        ChartDataVersion.objects.bulk_create(
+            [ChartDataVersion(user_id=user_id, version=version) for user_id, version in versions.items()],
+            update_conflicts=True, unique_fields=['user'], update_fields=['version'],
+        )
+    return versions
+
+
+def bump_data_version(user):
+    """Invalidate every cached chart of a user by moving to a new data version"""
+    user_id = getattr(user, 'pk', user)
+    return bump_data_versions([user_id])[int(user_id)]
+
+
+def _store_paths():
+    # Imported late: duckdb_shards reads settings that tests change per test
+    from core.services.duckdb_shards import store_paths
+    return store_paths()
+
+
+def get_store_epoch():
+    """Marker of the last bulk load into the DuckDB store, shared by every process.
+
+    The loader (core.db.scripts.finance_duckdb) and the synthetic data
+    generator rewrite one epoch file per shard, so fragments rendered before
+    a load stop matching even though no Django model changed.
+    """
+    epoch = []
+    for path in _store_paths():
+        try:
+            with open(epoch_path(path)) as f:
+                epoch.append(f.read())
+        except FileNotFoundError:
+            epoch.append('')
+    return ':'.join(epoch)
+
+
+def bump_store_epoch():
+    """Invalidate every cached chart after a bulk change to the DuckDB store"""
+    for path in _store_paths():
+        if os.path.exists(os.path.dirname(os.path.abspath(path))):
+            touch_epoch(path)
+
+
+def is_error_fragment(value):
+    return isinstance(value, str) and value.startswith(ERROR_FRAGMENT_PREFIX)
+
+
+def cached_chart(name, user, period, render, version=None):
+    """Render a chart through the fragment cache, keyed by user, period, data version and store epoch.
+
+    Error fragments are never cached, so a transient DuckDB failure is retried
+    on the next request.
+    """
+    if version is None:
+        version = get_data_version(user)
+    key = (name, getattr(user, 'pk', user), period, version, get_store_epoch())
+    return chart_cache.get_or_render(key, render, cacheable=lambda value: not is_error_fragment(value))
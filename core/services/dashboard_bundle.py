@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from core.services.date_range import ALL_TIME, DateRange
+from core.services.duckdb_shards import user_cursor
+
+# One scan per fact table (demo CSV data plus the replicated app transactions),
+# returned as a single tagged result set so the dashboard needs exactly one
+# round trip to DuckDB. The date range is repeated in every scan: the plain
+# year BETWEEN is pushed into the table scans (and their min/max zone maps),
+# the month key then trims the partial years at either end.
+BUNDLE_QUERY = """
+WITH target_user AS (
+    SELECT id FROM users WHERE username = $username
+),
+expense_rows AS (
+    -- Monthly per-category totals maintained by the loader (see refresh_expense_rollup)
+    SELECT r.year, r.month, e.category, r.budget_amount, r.actual_amount
+    FROM expense_rollup r
+    JOIN target_user t ON r.user_id = t.id
+    JOIN expenses e ON r.expenses_id = e.id
+    WHERE r.year BETWEEN $first_year AND $last_year
+      AND r.year * 100 + r.month BETWEEN $first AND $last
+    UNION ALL
+    -- Transactions entered in the app, replicated by core.services.transaction_replication
+    SELECT tx.year, tx.month, tx.category, 0, tx.amount
+    FROM transactions tx
+    WHERE tx.username = $username AND tx.type = 'expense'
+      AND tx.year BETWEEN $first_year AND $last_year
+      AND tx.year * 100 + tx.month BETWEEN $first AND $last
+),
+expense_totals AS (
+    SELECT
+        year,
+        month,
+        category,
+        SUM(budget_amount) as budget_amount,
+        SUM(actual_amount) as actual_amount
+    FROM expense_rows
+    GROUP BY year, month, category
+),
+income_rows AS (
+    SELECT i.year, i.month, i.income_after_tax + i.additional_income as income
+    FROM income i
+    JOIN target_user t ON i.user_id = t.id
+    WHERE i.year BETWEEN $first_year AND $last_year
+      AND i.year * 100 + i.month BETWEEN $first AND $last
+    UNION ALL
+    SELECT tx.year, tx.month, tx.amount
+    FROM transactions tx
+    WHERE tx.username = $username AND tx.type = 'income'
+      AND tx.year BETWEEN $first_year AND $last_year
+      AND tx.year * 100 + tx.month BETWEEN $first AND $last
+),
+income_totals AS (
+    SELECT
+        year,
+        month,
+        SUM(income) as income
+    FROM income_rows
+    GROUP BY year, month
+)
+SELECT 'expense' as kind, year, month, category, budget_amount, actual_amount, NULL as income
+FROM expense_totals
+UNION ALL
+SELECT 'income' as kind, year, month, NULL, NULL, NULL, income
+FROM income_totals
+ORDER BY kind, year, month, category
+"""
+
+
+@dataclass
+class DashboardBundle:
+    """Base aggregates for one user and period, shared by every dashboard chart"""
+
+    username: str
+    period: DateRange
+    expenses: pd.DataFrame  # year, month, category, budget_amount, actual_amount
+    income: pd.DataFrame  # year, month, income
+
+    @property
+    def has_expenses(self):
+        return not self.expenses.empty
+
+    def monthly_category(self):
+        """Budget and actual spend per month and category"""
+        return self.expenses[['year', 'month', 'category', 'budget_amount', 'actual_amount']].reset_index(drop=True)
+
+    def category_totals(self):
+        """Budget and actual spend per category, biggest spend first"""
+        totals = (
+            self.expenses.groupby('category', as_index=False)[['budget_amount', 'actual_amount']]
+            .sum()
+            .sort_values('actual_amount', ascending=False, kind='stable')
+        )
+        return totals.reset_index(drop=True)
+
+    def category_breakdown(self):
+        """Budget and spend per category with their shares of income and of all spending.
+
+        Income and expenses are summed separately (each in its own CTE of
+        BUNDLE_QUERY) and only their totals meet here, so no income row ever
+        multiplies expense rows.
+        """
+        df = self.category_totals()
+        total_income, total_expenses = self.total_income(), self.total_expenses()
+        df['total_income'] = total_income
+        df['total_expenses'] = total_expenses
+        df['pct_of_income'] = (df['actual_amount'] / total_income * 100).round(1)
+        df['budget_pct_of_income'] = (df['budget_amount'] / total_income * 100).round(1)
+        df['pct_of_total_expenses'] = (df['actual_amount'] / total_expenses * 100).round(1)
+        return df
+
+    def total_income(self, month=None):
+        income = self.income if month is None else self.income[self.income['month'] == month]
+        return float(income['income'].sum())
+
+    def total_expenses(self, month=None):
+        expenses = self.expenses if month is None else self.expenses[self.expenses['month'] == month]
+        return float(expenses['actual_amount'].sum())
+
+    def month_summary(self, month):
+        income = self.total_income(month)
+        expense = self.total_expenses(month)
+        return {
+            'income': income,
+            'expense': expense,
+            'saving': income - expense,
+            'investment': 0,  # Not available in current data
+        }
+
+
+def bundle_params(username, period):
+    """Named parameters of BUNDLE_QUERY for one user and DateRange"""
+    first, last = period.month_keys()
+    return {'username': username, 'first_year': first // 100, 'last_year': last // 100, 'first': first, 'last': last}
+
+
+def fetch_dashboard_bundle(username, year=None, period=None):
+    """Fetch all base aggregates the dashboard needs for a user in one query.
+
+    ``period`` is a DateRange (whole history when None); ``year`` is a
+    shorthand for that calendar year.
+    """
+    if year is not None:
+        period = DateRange.for_year(year)
+    period = period or ALL_TIME
+    with user_cursor(username) as con:
+        df = con.execute(BUNDLE_QUERY, bundle_params(username, period)).fetchdf()
+
+    expenses = df[df['kind'] == 'expense'][['year', 'month', 'category', 'budget_amount', 'actual_amount']]
+    income = df[df['kind'] == 'income'][['year', 'month', 'income']]
+
+    return DashboardBundle(
+        username=username,
+        period=period,
+        expenses=expenses.astype({'budget_amount': float, 'actual_amount': float}).reset_index(drop=True),
+        income=income.astype({'income': float}).reset_index(drop=True),
+    )
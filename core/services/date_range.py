@@ -0,0 +1,76 @@
+import calendar
+import datetime
+import re
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+_MONTH = re.compile(r'(\d{4})-(\d{2})(?:-(\d{2}))?')
+
+# Stand-ins for an open end, so the range is always a plain BETWEEN that DuckDB can push into its scans
+_FIRST_KEY, _LAST_KEY = 0, 9999_12
+
+
+def _parse(value, end):
+    match = _MONTH.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Dates must look like YYYY-MM or YYYY-MM-DD, not {value!r}")
+    year, month = int(match[1]), int(match[2])
+    if not 1 <= month <= 12:
+        raise ValueError(f"No month {month} in {value!r}")
+    if match[3]:
+        datetime.date(year, month, int(match[3]))  # reject impossible days
+    day = calendar.monthrange(year, month)[1] if end else 1
+    return datetime.date(year, month, day)
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """Inclusive range of whole months; either end may be left open.
+
+    The DuckDB store and MonthlyRollup only know year and month, so days
+    are widened to the month they fall in: ``start`` is always the first
+    and ``end`` the last day of a month.
+    """
+
+    start: datetime.date | None = None
+    end: datetime.date | None = None
+
+    def __post_init__(self):
+        if self.start and self.end and self.start > self.end:
+            raise ValueError(f"Range starts ({self.start}) after it ends ({self.end})")
+
+    @classmethod
+    def for_year(cls, year):
+        return cls(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+
+    @classmethod
+    def from_query(cls, params):
+        """The range in ``start``/``end`` query parameters (YYYY-MM or YYYY-MM-DD); raises ValueError"""
+        start, end = params.get('start') or None, params.get('end') or None
+        return cls(start and _parse(start, end=False), end and _parse(end, end=True))
+
+    def month_keys(self):
+        """``(first, last)`` as ``year * 100 + month``, with open ends as far-off sentinels"""
+        first = self.start.year * 100 + self.start.month if self.start else _FIRST_KEY
+        last = self.end.year * 100 + self.end.month if self.end else _LAST_KEY
+        return first, last
+
+    def query_params(self):
+        """``{start, end}`` as sent by the dashboard's range form; open ends are left out"""
+        params = {}
+        if self.start:
+            params['start'] = self.start.strftime('%Y-%m')
+        if self.end:
+            params['end'] = self.end.strftime('%Y-%m')
+        return params
+
+    def query_string(self):
+        return urlencode(self.query_params())
+
+    def __str__(self):
+        params = self.query_params()
+        return f"{params.get('start', '')}..{params.get('end', '')}"
+
+
+# The whole history; what the dashboard shows when no range is asked for
+ALL_TIME = DateRange()
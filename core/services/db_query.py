@@ -1,11 +1,14 @@
-import duckdb
 import pandas as pd
-from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+from core.services.duckdb_shards import fan_out, merge_frames, shard_count, shard_cursor, shard_manager, user_cursor
+from core.services.parquet_lake import lake_filters, lake_has_data, lake_relation
+from core.services.query_registry import registry
 
+# Rows per Arrow record batch yielded by the stream_* functions
+STREAM_BATCH_ROWS = 65_536
 
-def fetch_user_summary():
-    con = duckdb.connect("db/finance.duckdb")
-    query = """
+USER_SUMMARY_QUERY = """
     SELECT 
         u.username as user,
         i.date,
@@ -23,63 +26,35 @@ def fetch_user_summary():
     LEFT JOIN (
         SELECT 
             user_id,
-            date,
+            year,
+            month,
             SUM(budget_amount) as budget_expenses,
             SUM(actual_amount) as actual_expenses
-        FROM user_expenses
-        GROUP BY user_id, date
-    ) exp ON u.id = exp.user_id AND i.date = exp.date
+        FROM expense_rollup
+        GROUP BY user_id, year, month
+    ) exp ON u.id = exp.user_id AND i.year = exp.year AND i.month = exp.month
     LEFT JOIN goal_progress gp ON u.id = gp.user_id AND i.date = gp.date
     LEFT JOIN goal g ON gp.goal_id = g.id
     WHERE i.date IS NOT NULL
     ORDER BY u.username, i.date
     """
-    df = con.execute(query).fetchdf()
-    con.close()
-
-    # Ensure date column is datetime
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    return df
-
 
-def fetch_monthly_expenses_by_user(username=None):
-    """Fetch monthly expenses breakdown by category for a specific user or all users"""
-    con = duckdb.connect("db/finance.duckdb")
-
-    where_clause = ""
-    if username:
-        where_clause = f"WHERE u.username = '{username}'"
-
-    query = f"""
+MONTHLY_EXPENSES_QUERY = """
     SELECT 
         u.username as user,
-        ue.year,
-        ue.month,
+        r.year,
+        r.month,
         e.category as expenses_category,
-        SUM(ue.budget_amount) as budget_amount,
-        SUM(ue.actual_amount) as actual_amount_spent
-    FROM user_expenses ue
-    JOIN users u ON ue.user_id = u.id
-    JOIN expenses e ON ue.expenses_id = e.id
+        r.budget_amount,
+        r.actual_amount as actual_amount_spent
+    FROM expense_rollup r
+    JOIN users u ON r.user_id = u.id
+    JOIN expenses e ON r.expenses_id = e.id
     {where_clause}
-    GROUP BY u.username, ue.year, ue.month, e.category
-    ORDER BY u.username, ue.year, ue.month, e.category
+    ORDER BY u.username, r.year, r.month, e.category
     """
 
-    df = con.execute(query).fetchdf()
-    con.close()
-    return df
-
-
-def fetch_monthly_income_by_user(username=None):
-    """Fetch monthly income data for a specific user or all users"""
-    con = duckdb.connect("db/finance.duckdb")
-
-    where_clause = ""
-    if username:
-        where_clause = f"WHERE u.username = '{username}'"
-
-    query = f"""
+MONTHLY_INCOME_QUERY = """
     SELECT 
         u.username as user,
         i.year,
@@ -95,23 +70,7 @@ def fetch_monthly_income_by_user(username=None):
     ORDER BY u.username, i.year, i.month, i.date
     """
 
-    df = con.execute(query).fetchdf()
-    con.close()
-
-    # Ensure date column is datetime
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    return df
-
-
-def fetch_goal_progress_by_user(username=None):
-    """Fetch goal progress data for a specific user or all users"""
-    con = duckdb.connect("db/finance.duckdb")
-
-    where_clause = ""
-    if username:
-        where_clause = f"WHERE u.username = '{username}'"
-
-    query = f"""
+GOAL_PROGRESS_QUERY = """
     SELECT 
         u.username as user,
         g.type as goal_type,
@@ -127,19 +86,7 @@ def fetch_goal_progress_by_user(username=None):
     ORDER BY u.username, gp.date
     """
 
-    df = con.execute(query).fetchdf()
-    con.close()
-
-    # Ensure date column is datetime
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    return df
-
-
-def fetch_user_data_for_dashboard(username):
-    """Fetch comprehensive user data for dashboard charts"""
-    con = duckdb.connect("db/finance.duckdb")
-
-    query = """
+USER_DASHBOARD_QUERY = """
     SELECT 
         u.username as user,
         i.date,
@@ -159,20 +106,85 @@ def fetch_user_data_for_dashboard(username):
     LEFT JOIN (
         SELECT 
             user_id,
-            date,
+            year,
+            month,
             SUM(budget_amount) as budget_expenses,
             SUM(actual_amount) as actual_expenses
-        FROM user_expenses
-        GROUP BY user_id, date
-        ) exp ON u.id = exp.user_id AND i.date = exp.date
+        FROM expense_rollup
+        GROUP BY user_id, year, month
+    ) exp ON u.id = exp.user_id AND i.year = exp.year AND i.month = exp.month
     LEFT JOIN goal_progress gp ON u.id = gp.user_id AND i.date = gp.date
     LEFT JOIN goal g ON gp.goal_id = g.id
-    WHERE u.username = ? AND i.date IS NOT NULL
+    WHERE u.username = $1 AND i.date IS NOT NULL
     ORDER BY i.date
     """
 
-    df = con.execute(query, [username]).fetchdf()
-    con.close()
+# Prepared once per cursor and run by name (core.services.query_registry); $1 is the username
+registry.register('user_summary', USER_SUMMARY_QUERY)
+registry.register('monthly_expenses', MONTHLY_EXPENSES_QUERY.format(where_clause=""))
+registry.register('monthly_expenses_for_user', MONTHLY_EXPENSES_QUERY.format(where_clause="WHERE u.username = $1"))
+registry.register('monthly_income', MONTHLY_INCOME_QUERY.format(where_clause=""))
+registry.register('monthly_income_for_user', MONTHLY_INCOME_QUERY.format(where_clause="WHERE u.username = $1"))
+registry.register('goal_progress', GOAL_PROGRESS_QUERY.format(where_clause=""))
+registry.register('goal_progress_for_user', GOAL_PROGRESS_QUERY.format(where_clause="WHERE u.username = $1"))
+registry.register('user_dashboard_data', USER_DASHBOARD_QUERY)
+registry.register('all_users', "SELECT username FROM users ORDER BY username")
+registry.register('expense_categories', "SELECT category FROM expenses ORDER BY category")
+
+
+def _fetch_user_df(name, username):
+    # Each user's rows live on one shard (core.services.duckdb_shards)
+    with user_cursor(username) as con:
+        return registry.execute(con, name, username).fetchdf()
+
+
+def _fetch_all_df(name, sort_by):
+    """Query every shard in parallel and merge in the query's ORDER BY"""
+    return merge_frames(fan_out(lambda con: registry.execute(con, name).fetchdf()), sort_by)
+
+
+def fetch_user_summary():
+    df = _fetch_all_df('user_summary', ['user', 'date'])
+
+    # Ensure date column is datetime
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def fetch_monthly_expenses_by_user(username=None):
+    """Fetch monthly expenses breakdown by category for a specific user or all users"""
+    if username:
+        return _fetch_user_df('monthly_expenses_for_user', username)
+    return _fetch_all_df('monthly_expenses', ['user', 'year', 'month', 'expenses_category'])
+
+
+def fetch_monthly_income_by_user(username=None):
+    """Fetch monthly income data for a specific user or all users"""
+    if username:
+        df = _fetch_user_df('monthly_income_for_user', username)
+    else:
+        df = _fetch_all_df('monthly_income', ['user', 'year', 'month', 'date'])
+
+    # Ensure date column is datetime
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def fetch_goal_progress_by_user(username=None):
+    """Fetch goal progress data for a specific user or all users"""
+    if username:
+        df = _fetch_user_df('goal_progress_for_user', username)
+    else:
+        df = _fetch_all_df('goal_progress', ['user', 'date'])
+
+    # Ensure date column is datetime
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def fetch_user_data_for_dashboard(username):
+    """Fetch comprehensive user data for dashboard charts"""
+    df = _fetch_user_df('user_dashboard_data', username)
 
     # Ensure date column is datetime
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
@@ -181,17 +193,126 @@ def fetch_user_data_for_dashboard(username):
 
 def fetch_all_users():
     """Fetch all users in the database"""
-    con = duckdb.connect("db/finance.duckdb")
-    query = "SELECT username FROM users ORDER BY username"
-    df = con.execute(query).fetchdf()
-    con.close()
-    return df['username'].tolist()
+    return _fetch_all_df('all_users', ['username'])['username'].tolist()
 
 
 def fetch_expense_categories():
     """Fetch all expense categories"""
-    con = duckdb.connect("db/finance.duckdb")
-    query = "SELECT category FROM expenses ORDER BY category"
-    df = con.execute(query).fetchdf()
-    con.close()
-    return df['category'].tolist()
+    # Every shard has the categories its own users spend on
+    categories = _fetch_all_df('expense_categories', ['category'])['category']
+    return categories.drop_duplicates().tolist()
+
+
+def fetch_monthly_expenses_from_lake(username=None, start=None, end=None):
+    """Monthly expenses per category from the Parquet lake (see core.services.parquet_lake)
+
+    Same columns as fetch_monthly_expenses_by_user. Filters on the partition
+    columns, so only the user's bucket and the requested months are read.
+    """
+    if not lake_has_data('user_expenses'):
+        return pd.DataFrame(columns=['user', 'year', 'month', 'expenses_category', 'budget_amount', 'actual_amount_spent'])
+
+    where, params = lake_filters(username, start, end)
+    query = f"""
+    SELECT
+        username as user,
+        year,
+        month,
+        category as expenses_category,
+        SUM(budget_amount) as budget_amount,
+        SUM(actual_amount) as actual_amount_spent
+    FROM {lake_relation('user_expenses')}
+    {where}
+    GROUP BY username, year, month, category
+    ORDER BY username, year, month, category
+    """
+
+    # Parquet files are read the same from any shard's connection
+    with shard_cursor(0) as con:
+        df = con.execute(query, params).fetchdf()
+    return df
+
+
+def fetch_transactions_from_lake(username=None, start=None, end=None):
+    """Replicated app transactions from the Parquet lake, oldest first"""
+    if not lake_has_data('transactions'):
+        return pd.DataFrame(columns=['user', 'date', 'type', 'category', 'amount'])
+
+    where, params = lake_filters(username, start, end)
+    query = f"""
+    SELECT username as user, date, type, category, amount
+    FROM {lake_relation('transactions')}
+    {where}
+    ORDER BY username, date, id
+    """
+
+    # Parquet files are read the same from any shard's connection
+    with shard_cursor(0) as con:
+        df = con.execute(query, params).fetchdf()
+
+    # Ensure date column is datetime
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def stream_query(query, params=None, batch_rows=STREAM_BATCH_ROWS):
+    """Yield the result of ``query`` as Arrow record batches of at most ``batch_rows`` rows.
+
+    DuckDB produces the batches as they are read, so only one batch is held
+    in Python at a time. Sorts still run to completion first, but DuckDB
+    spills them to disk beyond its memory limit. Shards are read one after
+    another, so the ORDER BY holds within each shard; a user never spans
+    shards, so per-user grouping (iter_user_tables) is unaffected.
+    """
+    for shard in range(shard_count()):
+        with shard_manager(shard).dedicated_cursor() as con:
+            reader = con.execute(query, params).to_arrow_reader(batch_rows)
+            yield from reader
+
+
+def stream_user_summary(batch_rows=STREAM_BATCH_ROWS):
+    """fetch_user_summary() for every user as record batches, ordered by user and date within each shard"""
+    return stream_query(registry.sql('user_summary'), batch_rows=batch_rows)
+
+
+def stream_monthly_expenses(batch_rows=STREAM_BATCH_ROWS):
+    """fetch_monthly_expenses_by_user() for every user as record batches"""
+    return stream_query(registry.sql('monthly_expenses'), batch_rows=batch_rows)
+
+
+def stream_monthly_income(batch_rows=STREAM_BATCH_ROWS):
+    """fetch_monthly_income_by_user() for every user as record batches"""
+    return stream_query(registry.sql('monthly_income'), batch_rows=batch_rows)
+
+
+def stream_goal_progress(batch_rows=STREAM_BATCH_ROWS):
+    """fetch_goal_progress_by_user() for every user as record batches"""
+    return stream_query(registry.sql('goal_progress'), batch_rows=batch_rows)
+
+
+def iter_user_tables(batches, column='user'):
+    """Regroup batches ordered by ``column`` into one ``(user, pyarrow.Table)`` per user.
+
+    The tables are zero-copy slices of the batches, and only the current
+    user's rows are held back, so a consumer can work through the whole
+    population one user at a time:
+
+        for user, table in iter_user_tables(stream_monthly_expenses()):
+            frame = table.to_pandas()
+    """
+    current, pending = None, []
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        users = batch.column(column)
+        boundaries = pc.indices_nonzero(pc.not_equal(users.slice(1), users.slice(0, len(users) - 1)))
+        starts = [0] + [i + 1 for i in boundaries.to_pylist()] + [batch.num_rows]
+        for start, stop in zip(starts, starts[1:]):
+            user = users[start].as_py()
+            if pending and user != current:
+                yield current, pa.Table.from_batches(pending)
+                pending = []
+            current = user
+            pending.append(batch.slice(start, stop - start))
+    if pending:
+        yield current, pa.Table.from_batches(pending)
@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from core.db.scripts.finance_duckdb import StoreLock
+from core.services.request_timing import current_timings, timed
+from core.services.slow_queries import get_slow_query_log
+
+
+class TimedCursor:
+    """Proxy adding a cursor's queries and fetches to the request's 'duckdb' time.
+
+    With a ``slow_log``, statements passed to ``execute`` that take longer than
+    its threshold are also written to the slow-query log.
+    """
+
+    TIMED_METHODS = frozenset({
+        'execute', 'executemany', 'append', 'fetchone', 'fetchall', 'fetchmany', 'fetchdf', 'df',
+        'fetchnumpy', 'fetch_arrow_table', 'arrow', 'fetch_record_batch', 'to_arrow_reader',
+    })
+
+    def __init__(self, cursor, slow_log=None):
+        self._cursor = cursor
+        self._slow_log = slow_log
+
+    @property
+    def raw_cursor(self):
+        return self._cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name not in self.TIMED_METHODS:
+            return attr
+
+        slow_log = self._slow_log if name == 'execute' else None
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            with timed('duckdb'):
+                result = attr(*args, **kwargs)
+            if slow_log is not None:
+                elapsed = time.perf_counter() - started
+                if elapsed >= slow_log.threshold:
+                    sql = args[0] if args else kwargs['query']
+                    params = args[1] if len(args) > 1 else kwargs.get('parameters')
+                    slow_log.record(self._cursor, sql, params, elapsed)
+            # execute() returns the cursor itself; keep chained fetches timed
+            return self if result is self._cursor else result
+        return call
+
+
+class DuckDBConnectionManager:
+    """Process-wide DuckDB connection that hands out one cursor per thread.
+
+    The database file is opened on first use (and re-opened after a fork).
+    Each thread gets its own cursor from ``con.cursor()``, which DuckDB
+    documents as the safe way to share one database between threads.
+
+    DuckDB lets only one process open the file, so the manager takes turns
+    with other processes (web workers, the loader, management commands)
+    through a ``StoreLock``. While no cursor is in use it closes the file as
+    soon as another process waits for it, and reopens it on the next use,
+    waiting up to ``lock_timeout`` seconds for the other process to finish.
+    """
+
+    def __init__(self, path, read_only=False, lock_timeout=None, handoff_poll=0.1):
+        self.path = str(path)
+        self.read_only = read_only
+        self.lock_timeout = lock_timeout
+        self.handoff_poll = handoff_poll
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._store_lock = StoreLock(self.path)
+        self._con = None
+        self._pid = None
+        self._active = 0  # cursors checked out in this process
+        self._watching = None
+        self._generation = 0
+        self._stats = {'opens': 0, 'cursors': 0, 'reuses': 0, 'handoffs': 0}
+
+    def connection(self):
+        """Return the shared connection, opening the database on first use."""
+        if self._con is None or self._pid != os.getpid():
+            with self._lock:
+                if self._con is None or self._pid != os.getpid():
+                    if not self.read_only:
+                        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    self._store_lock.acquire(self.lock_timeout)
+                    try:
+                        self._con = duckdb.connect(self.path, read_only=self.read_only)
+                    except Exception:
+                        self._store_lock.release()
+                        raise
+                    self._pid = os.getpid()
+                    self._generation += 1
+                    self._stats['opens'] += 1
+                    self._watching = threading.Event()
+                    threading.Thread(
+                        target=self._watch, args=(self._watching,), name='duckdb-handoff', daemon=True,
+                    ).start()
+        return self._con
+
+    def _watch(self, stop):
+        # Hands the file over while this process sits idle with it open
+        while not stop.wait(self.handoff_poll):
+            with self._lock:
+                if not stop.is_set() and self._active == 0 and self._store_lock.others_waiting():
+                    self._release()
+
+    def _release(self, handoff=True):
+        """Close the file, by default for another process; callers hold ``_lock``"""
+        if self._con is not None and self._pid == os.getpid():
+            self._con.close()  # closes every thread's cursor with it
+            self._store_lock.release()
+            self._stats['handoffs'] += handoff
+        self._con = None
+        self._pid = None
+        self._generation += 1
+        if self._watching is not None:
+            self._watching.set()
+            self._watching = None
+
+    def _checkout(self):
+        with self._lock:
+            if self._active == 0 and self._con is not None and self._pid == os.getpid() \
+                    and self._store_lock.others_waiting():
+                self._release()
+            self._active += 1
+
+    def _checkin(self):
+        with self._lock:
+            self._active -= 1
+
+    def _thread_cursor(self):
+        con = self.connection()
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.cursor = con.cursor()
+            local.generation = self._generation
+            with self._lock:
+                self._stats['cursors'] += 1
+        else:
+            with self._lock:
+                self._stats['reuses'] += 1
+        return local.cursor
+
+    def _instrument(self, cursor):
+        # Only proxied while a request is being timed or slow queries are logged,
+        # so with both off callers get the bare cursor
+        slow_log = get_slow_query_log()
+        if slow_log is None and current_timings() is None:
+            return cursor
+        if slow_log is not None:
+            slow_log.profile(cursor)
+        return TimedCursor(cursor, slow_log)
+
+    @contextmanager
+    def cursor(self):
+        """Yield the calling thread's cursor on the shared database."""
+        self._checkout()
+        try:
+            yield self._instrument(self._thread_cursor())
+        finally:
+            self._checkin()
+
+    @contextmanager
+    def dedicated_cursor(self):
+        """Yield a new cursor for a result that is read lazily, closed afterwards.
+
+        A streamed result is dropped as soon as another query runs on its
+        cursor, so it cannot live on the thread's shared one.
+        """
+        self._checkout()
+        try:
+            cursor = self.connection().cursor()
+            try:
+                yield self._instrument(cursor)
+            finally:
+                cursor.close()
+        finally:
+            self._checkin()
+
+    def close(self):
+        with self._lock:
+            self._release(handoff=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, path=self.path)
+
+
+_managers = {}  # database path -> manager
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager(path=None):
+    """Return the process-wide manager for ``path``, by default ``settings.DUCKDB_PATH``."""
+    path = str(path or settings.DUCKDB_PATH)
+    manager = _managers.get(path)
+    if manager is None:
+        with _manager_lock:
+            manager = _managers.get(path)
+            if manager is None:
+                manager = _managers[path] = DuckDBConnectionManager(
+                    path,
+                    read_only=getattr(settings, 'DUCKDB_READ_ONLY', False),
+                    lock_timeout=getattr(settings, 'DUCKDB_LOCK_TIMEOUT', 30),
+                )
+    return manager
+
+
+def duckdb_cursor(path=None):
+    """Shortcut for ``get_connection_manager(path).cursor()``."""
+    return get_connection_manager(path).cursor()
+
+
+def reset_connection_manager():
+    """Close every shared connection so the next caller re-reads the settings."""
+    with _manager_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(sender, setting, **kwargs):
+    if setting in ('DUCKDB_PATH', 'DUCKDB_READ_ONLY', 'DUCKDB_SHARDS', 'DUCKDB_LOCK_TIMEOUT'):
+        reset_connection_manager()
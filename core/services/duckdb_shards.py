@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+import pandas as pd
+from django.conf import settings
+
+from core.db.scripts.finance_duckdb import shard_of, shard_paths
+from core.services.duckdb_connection import get_connection_manager
+from core.services.request_timing import timed
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shard_count():
+    return getattr(settings, 'DUCKDB_SHARDS', 1)
+
+
+def store_paths():
+    """Database file of every shard, in shard order"""
+    return shard_paths(settings.DUCKDB_PATH, shard_count())
+
+
+def shard_for(username):
+    return shard_of(username, shard_count())
+
+
+def shard_manager(shard):
+    return get_connection_manager(store_paths()[shard])
+
+
+def shard_cursor(shard):
+    """The calling thread's cursor on one shard"""
+    return shard_manager(shard).cursor()
+
+
+def user_cursor(username):
+    """The calling thread's cursor on the shard holding ``username``"""
+    return shard_cursor(shard_for(username))
+
+
+@contextmanager
+def all_shard_cursors():
+    """Yield one cursor per shard, in shard order"""
+    with ExitStack() as stack:
+        yield [stack.enter_context(shard_cursor(shard)) for shard in range(shard_count())]
+
+
+def split_by_shard(df, column='username'):
+    """{shard: rows of ``df`` whose ``column`` belongs to it}; every shard gets a (maybe empty) frame"""
+    shards = shard_count()
+    if shards == 1:
+        return {0: df}
+    owner = df[column].map(lambda username: shard_of(username, shards))
+    return {shard: df[owner == shard] for shard in range(shards)}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=shard_count(), thread_name_prefix='duckdb-shard')
+    return _executor
+
+
+def _run_on_shard(func, shard):
+    with shard_cursor(shard) as con:
+        return func(con)
+
+
+def fan_out(func):
+    """``func(cursor)`` on every shard in parallel; returns the results in shard order.
+
+    DuckDB releases the GIL while a query runs, so shards really do work at
+    the same time. Request timing is per thread, so the whole fan-out counts
+    as one 'duckdb' section of the calling request.
+    """
+    shards = shard_count()
+    if shards == 1:
+        return [_run_on_shard(func, 0)]
+    with timed('duckdb'):
+        return list(_get_executor().map(lambda shard: _run_on_shard(func, shard), range(shards)))
+
+
+def merge_frames(frames, sort_by):
+    """One frame from per-shard results, in the order a single store would return"""
+    if len(frames) == 1:
+        return frames[0]
+    non_empty = [df for df in frames if not df.empty]
+    if not non_empty:
+        return frames[0]
+    merged = pd.concat(non_empty, ignore_index=True)
+    return merged.sort_values(sort_by, kind='stable').reset_index(drop=True)
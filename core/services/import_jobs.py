@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import ImportJob
+from core.services.transaction_import import import_upload
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-local worker pool for imports; no external broker needed"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMPORT_WORKERS', 2),
+                    thread_name_prefix='import-job',
+                )
+    return _executor
+
+
+def fail_if_stale(job):
+    """Mark ``job`` failed once it has sat for IMPORT_JOB_STALE_AFTER without progress.
+
+    Jobs run in a process-local pool, so a worker process that exits takes
+    its queued and running jobs with it and nothing else would ever finish
+    them. A running job is stale when its heartbeat stops; a pending one when
+    it was created that long ago and never started.
+    Returns the job as it is stored now.
+    """
+    if job.status not in ('pending', 'running'):
+        return job
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'IMPORT_JOB_STALE_AFTER', 15 * 60))
+    stale = Q(status='running', heartbeat_at__lt=cutoff) | Q(status='pending', created_at__lt=cutoff)
+    ImportJob.objects.filter(stale, pk=job.pk).update(
+        status='failed', error='The import stopped before finishing; its worker has exited', finished_at=now,
+    )
+    job.refresh_from_db()
+    return job
+
+
+def _spool_upload(uploaded_file):
+    # The request's upload is gone once the response is sent, so keep a copy
+    suffix = os.path.splitext(uploaded_file.name or '')[1]
+    with tempfile.NamedTemporaryFile(prefix='import-', suffix=suffix, delete=False) as spool:
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, spool)
+        return spool.name
+
+
+def run_import_job(job_id, path):
+    """Import a spooled upload and record the outcome on its ImportJob"""
+    now = timezone.now()
+    # A job that waited so long in the queue that fail_if_stale gave up on it stays failed
+    claimed = ImportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now,
+    )
+    job = ImportJob.objects.select_related('user').get(pk=job_id)
+    if not claimed:
+        os.remove(path)
+        return job
+
+    def progress(rows_processed, rows_failed):
+        # Runs in each batch's transaction, so pollers in any process see the counts with the rows
+        ImportJob.objects.filter(pk=job_id).update(
+            rows_processed=rows_processed, rows_failed=rows_failed, heartbeat_at=timezone.now(),
+        )
+
+    try:
+        with open(path, 'rb') as upload:
+            result = import_upload(job.user, upload, progress=progress)
+        job.status = 'done'
+        job.rows_processed = result.created + result.rejected_count + result.skipped
+        job.rows_failed = result.rejected_count
+        job.rows_skipped = result.skipped
+        job.rejected_report = result.rejected_csv
+    except Exception as e:
+        # Keep the counts of the batches that were committed before the failure
+        job.refresh_from_db(fields=['rows_processed', 'rows_failed'])
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        job.save()
+        os.remove(path)
+    return job
+
+
+def _run_in_worker(job_id, path):
+    close_old_connections()
+    try:
+        run_import_job(job_id, path)
+    finally:
+        # Pool threads outlive the job, so don't leave their DB connections open
+        connections.close_all()
+
+
+def submit_import_job(user, uploaded_file):
+    """Queue an upload for import and return its ImportJob straight away"""
+    path = _spool_upload(uploaded_file)
+    job = ImportJob.objects.create(user=user, filename=os.path.basename(uploaded_file.name or 'upload'))
+
+    if getattr(settings, 'IMPORT_JOBS_EAGER', False):
+        run_import_job(job.pk, path)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.pk, path))
+    return job
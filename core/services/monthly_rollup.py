@@ -0,0 +1,116 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import pandas as pd
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from core.models import MonthlyRollup, Transaction
+
+KEY_FIELDS = ('user_id', 'year', 'month', 'type', 'category')
+
+
+def rollup_key(user_id, tx_date, tx_type, category):
+    return (user_id, tx_date.year, tx_date.month, tx_type, category)
+
+
+def apply_rollup_deltas(deltas):
+    """Add ``{key: (amount, count)}`` deltas to the rollup, one UPDATE per key.
+
+    Keys are ``(user_id, year, month, type, category)``; buckets are created on
+    first use and dropped once their count reaches zero.
+    """
+    for key, (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+        lookup = dict(zip(KEY_FIELDS, key))
+        bucket = MonthlyRollup.objects.filter(**lookup)
+        updated = bucket.update(total=F('total') + amount, count=F('count') + count)
+        if not updated and count > 0:
+            try:
+                with transaction.atomic():
+                    MonthlyRollup.objects.create(total=amount, count=count, **lookup)
+            except IntegrityError:
+                # Another writer created the bucket first
+                bucket.update(total=F('total') + amount, count=F('count') + count)
+        if count < 0:
+            bucket.filter(count__lte=0).delete()
+
+
+def deltas_for_frame(user, valid):
+    """Rollup deltas for a batch of validated import rows (see transaction_import)"""
+    if valid.empty:
+        return {}
+    dates = pd.to_datetime(valid['date'])
+    grouped = (
+        valid.assign(year=dates.dt.year, month=dates.dt.month)
+        .groupby(['year', 'month', 'type', 'category'])['amount']
+        .agg(['sum', 'count'])
+    )
+    return {
+        (user.pk, int(year), int(month), tx_type, category): (Decimal(f'{total:.2f}'), int(count))
+        for (year, month, tx_type, category), total, count
+        in zip(grouped.index, grouped['sum'], grouped['count'])
+    }
+
+
+def record_transaction_change(previous, current):
+    """Move one Transaction between buckets; either side may be None (create/delete)"""
+    deltas = defaultdict(lambda: (Decimal('0'), 0))
+    if previous is not None:
+        key, amount = previous
+        total, count = deltas[key]
+        deltas[key] = (total - amount, count - 1)
+    if current is not None:
+        key, amount = current
+        total, count = deltas[key]
+        deltas[key] = (total + amount, count + 1)
+    apply_rollup_deltas(dict(deltas))
+
+
+def rollup_buckets(transactions):
+    """``transactions`` summed per rollup key, as dicts of MonthlyRollup fields"""
+    return (
+        transactions
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values(*KEY_FIELDS)
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def insert_monthly_rollup(transactions):
+    """Sum ``transactions`` into new rollup rows with one INSERT ... SELECT; returns rows written.
+
+    The sums never leave the database, so this suits bulk loads of users
+    that have no rollup yet.
+    """
+    select, params = rollup_buckets(transactions).query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(map(quote, [*KEY_FIELDS, 'total', 'count']))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(MonthlyRollup._meta.db_table)} ({columns}) SELECT {columns} FROM ({select}) buckets",
+            params,
+        )
+        return cursor.rowcount
+
+
+def rebuild_monthly_rollup(user=None):
+    """Recompute the rollup from Transaction, for one user or everybody (backfills, repairs)"""
+    transactions = Transaction.objects.all()
+    rollups = MonthlyRollup.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    buckets = rollup_buckets(transactions)
+    with transaction.atomic():
+        rollups.delete()
+        created = MonthlyRollup.objects.bulk_create(
+            (MonthlyRollup(**bucket) for bucket in buckets.iterator()),
+            batch_size=1000,
+        )
+    return len(created)
@@ -0,0 +1,176 @@
+import glob
+import os
+import re
+import shutil
+import uuid
+import zlib
+
+import pandas as pd
+from django.conf import settings
+
+from core.db.scripts.finance_duckdb import TRANSACTIONS_MIRROR_SCHEMA
+from core.services.duckdb_shards import all_shard_cursors
+
+# Dataset name -> query over the DuckDB store; every row needs username, date, year and month.
+# Rows are written sorted by username, so row-group statistics also prune by user.
+LAKE_DATASETS = {
+    'user_expenses': """
+        SELECT u.username, e.category, ue.date, ue.budget_amount, ue.actual_amount, ue.year, ue.month
+        FROM user_expenses ue
+        JOIN users u ON ue.user_id = u.id
+        JOIN expenses e ON ue.expenses_id = e.id
+    """,
+    'transactions': """
+        SELECT id, username, type, category, amount, date, updated_at, year, month
+        FROM transactions
+    """,
+}
+
+PARTITION_DIR = re.compile(r'year=(\d+)[\\/]month=(\d+)$')
+
+
+def lake_path():
+    return str(settings.ANALYTICS_LAKE_PATH)
+
+
+def user_bucket(username):
+    """Stable bucket of a username; the same in every process and DuckDB version"""
+    return zlib.crc32(username.encode()) % settings.ANALYTICS_LAKE_BUCKETS
+
+
+def _quote(path):
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def lake_has_data(dataset):
+    return bool(glob.glob(os.path.join(lake_path(), dataset, '**', '*.parquet'), recursive=True))
+
+
+def lake_relation(dataset):
+    """SQL table expression reading a dataset with its hive partition columns"""
+    if dataset not in LAKE_DATASETS:
+        raise ValueError(f"Unknown lake dataset {dataset!r}")
+    files = os.path.join(lake_path(), dataset, '**', '*.parquet')
+    return f"read_parquet({_quote(files)}, hive_partitioning = true)"
+
+
+def lake_filters(username=None, start=None, end=None):
+    """WHERE clause and parameters on the partition columns, so DuckDB skips other files.
+
+    ``start``/``end`` are inclusive dates; only their year and month are used.
+    """
+    clauses, params = [], []
+    if username:
+        clauses += ['user_bucket = ?', 'username = ?']
+        params += [user_bucket(username), username]
+    if start is not None:
+        clauses.append('year * 100 + month >= ?')
+        params.append(start.year * 100 + start.month)
+    if end is not None:
+        clauses.append('year * 100 + month <= ?')
+        params.append(end.year * 100 + end.month)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params
+
+
+def _swap_in(staging, target):
+    """Put the freshly written ``staging`` directory where ``target`` is.
+
+    Both are renames within the lake, so readers only lose the dataset for
+    the instant between them instead of for the whole export.
+    """
+    retired = f"{target}.old-{uuid.uuid4().hex}"
+    if os.path.exists(target):
+        os.rename(target, retired)
+    os.rename(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def _swap_in_months(staging, target, since):
+    """Replace the months of ``target`` from ``since`` on with those written to ``staging``.
+
+    Each month directory is swapped in on its own, so readers keep seeing
+    the old files of a month until its new ones are complete. Months that no
+    longer have rows are removed, so no stale files survive a re-export.
+    """
+    fresh = set()
+    for path in glob.glob(os.path.join(staging, 'user_bucket=*', 'year=*', 'month=*')):
+        partition = os.path.relpath(path, staging)
+        os.makedirs(os.path.dirname(os.path.join(target, partition)), exist_ok=True)
+        _swap_in(path, os.path.join(target, partition))
+        fresh.add(partition)
+    for path in glob.glob(os.path.join(target, 'user_bucket=*', 'year=*', 'month=*')):
+        match = PARTITION_DIR.search(path)
+        if match and (int(match[1]), int(match[2])) >= since and os.path.relpath(path, target) not in fresh:
+            shutil.rmtree(path)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def _export_shard(con, query, target, where, params, shard):
+    usernames = [username for username, in con.execute(f"SELECT DISTINCT username FROM ({query})").fetchall()]
+    buckets = pd.DataFrame({
+        'username': pd.Series(usernames, dtype=object),
+        'user_bucket': pd.Series([user_bucket(u) for u in usernames], dtype='int64'),
+    })
+    con.register('lake_user_buckets', buckets)
+    try:
+        # Shards write into the same partition directories under their own file names
+        return con.execute(f"""
+            COPY (
+                SELECT src.*, b.user_bucket
+                FROM ({query}) src
+                JOIN lake_user_buckets b USING (username)
+                {where}
+                ORDER BY src.username, src.date
+            ) TO {_quote(target)} (
+                FORMAT parquet,
+                PARTITION_BY (user_bucket, year, month),
+                COMPRESSION zstd,
+                FILENAME_PATTERN 'data_{shard}_{{i}}',
+                OVERWRITE_OR_IGNORE
+            )
+        """, params).fetchone()[0]
+    finally:
+        con.unregister('lake_user_buckets')
+
+
+def export_lake(since=None, datasets=None):
+    """Write datasets as ZSTD Parquet, hive-partitioned by user_bucket/year/month.
+
+    Every export is written into a staging directory next to the dataset
+    first. Without ``since`` the staging directory then replaces the whole
+    dataset. With a ``(year, month)`` only that month and later ones are
+    rewritten, and each is swapped in month by month; older months are
+    immutable and their files are left alone. A failed export leaves the
+    dataset as it was. Every DuckDB shard is exported into the same lake.
+    Returns rows written per dataset.
+    """
+    root = lake_path()
+    os.makedirs(root, exist_ok=True)
+    written = {}
+
+    with all_shard_cursors() as cursors:
+        for name in datasets or LAKE_DATASETS:
+            query = LAKE_DATASETS[name]
+            target = os.path.join(root, name)
+            where, params = '', []
+            if since is not None:
+                where = 'WHERE src.year * 100 + src.month >= ?'
+                params = [since[0] * 100 + since[1]]
+            # Readers glob '<dataset>/**', so the staging directory is invisible to them
+            staging = f"{target}.staging-{uuid.uuid4().hex}"
+
+            written[name] = 0
+            try:
+                for shard, con in enumerate(cursors):
+                    con.execute(TRANSACTIONS_MIRROR_SCHEMA)  # nothing may have been replicated yet
+                    written[name] += _export_shard(con, query, staging, where, params, shard)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            if since is not None:
+                _swap_in_months(staging, target, since)
+            else:
+                os.makedirs(staging, exist_ok=True)  # an empty dataset still replaces the old one
+                _swap_in(staging, target)
+    return written
@@ -0,0 +1,111 @@
+import datetime
+import re
+import threading
+import time
+import weakref
+from decimal import Decimal
+
+_NAME = re.compile(r'[a-z_][a-z0-9_]*')
+_EXECUTE = re.compile(r'\s*EXECUTE\s+([a-z_][a-z0-9_]*)\b', re.IGNORECASE)
+
+
+def sql_literal(value):
+    """``value`` as a DuckDB constant for EXECUTE, which takes no ``?`` parameters.
+
+    Strings are quoted with ``'`` doubled; DuckDB has no backslash escapes,
+    so the value can never end the literal early.
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return f"'{value!r}'::DOUBLE"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, datetime.datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, datetime.date):
+        return f"DATE '{value.isoformat()}'"
+    raise TypeError(f"Cannot bind {type(value).__name__} to a prepared query")
+
+
+class QueryRegistry:
+    """Named DuckDB queries with ``$1, $2, ...`` parameters, prepared once per cursor.
+
+    ``execute`` PREPAREs a query the first time a cursor runs it and then
+    only sends ``EXECUTE name(...)``, so DuckDB parses and plans each query
+    once per connection instead of once per call. Calls, prepares and time
+    spent are counted per query (see ``stats``).
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._prepared = weakref.WeakKeyDictionary()  # raw DuckDB cursor -> names prepared on it
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, sql):
+        if not _NAME.fullmatch(name):
+            raise ValueError(f"Query names must be lowercase identifiers, not {name!r}")
+        if name in self._queries and self._queries[name] != sql:
+            raise ValueError(f"A different query is already registered as {name!r}")
+        self._queries[name] = sql
+        self._stats.setdefault(name, {'calls': 0, 'prepares': 0, 'seconds': 0.0})
+        return name
+
+    def sql(self, name):
+        return self._queries[name]
+
+    def resolve(self, statement):
+        """``(name, sql)`` of the registered query an ``EXECUTE name(...)`` statement runs, or None"""
+        match = _EXECUTE.match(statement)
+        if match and match[1].lower() in self._queries:
+            return match[1].lower(), self._queries[match[1].lower()]
+        return None
+
+    def execute(self, con, name, *params):
+        """Run query ``name`` on ``con`` and return the cursor, like ``con.execute``"""
+        sql = self._queries[name]
+        raw = getattr(con, 'raw_cursor', con)  # unwrap the request-timing proxy
+        started = time.perf_counter()
+        with self._lock:
+            prepared = self._prepared.setdefault(raw, set())
+        prepare = name not in prepared
+        if prepare:
+            con.execute(f"PREPARE {name} AS {sql}")
+            prepared.add(name)
+        args = f"({', '.join(sql_literal(p) for p in params)})" if params else ''
+        result = con.execute(f"EXECUTE {name}{args}")
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            entry = self._stats[name]
+            entry['calls'] += 1
+            entry['prepares'] += prepare
+            entry['seconds'] += elapsed
+        return result
+
+    def stats(self):
+        """{name: {'calls', 'prepares', 'total_ms', 'mean_ms'}}; time excludes fetching the rows"""
+        with self._lock:
+            return {
+                name: {
+                    'calls': entry['calls'],
+                    'prepares': entry['prepares'],
+                    'total_ms': round(entry['seconds'] * 1000, 3),
+                    'mean_ms': round(entry['seconds'] * 1000 / entry['calls'], 3) if entry['calls'] else 0.0,
+                }
+                for name, entry in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            for entry in self._stats.values():
+                entry.update(calls=0, prepares=0, seconds=0.0)
+
+
+# Process-wide registry; queries are registered where they are used (see core.services.db_query)
+registry = QueryRegistry()
@@ -0,0 +1,95 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+_current = ContextVar('request_timing', default=None)
+_inactive = nullcontext()
+
+
+class RequestTimings:
+    """Time spent per category during one request.
+
+    Sections nest, and each category only gets its own time: a DuckDB query
+    inside a chart generator counts as 'duckdb', not also as 'charts'.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = {}  # category -> [seconds, calls]
+        self._stack = []  # child seconds of each open section
+
+    @contextmanager
+    def section(self, category):
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            entry = self.totals.setdefault(category, [0.0, 0])
+            entry[0] += elapsed - children
+            entry[1] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """{category: {'ms', 'calls'}} plus 'total' and the untracked remainder as 'other'"""
+        total = self.elapsed()
+        breakdown = {
+            category: {'ms': round(seconds * 1000, 2), 'calls': calls}
+            for category, (seconds, calls) in self.totals.items()
+        }
+        tracked = sum(seconds for seconds, _ in self.totals.values())
+        breakdown['other'] = {'ms': round(max(total - tracked, 0) * 1000, 2), 'calls': 0}
+        breakdown['total'] = {'ms': round(total * 1000, 2), 'calls': 0}
+        return breakdown
+
+
+def current_timings():
+    return _current.get()
+
+
+def start_request_timing():
+    """Begin collecting for the current request; returns a token for stop_request_timing"""
+    return _current.set(RequestTimings())
+
+
+def stop_request_timing(token):
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def timed(category):
+    """Context manager adding its body's time to ``category``; free when nothing is collecting"""
+    timings = _current.get()
+    if timings is None:
+        return _inactive
+    return timings.section(category)
+
+
+def timed_function(category):
+    """Decorator form of ``timed``"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(breakdown):
+    """Server-Timing value, e.g. ``duckdb;dur=12.5;desc="3 calls", total;dur=40.1``"""
+    metrics = []
+    for category, entry in breakdown.items():
+        metric = f"{category};dur={entry['ms']}"
+        if entry['calls']:
+            metric += f';desc="{entry["calls"]} calls"'
+        metrics.append(metric)
+    return ', '.join(metrics)
@@ -0,0 +1,198 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import weakref
+from logging.handlers import RotatingFileHandler
+
+import duckdb
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_IGNORED_FRAMES = (
+    'core/services/slow_queries.py', 'core/services/duckdb_connection.py', 'core/services/query_registry.py',
+)
+
+
+def fingerprint(sql):
+    """SQL with comments dropped, literals replaced by ``?`` and whitespace collapsed.
+
+    Queries that differ only in their values (e.g. the username in a WHERE
+    clause) share a fingerprint, so they add up in the summary.
+    """
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _LISTS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint_id(fingerprint_sql):
+    return hashlib.sha1(fingerprint_sql.encode()).hexdigest()[:12]
+
+
+def _caller():
+    """module:function of the first public function outside the DuckDB plumbing"""
+    frame = sys._getframe(2)
+    while frame and (frame.f_code.co_filename.replace(os.sep, '/').endswith(_IGNORED_FRAMES)
+                     or frame.f_code.co_name.startswith('_')):
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return f"{frame.f_globals.get('__name__')}:{frame.f_code.co_name}"
+
+
+class SlowQueryLog:
+    """JSON-lines log of DuckDB statements slower than ``threshold_ms``.
+
+    Cursors handed out while the log is on keep DuckDB's profiler running
+    without output (``enable_profiling = 'no_output'``), so a slow statement
+    is logged with the profile of the run that was slow; nothing is executed
+    twice. The file rotates at ``max_bytes`` and keeps ``backups`` old
+    copies, so it can stay switched on in production.
+    """
+
+    def __init__(self, path, threshold_ms, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = str(path)
+        self.threshold = threshold_ms / 1000
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._handler = None
+        self._lock = threading.Lock()
+        self._profiled = weakref.WeakSet()  # raw DuckDB cursors with the profiler on
+
+    def _write(self, line):
+        with self._lock:
+            if self._handler is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._handler = RotatingFileHandler(
+                    self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8',
+                )
+            self._handler.emit(logging.makeLogRecord({'msg': line}))
+
+    def profile(self, cursor):
+        """Turn the profiler on for ``cursor``, once per cursor"""
+        with self._lock:
+            if cursor in self._profiled:
+                return
+            self._profiled.add(cursor)
+        cursor.execute("PRAGMA enable_profiling = 'no_output'")
+
+    def record(self, cursor, sql, params, seconds):
+        """Log one slow statement with the profile DuckDB kept of its run"""
+        profile = profile_error = None
+        try:
+            profile = cursor.get_profiling_information(format='query_tree')
+        except duckdb.Error as exc:
+            profile_error = str(exc)
+
+        normalized = fingerprint(sql)
+        self._write(json.dumps({
+            'at': timezone.now().isoformat(),
+            'ms': round(seconds * 1000, 2),
+            'fingerprint_id': fingerprint_id(normalized),
+            'fingerprint': normalized,
+            'sql': sql,
+            'params': params,
+            'caller': _caller(),
+            'profile': profile,
+            'profile_error': profile_error,
+        }, default=str))
+
+    def close(self):
+        with self._lock:
+            if self._handler is not None:
+                self._handler.close()
+                self._handler = None
+
+
+def read_slow_queries(path):
+    """Every record in the log and its rotated copies, oldest file first"""
+    path = str(path)
+    rotated = [p for p in glob.glob(glob.escape(path) + '.*') if p.rsplit('.', 1)[1].isdigit()]
+    # RotatingFileHandler numbers backups newest first: log.1 is newer than log.2
+    files = sorted(rotated, key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    if os.path.exists(path):
+        files.append(path)
+    for name in files:
+        with open(name, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def summarize_slow_queries(records, top=10):
+    """Fingerprints ordered by total time, each with its slowest example"""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint_id'], {
+            'fingerprint_id': record['fingerprint_id'],
+            'fingerprint': record['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'callers': set(),
+            'slowest': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += record['ms']
+        if record.get('caller'):
+            group['callers'].add(record['caller'])
+        if record['ms'] >= group['max_ms']:
+            group['max_ms'] = record['ms']
+            group['slowest'] = record
+
+    summary = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:top]
+    for group in summary:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 2)
+        group['callers'] = sorted(group['callers'])
+    return summary
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_slow_query_log():
+    """The process-wide log, or None when ``DUCKDB_SLOW_QUERY_MS`` is None"""
+    global _log
+    threshold = getattr(settings, 'DUCKDB_SLOW_QUERY_MS', None)
+    if threshold is None:
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = SlowQueryLog(
+                    settings.DUCKDB_SLOW_QUERY_LOG,
+                    threshold,
+                    max_bytes=getattr(settings, 'DUCKDB_SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024),
+                    backups=getattr(settings, 'DUCKDB_SLOW_QUERY_LOG_BACKUPS', 5),
+                )
+    return _log
+
+
+def reset_slow_query_log():
+    global _log
+    with _log_lock:
+        if _log is not None:
+            _log.close()
+        _log = None
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(sender, setting, **kwargs):
+    if setting.startswith('DUCKDB_SLOW_QUERY'):
+        reset_slow_query_log()
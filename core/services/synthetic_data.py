@@ -0,0 +1,273 @@
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.db.scripts.finance_duckdb import SCHEMA, TRANSACTIONS_MIRROR_SCHEMA, refresh_expense_rollup
+from core.models import MonthlyRollup, Transaction
+from core.services.chart_cache import bump_store_epoch
+from core.services.duckdb_shards import all_shard_cursors, shard_for, split_by_shard
+from core.services.monthly_rollup import insert_monthly_rollup
+from core.services.transaction_replication import mirror_transactions, replicate_transactions
+
+USERNAME_PREFIX = 'synth_'
+START_MONTH = datetime.date(2020, 1, 1)
+CHUNK_SIZE = 50_000  # generated rows held in memory at a time
+
+# Same dimension values as the mock CSVs
+EXPENSE_CATEGORIES = ['rent', 'utilities', 'groceries', 'transport', 'entertainment', 'health', 'subscriptions']
+HOUSEHOLD_TYPES = ['family', 'couple', 'single']
+GOAL_TYPES = ['emergency_fund', 'retirement', 'vacation', 'buy_house']
+
+# Transaction type -> (share of rows, categories, median amount)
+TRANSACTION_MIX = {
+    'expense': (0.70, EXPENSE_CATEGORIES, 60),
+    'income': (0.10, ['salary', 'freelance', 'refund'], 2500),
+    'saving': (0.08, ['emergency_fund', 'vacation'], 300),
+    'investment': (0.06, ['index_fund', 'bitcoin', 'pension'], 400),
+    'debt': (0.03, ['credit_card'], 150),
+    'loan': (0.03, ['student_loan', 'mortgage'], 700),
+}
+
+
+@dataclass
+class SyntheticSummary:
+    users: int
+    transactions: int
+    duckdb_expense_rows: int
+
+
+def synthetic_usernames(users):
+    return [f'{USERNAME_PREFIX}{i:05d}' for i in range(users)]
+
+
+def _month_starts(months):
+    return pd.date_range(START_MONTH, periods=months, freq='MS').date
+
+
+def transaction_frame(rng, user_ids, rows, months):
+    """``rows`` random transactions spread over ``user_ids`` and the first ``months`` months"""
+    types = list(TRANSACTION_MIX)
+    shares = np.array([TRANSACTION_MIX[t][0] for t in types])
+    type_index = rng.choice(len(types), size=rows, p=shares / shares.sum())
+
+    category = np.empty(rows, dtype=object)
+    amount = np.empty(rows)
+    for i, tx_type in enumerate(types):
+        mask = type_index == i
+        _, categories, median = TRANSACTION_MIX[tx_type]
+        category[mask] = np.array(categories, dtype=object)[rng.integers(0, len(categories), mask.sum())]
+        amount[mask] = rng.lognormal(np.log(median), 0.6, mask.sum())
+
+    days = (_month_starts(months + 1)[-1] - START_MONTH).days
+    return pd.DataFrame({
+        'user_id': np.asarray(user_ids)[rng.integers(0, len(user_ids), rows)],
+        'type': np.array(types, dtype=object)[type_index],
+        'category': category,
+        'amount': np.round(amount, 2),
+        'date': [START_MONTH + datetime.timedelta(days=int(d)) for d in rng.integers(0, days, rows)],
+    })
+
+
+def remove_synthetic_data():
+    """Delete every synthetic user and their rows from both stores"""
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    with transaction.atomic():
+        # Plain SQL: the ORM would load and signal every row before deleting it
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Transaction._meta.db_table} WHERE user_id IN "
+                f"(SELECT id FROM {User._meta.db_table} WHERE username LIKE %s)",
+                [USERNAME_PREFIX + '%'],
+            )
+        MonthlyRollup.objects.filter(user__in=users).delete()
+        users.delete()
+
+    with all_shard_cursors() as cursors:
+        for con in cursors:
+            con.execute(SCHEMA)
+            con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+            synthetic = f"(SELECT id FROM users WHERE starts_with(username, '{USERNAME_PREFIX}'))"
+            for table in ('income', 'user_expenses', 'expense_rollup', 'goal_progress'):
+                con.execute(f"DELETE FROM {table} WHERE user_id IN {synthetic}")
+            con.execute("DELETE FROM transactions WHERE starts_with(username, ?)", [USERNAME_PREFIX])
+    bump_store_epoch()
+
+
+def _insert_rows(cursor, model, columns, rows):
+    # executemany with backend-adapted values: at 10M rows, building model
+    # instances for bulk_create costs far more than the inserts themselves
+    quote = connection.ops.quote_name
+    cursor.executemany(
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(map(quote, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})",
+        rows,
+    )
+
+
+def generate_orm_data(rng, users, transactions_per_user, months, stamped_at=None):
+    """Synthetic users and Transactions in the Django database; returns the users.
+
+    Every Transaction gets ``updated_at = stamped_at`` (now by default).
+    """
+    password = make_password(None)
+    created = User.objects.bulk_create(
+        [User(username=name, password=password) for name in synthetic_usernames(users)],
+        batch_size=1000,
+    )
+    user_ids = [user.pk for user in created]
+
+    updated_at = Transaction._meta.get_field('updated_at').get_db_prep_save(stamped_at or timezone.now(), connection)
+    adapt_decimal, adapt_date = connection.ops.adapt_decimalfield_value, connection.ops.adapt_datefield_value
+
+    remaining = users * transactions_per_user
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            while remaining:
+                df = transaction_frame(rng, user_ids, min(CHUNK_SIZE, remaining), months)
+                _insert_rows(cursor, Transaction, [
+                    'user_id', 'type', 'category', 'amount', 'date', 'description', 'is_recurring', 'household_type',
+                    'updated_at',
+                ], [
+                    (user_id, tx_type, category, adapt_decimal(Decimal(f'{amount:.2f}')), adapt_date(tx_date),
+                     '', False, 'single', updated_at)
+                    for user_id, tx_type, category, amount, tx_date
+                    in zip(*(df[c].tolist() for c in ['user_id', 'type', 'category', 'amount', 'date']))
+                ])
+                remaining -= len(df)
+
+        # Raw inserts send no signals, and the new users have no rollup yet, so it is summed in the database
+        insert_monthly_rollup(Transaction.objects.filter(user__username__startswith=USERNAME_PREFIX))
+    return created
+
+
+# Name column in generated frames -> (id column, dimension table); ids differ per shard
+DIMENSION_IDS = {
+    'username': ('user_id', 'users'),
+    'category': ('expenses_id', 'expenses'),
+    'household_type': ('household_id', 'household'),
+    'goal_type': ('goal_id', 'goal'),
+}
+
+
+def _create_dimensions(con, usernames):
+    """Insert missing dimension rows on one shard; returns {table: {name: id}}"""
+    con.execute(SCHEMA)
+    dimensions = {
+        'users': ('username', usernames),
+        'expenses': ('category', EXPENSE_CATEGORIES),
+        'household': ('type', HOUSEHOLD_TYPES),
+        'goal': ('type', GOAL_TYPES),
+    }
+    ids = {}
+    for table, (column, values) in dimensions.items():
+        con.execute(f"INSERT INTO {table} ({column}) SELECT unnest(?) ORDER BY 1 ON CONFLICT DO NOTHING", [values])
+        ids[table] = dict(con.execute(
+            f"SELECT {column}, id FROM {table} WHERE list_contains(?, {column})", [values],
+        ).fetchall())
+    return ids
+
+
+def _append_by_shard(cursors, shard_ids, table, df):
+    """Append rows to ``table`` on each user's shard, with names swapped for that shard's ids"""
+    for shard, part in split_by_shard(df).items():
+        if part.empty:
+            continue
+        names = [name for name in DIMENSION_IDS if name in part]
+        ids = shard_ids[shard]
+        part = part.assign(**{
+            DIMENSION_IDS[name][0]: part[name].map(ids[DIMENSION_IDS[name][1]]) for name in names
+        }).drop(columns=names)
+        cursors[shard].append(table, part, by_name=True)
+
+
+def generate_duckdb_data(rng, users, months):
+    """Monthly income, expenses and goal progress per synthetic user in the DuckDB schema"""
+    usernames = synthetic_usernames(users)
+    months_list = _month_starts(months)
+    expense_rows = 0
+
+    with all_shard_cursors() as cursors:
+        shard_ids = [
+            _create_dimensions(con, [name for name in usernames if shard_for(name) == shard])
+            for shard, con in enumerate(cursors)
+        ]
+        household_types, goal_types = sorted(HOUSEHOLD_TYPES), sorted(GOAL_TYPES)
+
+        block = max(1, CHUNK_SIZE // (months * len(EXPENSE_CATEGORIES)))
+        for start in range(0, users, block):
+            names = np.array(usernames[start:start + block], dtype=object)
+            per_user = len(months_list)
+
+            user_col = np.repeat(names, per_user)
+            date_col = np.tile(months_list, len(names))
+            salary = np.repeat(rng.uniform(18_000, 45_000, len(names)).round(), per_user)
+            _append_by_shard(cursors, shard_ids, 'income', pd.DataFrame({
+                'username': user_col,
+                'date': date_col,
+                'month': [d.month for d in date_col],
+                'year': [d.year for d in date_col],
+                'income_after_tax': salary,
+                'additional_income': rng.uniform(0, 8_000, len(user_col)).round(),
+                'household_type': np.repeat(rng.choice(household_types, len(names)), per_user),
+            }))
+
+            target = np.repeat(rng.uniform(30_000, 200_000, len(names)).round(), per_user)
+            _append_by_shard(cursors, shard_ids, 'goal_progress', pd.DataFrame({
+                'username': user_col,
+                'goal_type': np.repeat(rng.choice(goal_types, len(names)), per_user),
+                'goal_target': target,
+                'current_amount': (target * rng.uniform(0, 0.6, len(user_col))).round(),
+                'date': date_col,
+                'month': [d.month for d in date_col],
+                'year': [d.year for d in date_col],
+            }))
+
+            categories = len(EXPENSE_CATEGORIES)
+            budget = rng.uniform(250, 15_000, len(user_col) * categories).round()
+            expense_dates = np.repeat(date_col, categories)
+            _append_by_shard(cursors, shard_ids, 'user_expenses', pd.DataFrame({
+                'username': np.repeat(user_col, categories),
+                'category': np.tile(EXPENSE_CATEGORIES, len(user_col)),
+                'date': expense_dates,
+                'month': [d.month for d in expense_dates],
+                'year': [d.year for d in expense_dates],
+                'budget_amount': budget,
+                'actual_amount': (budget * rng.normal(1.0, 0.15, len(budget))).clip(0).round(),
+            }))
+            expense_rows += len(budget)
+
+        for con in cursors:
+            refresh_expense_rollup(con, """
+                SELECT user_id, year, month FROM user_expenses
+                WHERE user_id IN (SELECT id FROM users WHERE starts_with(username, ?))
+            """, [USERNAME_PREFIX])
+    bump_store_epoch()
+    return expense_rows
+
+
+def generate_synthetic_data(users, transactions_per_user=100, months=12, seed=0, replicate=True):
+    """Replace the synthetic data set with a new one; the same arguments always give the same data.
+
+    Users are named ``synth_00000`` upwards and live alongside real data in
+    both the Django database and the DuckDB store.
+    """
+    rng = np.random.default_rng(seed)
+    remove_synthetic_data()
+    if replicate:
+        replicate_transactions()  # real rows first, so the bulk copy below can move the mark past everything
+    stamped_at = timezone.now()
+    generate_orm_data(rng, users, transactions_per_user, months, stamped_at)
+    expense_rows = generate_duckdb_data(rng, users, months)
+    if replicate:
+        # The whole set shares one updated_at; copied directly, it never sits inside the replication OVERLAP
+        mirror_transactions(Transaction.objects.filter(user__username__startswith=USERNAME_PREFIX), stamped_at)
+    return SyntheticSummary(
+        users=users, transactions=users * transactions_per_user, duckdb_expense_rows=expense_rows,
+    )
@@ -0,0 +1,271 @@
+import hashlib
+import io
+import itertools
+from dataclasses import dataclass
+
+import openpyxl
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+
+from core.models import Transaction
+from core.services.chart_cache import bump_data_version
+from core.services.monthly_rollup import apply_rollup_deltas, deltas_for_frame
+from core.services.transaction_replication import request_replication
+
+REQUIRED_COLUMNS = {'type', 'amount', 'date', 'category'}
+TRANSACTION_TYPES = {value for value, _ in Transaction.TYPE_CHOICES}
+HOUSEHOLD_TYPES = {value for value, _ in Transaction.HOUSEHOLD_CHOICES}
+
+MAX_AMOUNT = 10 ** 8  # DecimalField(max_digits=10, decimal_places=2)
+MAX_CATEGORY_LENGTH = Transaction._meta.get_field('category').max_length
+BATCH_SIZE = 1000  # rows read, validated and inserted at a time
+FINGERPRINT_LOOKUP_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+
+class MissingColumnsError(ValueError):
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"Missing columns. Required: {REQUIRED_COLUMNS}")
+
+
+@dataclass
+class ImportResult:
+    created: int
+    rejected_count: int
+    skipped: int  # already imported before, see transaction_fingerprints
+    rejected_csv: str  # the rejected input rows plus 'row' and 'error'
+
+
+def missing_columns(df):
+    return REQUIRED_COLUMNS - set(df.columns)
+
+
+def _csv_frames(uploaded_file, chunk_size):
+    # Everything as text: chunks infer dtypes independently, and validation coerces anyway
+    for chunk in pd.read_csv(uploaded_file, chunksize=chunk_size, dtype=str):
+        # The chunk index counts data rows across chunks; the header is row 1
+        yield chunk.set_axis(chunk.index + 2)
+
+
+def _xlsx_frames(uploaded_file, chunk_size):
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        numbered = enumerate(rows, start=2)
+        empty = True
+        while True:
+            chunk = list(itertools.islice(numbered, chunk_size))
+            if not chunk:
+                break
+            # Blank rows are dropped, but a chunk of nothing but blanks does not end the sheet
+            kept = [(number, row) for number, row in chunk if any(v is not None for v in row)]
+            if kept:
+                empty = False
+                numbers, values = zip(*kept)
+                yield pd.DataFrame(list(values), columns=header, index=list(numbers))
+        if empty:
+            yield pd.DataFrame(columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_upload_frames(uploaded_file, chunk_size=BATCH_SIZE):
+    """Read an .xlsx or .csv upload as DataFrames of at most ``chunk_size`` rows.
+
+    Each frame is indexed by spreadsheet row number (the header is row 1),
+    so rejected rows are reported where the user sees them. Workbooks are read with openpyxl in read-only mode and CSVs in chunks, so
+    memory stays flat however large the file is. The format is sniffed from
+    the content (xlsx files are zip archives) rather than trusted from the name.
+    """
+    signature = uploaded_file.read(4)
+    uploaded_file.seek(0)
+    if signature.startswith(b'PK'):
+        return _xlsx_frames(uploaded_file, chunk_size)
+    if signature == b'\xd0\xcf\x11\xe0':
+        raise ValueError("Legacy .xls files are not supported, save the sheet as .xlsx or .csv")
+    return _csv_frames(uploaded_file, chunk_size)
+
+
+def _text(series):
+    return series.astype('string').str.strip()
+
+
+def validate_transactions(df):
+    """Coerce a whole upload at once and split it into valid and rejected rows.
+
+    ``df`` is indexed by spreadsheet row number (see iter_upload_frames);
+    rejected rows carry it in their ``row`` column.
+    """
+    errors = pd.Series('', index=df.index, dtype='string')
+
+    def reject(mask, message):
+        nonlocal errors
+        errors = errors.mask(mask.fillna(True).astype(bool), errors + message + '; ')
+
+    tx_type = _text(df['type']).str.lower()
+    reject(~tx_type.isin(TRANSACTION_TYPES), 'unknown type')
+
+    amount = pd.to_numeric(df['amount'], errors='coerce').round(2)
+    reject(amount.isna(), 'amount is not a number')
+    reject(amount.abs() >= MAX_AMOUNT, 'amount too large')
+
+    tx_date = pd.to_datetime(df['date'], errors='coerce', format='mixed')
+    reject(tx_date.isna(), 'invalid date')
+
+    category = _text(df['category'])
+    reject(category.isna() | (category == ''), 'missing category')
+    reject(category.str.len().fillna(0) > MAX_CATEGORY_LENGTH, 'category too long')
+
+    # 'note' is what older upload templates called the description
+    description_column = 'description' if 'description' in df.columns else 'note'
+    if description_column in df.columns:
+        description = _text(df[description_column]).fillna('')
+    else:
+        description = pd.Series('', index=df.index, dtype='string')
+
+    if 'household_type' in df.columns:
+        household = _text(df['household_type']).str.lower().fillna('single')
+        reject(~household.isin(HOUSEHOLD_TYPES), 'unknown household type')
+    else:
+        household = pd.Series('single', index=df.index, dtype='string')
+
+    if 'is_recurring' in df.columns:
+        recurring = _text(df['is_recurring']).str.lower().isin(['1', 'true', 'yes', 'y'])
+    else:
+        recurring = pd.Series(False, index=df.index)
+
+    ok = errors == ''
+    valid = pd.DataFrame({
+        'type': tx_type[ok],
+        'amount': amount[ok],
+        'date': tx_date[ok].dt.date,
+        'category': category[ok],
+        'description': description[ok],
+        'household_type': household[ok],
+        'is_recurring': recurring[ok],
+    })
+
+    rejected = df[~ok].copy()
+    rejected.insert(0, 'row', rejected.index)
+    rejected['error'] = errors[~ok].str.rstrip('; ')
+    return valid, rejected.reset_index(drop=True)
+
+
+def _build_transactions(user, valid):
+    return [
+        Transaction(
+            user=user,
+            type=row.type,
+            amount=row.amount,
+            date=row.date,
+            category=row.category,
+            description=row.description,
+            household_type=row.household_type,
+            is_recurring=bool(row.is_recurring),
+            fingerprint=row.fingerprint,
+        )
+        for row in valid.itertuples(index=False)
+    ]
+
+
+def transaction_fingerprints(user, valid):
+    """Content hash of each validated row: user, type, amount, date, category and description"""
+    key = (
+        f'{user.pk}|' + valid['type'].astype(str)
+        + '|' + valid['amount'].map('{:.2f}'.format)
+        + '|' + valid['date'].astype(str)
+        + '|' + valid['category'].astype(str).str.casefold()
+        + '|' + valid['description'].astype(str)
+    )
+    return pd.Series([hashlib.sha256(k.encode()).hexdigest() for k in key], index=valid.index, dtype=object)
+
+
+def _seen_fingerprints(user, fingerprints, before_id):
+    """Which of ``fingerprints`` the user already had before this import started"""
+    unique = list(set(fingerprints))
+    seen = set()
+    for start in range(0, len(unique), FINGERPRINT_LOOKUP_SIZE):
+        seen.update(
+            Transaction.objects.filter(
+                user=user, id__lte=before_id, fingerprint__in=unique[start:start + FINGERPRINT_LOOKUP_SIZE],
+            ).values_list('fingerprint', flat=True)
+        )
+    return seen
+
+
+def import_transaction_batches(user, frames, batch_size=BATCH_SIZE, progress=None):
+    """Validate and insert an upload batch by batch, committing each batch.
+
+    Only the current batch is held in memory; rejected rows are streamed into
+    the CSV report as they are found. ``progress(rows_processed, rows_failed)``
+    is called inside every batch's transaction, so what it records commits
+    together with the batch's rows.
+
+    Rows whose fingerprint the user already had before the import are skipped,
+    so re-uploading an overlapping export does not duplicate them. Identical
+    rows within the upload itself are all kept. If an upload fails part way,
+    the batches before the failure stay and uploading it again skips them.
+    """
+    report = io.StringIO()
+    created = rejected_count = skipped = processed = 0
+
+    # Rows inserted by this import have higher ids and never count as "seen"
+    before_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+    try:
+        for df in frames:
+            missing = missing_columns(df)
+            if missing:
+                raise MissingColumnsError(missing)
+
+            valid, rejected = validate_transactions(df)
+
+            valid['fingerprint'] = transaction_fingerprints(user, valid)
+            duplicate = valid['fingerprint'].isin(_seen_fingerprints(user, valid['fingerprint'], before_id))
+            valid = valid[~duplicate]
+
+            with transaction.atomic():
+                batch_created = len(Transaction.objects.bulk_create(_build_transactions(user, valid), batch_size=batch_size))
+                # bulk_create sends no post_save, so the rollup is updated per batch instead
+                apply_rollup_deltas(deltas_for_frame(user, valid))
+                if progress:
+                    progress(processed + len(df), rejected_count + len(rejected))
+            created += batch_created
+            processed += len(df)
+            skipped += int(duplicate.sum())
+            if len(rejected):
+                rejected.to_csv(report, index=False, header=rejected_count == 0)
+                rejected_count += len(rejected)
+    finally:
+        if created:
+            bump_data_version(user)
+            request_replication()
+    return ImportResult(
+        created=created, rejected_count=rejected_count, skipped=skipped, rejected_csv=report.getvalue(),
+    )
+
+
+def import_transactions(user, df, batch_size=BATCH_SIZE):
+    """Validate a DataFrame and bulk insert its valid rows in one transaction"""
+    # Its rows are numbered as if it were a sheet under a header row
+    return import_transaction_batches(user, [df.set_axis(range(2, len(df) + 2))], batch_size=batch_size)
+
+
+def import_upload(user, uploaded_file, batch_size=BATCH_SIZE, progress=None):
+    """Stream an .xlsx or .csv upload into Transactions in fixed-size batches"""
+    frames = iter_upload_frames(uploaded_file, batch_size)
+    return import_transaction_batches(user, frames, batch_size=batch_size, progress=progress)
+
+
+def read_upload_columns(uploaded_file):
+    """Column names of an upload, reading no more than its first row"""
+    frames = iter_upload_frames(uploaded_file, chunk_size=1)
+    try:
+        frame = next(frames, None)
+    finally:
+        frames.close()
+    uploaded_file.seek(0)
+    return set() if frame is None else set(frame.columns)
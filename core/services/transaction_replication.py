@@ -0,0 +1,284 @@
+import datetime
+import logging
+import threading
+
+import pandas as pd
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+
+from core.db.scripts.finance_duckdb import TRANSACTIONS_MIRROR_SCHEMA
+from core.models import Transaction
+from core.services.chart_cache import bump_data_versions
+from core.services.duckdb_shards import all_shard_cursors, split_by_shard
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = 'transactions'
+BATCH_SIZE = 5000  # rows appended to DuckDB per micro-batch
+# Transactions can commit out of updated_at order, so every run re-checks this
+# much history before the mark and copies the rows the mirror is missing
+OVERLAP = datetime.timedelta(seconds=5)
+
+MIRROR_COLUMNS = ['id', 'user_id', 'username', 'type', 'category', 'amount', 'date', 'month', 'year', 'updated_at']
+
+_run_lock = threading.Lock()  # one replication pass at a time per process
+_schedule_lock = threading.Lock()
+_scheduled = False
+_pending_deletes = set()
+
+
+def _to_duckdb_timestamp(value):
+    # DuckDB TIMESTAMP is naive; the mirror keeps UTC
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def get_high_water_mark(con):
+    """(updated_at, id) of the last replicated row, or None before the first run"""
+    row = con.execute(
+        "SELECT updated_at, last_id FROM replication_state WHERE name = ?", [STATE_NAME],
+    ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return row[0].replace(tzinfo=datetime.timezone.utc), row[1]
+
+
+def _replicated_mark(cursors):
+    """The oldest shard's mark; each shard stores the mark it has applied"""
+    marks = [get_high_water_mark(con) for con in cursors]
+    if any(mark is None for mark in marks):
+        return None
+    return min(marks)
+
+
+def _before_mark(mark):
+    updated_at, last_id = mark
+    return Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lte=last_id)
+
+
+def _mirror_rows(transactions):
+    return transactions.values_list('id', 'user_id', 'user__username', 'type', 'category', 'amount', 'date', 'updated_at')
+
+
+def _changed_since(mark, batch_size):
+    transactions = Transaction.objects.order_by('updated_at', 'id')
+    if mark is not None:
+        transactions = transactions.exclude(_before_mark(mark))
+    return list(_mirror_rows(transactions)[:batch_size])
+
+
+def _mirror_frame(rows):
+    df = pd.DataFrame(rows, columns=['id', 'user_id', 'username', 'type', 'category', 'amount', 'date', 'updated_at'])
+    df['month'] = [d.month for d in df['date']]
+    df['year'] = [d.year for d in df['date']]
+    df['updated_at'] = [_to_duckdb_timestamp(ts) for ts in df['updated_at']]
+    # As text, DuckDB casts exactly to DECIMAL(12,2); Decimal objects get a type guessed from the first rows
+    df['amount'] = df['amount'].astype(str)
+    return df[MIRROR_COLUMNS]
+
+
+def _set_mark(con, mark):
+    con.execute(
+        "INSERT OR REPLACE INTO replication_state VALUES (?, ?, ?, now())",
+        [STATE_NAME, _to_duckdb_timestamp(mark[0]), mark[1]],
+    )
+
+
+def _apply_batch(con, batch, mark):
+    """Replace the batch's rows in the mirror and move the mark (unless None), in one DuckDB transaction"""
+    con.register('replication_batch', batch)
+    con.begin()
+    try:
+        if len(batch):
+            con.execute("DELETE FROM transactions WHERE id IN (SELECT id FROM replication_batch)")
+            con.append('transactions', batch, by_name=True)
+        if mark is not None:
+            _set_mark(con, mark)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.unregister('replication_batch')
+
+
+def _missing_from_mirror(con, batch):
+    """Rows of ``batch`` the mirror lacks or holds an older version of"""
+    con.register('overlap_batch', batch)
+    try:
+        stale = {row[0] for row in con.execute("""
+            SELECT b.id FROM overlap_batch b
+            LEFT JOIN transactions t ON t.id = b.id AND t.updated_at = b.updated_at
+            WHERE t.id IS NULL
+        """).fetchall()}
+    finally:
+        con.unregister('overlap_batch')
+    return batch[batch['id'].isin(stale)]
+
+
+def _recheck_overlap(cursors, mark):
+    """Copy rows that committed late, with an updated_at in the OVERLAP before ``mark``.
+
+    The mark itself never moves back: rows the mirror already holds are left
+    alone, so an unchanged store copies (and re-versions) nothing.
+    """
+    if mark is None or not OVERLAP:
+        return 0
+    window = Transaction.objects.filter(_before_mark(mark), updated_at__gte=mark[0] - OVERLAP).order_by('updated_at', 'id')
+    rows = list(_mirror_rows(window))
+    if not rows:
+        return 0
+    copied = 0
+    for shard, part in split_by_shard(_mirror_frame(rows)).items():
+        missing = _missing_from_mirror(cursors[shard], part)
+        if len(missing):
+            _apply_batch(cursors[shard], missing, None)
+            copied += len(missing)
+            bump_data_versions(missing['user_id'].unique())
+    return copied
+
+
+def mirror_transactions(transactions, stamped_at, batch_size=BATCH_SIZE):
+    """Copy a bulk load straight into the mirror and move the mark past it.
+
+    For rows that all share one ``updated_at`` (``stamped_at``), like the
+    synthetic data set: replicated the normal way they would leave the mark
+    on that instant, so every later pass would re-check the whole load inside
+    OVERLAP. Here the mark moves to ``stamped_at + OVERLAP``, just out of
+    reach of the load; later commits within OVERLAP of it are still caught by
+    the re-check. Call it right after a normal pass, with the load committed.
+    """
+    copied = 0
+    with _run_lock, all_shard_cursors() as cursors:
+        for con in cursors:
+            con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+        rows = _mirror_rows(transactions.order_by('id'))
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for shard, part in split_by_shard(_mirror_frame(batch)).items():
+                if len(part):
+                    _apply_batch(cursors[shard], part, None)
+            last_id = batch[-1][0]
+            copied += len(batch)
+
+        mark = (stamped_at + OVERLAP + datetime.timedelta(microseconds=1), 0)
+        current = _replicated_mark(cursors)
+        if current is None or current < mark:
+            for con in cursors:
+                _set_mark(con, mark)
+        users = {user_id for user_id, in transactions.values_list('user_id').distinct()}
+    bump_data_versions(users)
+    return copied
+
+
+def delete_replicated(ids):
+    """Drop deleted Transactions from the mirror"""
+    ids = sorted(ids)
+    if not ids:
+        return 0
+    users = []
+    with all_shard_cursors() as cursors:
+        for con in cursors:
+            con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+            users += [user_id for user_id, in con.execute(
+                "SELECT DISTINCT user_id FROM transactions WHERE list_contains(?, id)", [ids],
+            ).fetchall()]
+            con.execute("DELETE FROM transactions WHERE list_contains(?, id)", [ids])
+    bump_data_versions(users)
+    return len(ids)
+
+
+def replicate_transactions(batch_size=BATCH_SIZE):
+    """Copy new and changed Transactions into DuckDB, micro-batch by micro-batch.
+
+    Picks up from the high-water mark stored in DuckDB, so a run after downtime
+    catches up on everything it missed. Returns the number of rows copied.
+    Deletes are not visible here; see delete_replicated and prune_replicated.
+    Each row goes to its user's shard, and every shard records the mark.
+    """
+    with _run_lock, all_shard_cursors() as cursors:
+        for con in cursors:
+            con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+        mark = _replicated_mark(cursors)
+        copied = _recheck_overlap(cursors, mark)
+
+        while True:
+            rows = _changed_since(mark, batch_size)
+            if not rows:
+                break
+            batch = _mirror_frame(rows)
+            mark = (rows[-1][7], rows[-1][0])
+            # Shards without rows in this batch still move their mark
+            for shard, part in split_by_shard(batch).items():
+                _apply_batch(cursors[shard], part, mark)
+            copied += len(rows)
+            # Cached charts may have been rendered from the mirror before these rows arrived
+            bump_data_versions(batch['user_id'].unique())
+            if len(rows) < batch_size:
+                break
+    return copied
+
+
+def prune_replicated():
+    """Remove mirror rows whose Transaction no longer exists (catch-up after missed deletes)"""
+    live = pd.DataFrame({'id': list(Transaction.objects.values_list('id', flat=True).iterator())}, dtype='int64')
+    missing = []
+    with all_shard_cursors() as cursors:
+        for con in cursors:
+            con.execute(TRANSACTIONS_MIRROR_SCHEMA)
+            con.register('live_transactions', live)
+            try:
+                missing += [row[0] for row in con.execute(
+                    "SELECT id FROM transactions WHERE id NOT IN (SELECT id FROM live_transactions)",
+                ).fetchall()]
+            finally:
+                con.unregister('live_transactions')
+    return delete_replicated(missing)
+
+
+def _replicate_pending():
+    global _scheduled
+    with _schedule_lock:
+        _scheduled = False  # commits from here on schedule another pass
+        deleted = set(_pending_deletes)
+        _pending_deletes.clear()
+    delete_replicated(deleted)
+    replicate_transactions()
+
+
+def _replicate_in_worker():
+    close_old_connections()
+    try:
+        _replicate_pending()
+    except Exception:
+        logger.exception("Transaction replication to DuckDB failed")
+    finally:
+        connections.close_all()
+
+
+def _schedule_replication():
+    global _scheduled
+    with _schedule_lock:
+        if _scheduled:
+            return
+        _scheduled = True
+
+    if getattr(settings, 'IMPORT_JOBS_EAGER', False):
+        _replicate_pending()
+    else:
+        # Shares the import pool; at most one pass is queued however many commits arrive
+        from core.services.import_jobs import get_executor
+        get_executor().submit(_replicate_in_worker)
+
+
+def request_replication(deleted_ids=()):
+    """Replicate after the current DB transaction commits, if DUCKDB_REPLICATE_ON_COMMIT is set"""
+    if not getattr(settings, 'DUCKDB_REPLICATE_ON_COMMIT', False):
+        return
+    if deleted_ids:
+        with _schedule_lock:
+            _pending_deletes.update(deleted_ids)
+    transaction.on_commit(_schedule_replication)
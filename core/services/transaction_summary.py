@@ -0,0 +1,52 @@
+import calendar
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from core.models import MonthlyRollup, Transaction
+
+TRANSACTION_TYPES = [value for value, _ in Transaction.TYPE_CHOICES]
+
+
+def _is_month_aligned(start, end):
+    starts_on_month = start is None or start.day == 1
+    ends_on_month = end is None or end.day == calendar.monthrange(end.year, end.month)[1]
+    return starts_on_month and ends_on_month
+
+
+def month_window(start, end):
+    """Q on MonthlyRollup's year/month for the months touched by ``start``..``end``"""
+    window = Q()
+    if start is not None:
+        window &= Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month)
+    if end is not None:
+        window &= Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month)
+    return window
+
+
+def summarize_by_type(user, start=None, end=None):
+    """Total and count per transaction type for a user, from one grouped query.
+
+    ``start``/``end`` are inclusive dates. Windows made of whole months (or no
+    window at all) are answered from MonthlyRollup; any other window groups the
+    matching Transaction rows in the database. Every type is present in the
+    result, with zeros when the user has none.
+    """
+    if _is_month_aligned(start, end):
+        rows = (
+            MonthlyRollup.objects.filter(month_window(start, end), user=user)
+            .values('type')
+            .annotate(total=Sum('total'), count=Sum('count'))
+        )
+    else:
+        transactions = Transaction.objects.filter(user=user)
+        if start is not None:
+            transactions = transactions.filter(date__gte=start)
+        if end is not None:
+            transactions = transactions.filter(date__lte=end)
+        rows = transactions.values('type').annotate(total=Sum('amount'), count=Count('id'))
+
+    summary = {tx_type: {'total': Decimal('0'), 'count': 0} for tx_type in TRANSACTION_TYPES}
+    for row in rows.order_by():
+        summary[row['type']] = {'total': row['total'], 'count': row['count']}
+    return summary
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from core.models import Transaction, Budget, Goal
+from core.services.chart_cache import bump_data_version
+from core.services.monthly_rollup import record_transaction_change, rollup_key
+from core.services.transaction_replication import request_replication
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Budget)
+@receiver([post_save, post_delete], sender=Goal)
+def invalidate_user_charts(sender, instance, **kwargs):
+    """Any change to a user's financial data makes their cached charts stale"""
+    bump_data_version(instance.user_id)
+
+
+def _rollup_entry(user_id, tx_date, tx_type, category, amount):
+    # Values set on an unsaved instance may still be strings, ints or floats
+    tx_date = Transaction._meta.get_field('date').to_python(tx_date)
+    amount = Transaction._meta.get_field('amount').to_python(amount).quantize(Decimal('0.01'))
+    return rollup_key(user_id, tx_date, tx_type, category), amount
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_rollup_bucket(sender, instance, raw=False, **kwargs):
+    """Keep the stored row's bucket so an edit can move its amount out of it"""
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values_list('user_id', 'date', 'type', 'category', 'amount')
+            .first()
+        )
+        if previous:
+            instance._rollup_previous = _rollup_entry(*previous)
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = _rollup_entry(instance.user_id, instance.date, instance.type, instance.category, instance.amount)
+    record_transaction_change(getattr(instance, '_rollup_previous', None), current)
+    request_replication()
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    previous = _rollup_entry(instance.user_id, instance.date, instance.type, instance.category, instance.amount)
+    record_transaction_change(previous, None)
+    request_replication(deleted_ids=[instance.pk])
@@ -0,0 +1,37 @@
+// Draws the figure specs emitted by core.charts.rendering.render_figure with the
+// single plotly.js loaded for the page.
+function renderPlotlyFigures(root) {
+    (root || document).querySelectorAll('.js-plotly-figure:not([data-rendered])').forEach(function (el) {
+        const spec = JSON.parse(el.querySelector('script[type="application/json"]').textContent);
+        el.dataset.rendered = 'true';
+        Plotly.newPlot(el, spec.data, spec.layout, {responsive: true});
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    renderPlotlyFigures(document);
+});
+
+// Fetch every lazily loaded dashboard chart in parallel and draw each one as it arrives.
+function loadLazyCharts(root) {
+    (root || document).querySelectorAll('.js-lazy-chart[data-chart-url]').forEach(function (el) {
+        fetch(el.dataset.chartUrl, {credentials: 'same-origin'})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                el.innerHTML = data.html;
+                renderPlotlyFigures(el);
+            })
+            .catch(function (error) {
+                el.innerHTML = '<p>Could not load chart: ' + error.message + '</p>';
+            });
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    loadLazyCharts(document);
+});
@@ -0,0 +1,17 @@
+from django import template
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html
+from core.charts.rendering import PLOTLY_JS_VERSION
+
+register = template.Library()
+
+
+@register.simple_tag
+def plotly_scripts():
+    """Load plotly.js once per page, plus the loader that draws the figure specs"""
+    return format_html(
+        '<script src="{}"></script>\n<script src="{}"></script>',
+        reverse('plotly_js', args=[PLOTLY_JS_VERSION]),
+        static('core/charts.js'),
+    )
@@ -0,0 +1,41 @@
+import pytest
+from django.conf import settings
+from core.db.scripts.finance_duckdb import setup_database
+
+
+@pytest.fixture
+def duckdb_store(tmp_path, settings):
+    """Build the demo DuckDB store from the mock CSVs and point the app at it"""
+    db_path = tmp_path / "finance.duckdb"
+    setup_database(db_path=db_path, data_path=settings.BASE_DIR / "core" / "db" / "data")
+    settings.DUCKDB_PATH = db_path
+    return db_path
+
+
+@pytest.fixture(autouse=True)
+def clear_chart_cache():
+    """Cached fragments must not leak between tests"""
+    from django.core.cache import cache
+    from core.services.chart_cache import chart_cache
+    chart_cache.clear()
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def eager_import_jobs(settings):
+    """Run upload imports inside the request so tests can assert on the result"""
+    settings.IMPORT_JOBS_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def manual_replication(settings):
+    """Tests replicate to DuckDB explicitly instead of after every commit"""
+    settings.DUCKDB_REPLICATE_ON_COMMIT = False
+
+
+@pytest.fixture(autouse=True)
+def slow_query_log(tmp_path, settings):
+    """Slow DuckDB statements are logged under the test's tmp dir, not the project"""
+    settings.DUCKDB_SLOW_QUERY_LOG = tmp_path / "logs" / "duckdb_slow_queries.jsonl"
+    return settings.DUCKDB_SLOW_QUERY_LOG
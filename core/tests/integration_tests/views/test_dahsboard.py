@@ -0,0 +1,119 @@
+import datetime
+import html
+import re
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from core.models import Transaction
+from core.services.chart_cache import chart_cache
+from core.services.duckdb_connection import get_connection_manager
+from core.charts.rendering import PLOTLY_JS_VERSION
+from core.views.charts import DASHBOARD_CHARTS
+
+
+@pytest.fixture
+def logged_in_client(client, db):
+    User.objects.create_user(username='dash', password='123')
+    client.login(username='dash', password='123')
+    return client
+
+
+def chart_urls(response):
+    """Every lazy chart URL on the page, exactly as the browser will request it"""
+    return [html.unescape(url) for url in re.findall(r'data-chart-url="([^"]*)"', response.content.decode())]
+
+
+def duckdb_round_trips():
+    stats = get_connection_manager().stats()
+    return stats['cursors'] + stats['reuses']
+
+
+def test_dashboard_shell_totals_come_from_rollup(logged_in_client, duckdb_store, django_assert_max_num_queries):
+    user = User.objects.get(username='dash')
+    Transaction.objects.create(user=user, type='income', category='salary', amount=3000)
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=1200)
+
+    with django_assert_max_num_queries(4):
+        response = logged_in_client.get(reverse('dashboard'))
+
+    assert response.status_code == 200
+    assert duckdb_round_trips() == 0
+    assert response.context['summary']['income'] == 3000
+    assert response.context['summary']['expense'] == 1200
+
+
+def test_dashboard_shell_defers_charts_to_endpoints(logged_in_client, duckdb_store):
+    html = logged_in_client.get(reverse('dashboard')).content.decode()
+
+    assert 'js-plotly-figure' not in html
+    for name in DASHBOARD_CHARTS:
+        assert reverse('dashboard_chart', args=[name]) in html
+
+
+def test_chart_endpoints_report_a_store_without_tables(logged_in_client, tmp_path, settings):
+    settings.DUCKDB_PATH = tmp_path / "empty.duckdb"
+
+    # Every chart drawn from the DuckDB bundle; income-vs-expense reads the ORM rollup
+    for name in ['budget-vs-actual', 'variance', 'sunburst', 'breakdown']:
+        response = logged_in_client.get(reverse('dashboard_chart', args=[name]))
+        assert response.status_code == 200
+        assert response.json()['html'].startswith('<div><p>Error')
+
+    assert chart_cache.stats()['size'] == 0
+
+
+def test_chart_endpoints_share_one_bundle(logged_in_client, duckdb_store):
+    for name in DASHBOARD_CHARTS:
+        response = logged_in_client.get(reverse('dashboard_chart', args=[name]))
+        assert response.status_code == 200
+        assert response.json()['chart'] == name
+        assert response.json()['html']
+
+    assert duckdb_round_trips() == 1
+    assert logged_in_client.get(reverse('dashboard_chart', args=['radar'])).status_code == 404
+
+
+def test_repeat_chart_request_skips_chart_generation(logged_in_client, duckdb_store):
+    url = reverse('dashboard_chart', args=['budget-vs-actual'])
+
+    first = logged_in_client.get(url)
+    before = duckdb_round_trips()
+    second = logged_in_client.get(url)
+
+    assert duckdb_round_trips() == before
+    assert second.json() == first.json()
+
+
+def test_dashboard_page_is_compressed_and_loads_plotly_once(logged_in_client, duckdb_store):
+    response = logged_in_client.get(reverse('dashboard'), HTTP_ACCEPT_ENCODING='gzip')
+
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == 'gzip'
+    html = logged_in_client.get(reverse('dashboard')).content.decode()
+    assert html.count(reverse('plotly_js', args=[PLOTLY_JS_VERSION])) == 1
+    assert 'plotly.js v' not in html
+
+
+def test_range_applies_to_cards_and_chart_urls(logged_in_client, duckdb_store):
+    user = User.objects.get(username='dash')
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=1200, date=datetime.date(2024, 5, 3))
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=800, date=datetime.date(2025, 2, 1))
+
+    response = logged_in_client.get(reverse('dashboard'), {'start': '2025-01', 'end': '2025-12'})
+
+    assert response.context['summary']['expense'] == 800
+    urls = chart_urls(response)
+    assert urls[-1] == reverse('dashboard_chart', args=['variance']) + '?start=2025-01&end=2025-12'
+    for url in urls + chart_urls(logged_in_client.get(reverse('dashboard'))):
+        assert logged_in_client.get(url).status_code == 200, url
+
+
+def test_chart_endpoints_cache_each_range_separately(logged_in_client, duckdb_store):
+    url = reverse('dashboard_chart', args=['income-vs-expense'])
+    user = User.objects.get(username='dash')
+    Transaction.objects.create(user=user, type='income', category='salary', amount=3000, date=datetime.date(2024, 5, 3))
+
+    assert '2024-05' in logged_in_client.get(url).json()['html']
+    assert '2024-05' not in logged_in_client.get(url, {'start': '2025-01'}).json()['html']
+    assert logged_in_client.get(url, {'start': '2025-13'}).status_code == 400
+    assert logged_in_client.get(reverse('dashboard'), {'start': '2025-06', 'end': '2025-01'}).status_code == 400
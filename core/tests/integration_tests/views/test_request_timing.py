@@ -0,0 +1,64 @@
+import json
+import logging
+import time
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from core.services.request_timing import start_request_timing, stop_request_timing, timed
+
+
+@pytest.fixture
+def logged_in_client(client, db):
+    User.objects.create_user(username='lydia', password='123')  # has demo DuckDB data
+    client.login(username='lydia', password='123')
+    return client
+
+
+@pytest.fixture
+def timing_log(caplog):
+    logger = logging.getLogger('core.request_timing')
+    logger.addHandler(caplog.handler)
+    caplog.set_level(logging.INFO, logger='core.request_timing')
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def metrics(response):
+    return {metric.split(';')[0].strip() for metric in response['Server-Timing'].split(',')}
+
+
+def test_chart_request_reports_each_layer(logged_in_client, duckdb_store, timing_log):
+    response = logged_in_client.get(reverse('dashboard_chart', args=['budget-vs-actual']))
+
+    assert response.status_code == 200
+    assert {'orm', 'duckdb', 'charts', 'render', 'other', 'total'} <= metrics(response)
+
+    [record] = [json.loads(r.getMessage()) for r in timing_log.records if r.name == 'core.request_timing']
+    assert record['path'] == reverse('dashboard_chart', args=['budget-vs-actual'])
+    assert record['status'] == 200
+    assert record['timings']['duckdb']['calls'] >= 1
+    assert record['timings']['render']['calls'] == 1
+
+
+def test_timing_can_be_switched_off(logged_in_client, settings, timing_log):
+    settings.REQUEST_TIMING = False
+
+    response = logged_in_client.get(reverse('dashboard'))
+
+    assert 'Server-Timing' not in response
+    assert not timing_log.records
+
+
+def test_nested_sections_only_count_their_own_time():
+    token = start_request_timing()
+    with timed('charts'):
+        time.sleep(0.02)
+        with timed('duckdb'):
+            time.sleep(0.03)
+    timings = stop_request_timing(token).as_dict()
+
+    assert 20 <= timings['charts']['ms'] < 30
+    assert timings['duckdb']['ms'] >= 30
+    # Outside a timed request the hooks do nothing
+    with timed('duckdb'):
+        pass
@@ -0,0 +1,114 @@
+import pytest
+from django.contrib.auth.models import User
+from core.models import Transaction
+from core.db.scripts.finance_duckdb import setup_database
+from core.services.chart_cache import ChartFragmentCache, bump_data_version, bump_store_epoch, cached_chart, chart_cache, get_data_version
+
+
+def test_fragment_cache_evicts_least_recently_used():
+    cache = ChartFragmentCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_fragment_cache_counts_hits_and_misses():
+    cache = ChartFragmentCache()
+    renders = []
+
+    for _ in range(3):
+        cache.get_or_render('chart', lambda: renders.append(1) or '<div></div>')
+
+    assert len(renders) == 1
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+@pytest.mark.django_db
+def test_saving_a_transaction_invalidates_cached_charts():
+    user = User.objects.create_user(username='cache', password='123')
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f'<div>{len(renders)}</div>'
+
+    first = cached_chart('income_vs_expense', user, 2025, render)
+    assert cached_chart('income_vs_expense', user, 2025, render) == first
+
+    version = get_data_version(user)
+    Transaction.objects.create(user=user, type='income', category='salary', amount=100)
+
+    assert get_data_version(user) != version
+    assert cached_chart('income_vs_expense', user, 2025, render) != first
+    assert len(renders) == 2
+    assert chart_cache.stats()['hits'] == 1
+
+
+@pytest.mark.django_db
+def test_data_version_is_shared_with_other_workers(settings):
+    from django.core.cache import cache
+    user = User.objects.create_user(username='workers', password='123')
+    version = bump_data_version(user)
+
+    # Another worker process starts with a cache of its own
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other'}}
+    cache.clear()
+
+    assert get_data_version(user) == version
+    assert bump_data_version(user) != version
+
+
+def test_fragments_expire_after_the_ttl(monkeypatch):
+    cache = ChartFragmentCache(ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr('core.services.chart_cache.time.monotonic', lambda: now[0])
+
+    cache.set('chart', '<div></div>')
+    assert cache.get('chart') == '<div></div>'
+    now[0] += 61
+    assert cache.get('chart') is None
+    assert cache.stats()['size'] == 0
+
+
+@pytest.mark.django_db
+def test_error_fragments_are_not_cached():
+    user = User.objects.create_user(username='flaky', password='123')
+    results = iter(['<div><p>Error generating chart: IO Error</p></div>', '<div>chart</div>'])
+
+    assert cached_chart('sunburst', user, 2025, lambda: next(results)).startswith('<div><p>Error')
+    assert cached_chart('sunburst', user, 2025, lambda: next(results)) == '<div>chart</div>'
+    assert chart_cache.stats()['size'] == 1
+
+
+@pytest.mark.django_db
+def test_loading_the_duckdb_store_invalidates_cached_charts(duckdb_store, tmp_path, settings):
+    user = User.objects.create_user(username='loaded', password='123')
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f'<div>{len(renders)}</div>'
+
+    first = cached_chart('breakdown', user, 2025, render)
+    assert cached_chart('breakdown', user, 2025, render) == first
+
+    # A new input file loaded by a separate loader process
+    data = tmp_path / 'new_data'
+    data.mkdir()
+    (data / 'mock_expenses_2026.csv').write_text(
+        'user,date,expenses_category,budget_amount,actual_amount_spent\nlydia,01/01/2026,rent,100,90\n')
+    setup_database(db_path=duckdb_store, data_path=data)
+    assert cached_chart('breakdown', user, 2025, render) != first
+
+    # Synthetic data is written by the app itself
+    second = cached_chart('breakdown', user, 2025, render)
+    bump_store_epoch()
+    assert cached_chart('breakdown', user, 2025, render) != second
+    assert len(renders) == 3
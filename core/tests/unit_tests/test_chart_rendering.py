@@ -0,0 +1,34 @@
+import json
+import plotly.graph_objs as go
+from django.urls import reverse
+from core.charts.rendering import PLOTLY_JS_VERSION, render_figure
+
+
+def _spec(html):
+    start = html.index('<script type="application/json">') + len('<script type="application/json">')
+    return json.loads(html[start:html.index('</script>')])
+
+
+def test_json_mode_emits_only_the_figure_spec():
+    fig = go.Figure(go.Bar(x=['1', '2'], y=[10, 20]))
+    html = render_figure(fig, mode='json')
+
+    assert 'plotly.js v' not in html
+    assert len(html) < 20_000
+    assert _spec(html)['data'][0]['type'] == 'bar'
+
+
+def test_json_mode_escapes_script_breakouts():
+    fig = go.Figure(go.Bar(x=['</script><b>'], y=[1]))
+    html = render_figure(fig, mode='json')
+
+    assert html.count('</script>') == 1
+    assert _spec(html)['data'][0]['x'] == ['</script><b>']
+
+
+def test_plotly_js_served_once_with_long_cache(client):
+    response = client.get(reverse('plotly_js', args=[PLOTLY_JS_VERSION]))
+
+    assert response.status_code == 200
+    assert 'immutable' in response['Cache-Control']
+    assert client.get(reverse('plotly_js', args=['0.0.0'])).status_code == 404
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from core.charts.budget_vs_actual_expenses import generate_budget_vs_actual_chart
+from core.charts.traces import bucket_months, cycle_colors, pivot_dense
+
+
+def _rows():
+    return pd.DataFrame({
+        'month': [2, 1, 1, 2, 3, 1],
+        'category': ['rent', 'rent', 'food', 'food', 'food', 'rent'],
+        'budget_amount': [10.0, 10.0, 5.0, 5.0, 5.0, 1.0],
+        'actual_amount': [12.0, 9.0, 4.0, 6.0, 7.0, 2.0],
+    })
+
+
+def test_pivot_sums_every_cell_in_one_pass():
+    df = _rows()
+    pivot = pivot_dense(df, 'category', 'month', ['budget_amount', 'actual_amount'])
+
+    assert pivot.series.tolist() == ['rent', 'food']
+    assert pivot.x.tolist() == [1, 2, 3]
+    expected = df.pivot_table(index='category', columns='month', values='actual_amount', aggfunc='sum')
+    np.testing.assert_array_equal(pivot.values['actual_amount'], expected.loc[['rent', 'food']].to_numpy())
+    # Rent has no rows in March; the cell stays empty instead of becoming a zero bar
+    assert np.isnan(pivot.values['budget_amount'][0, 2])
+
+
+def test_bars_come_from_the_pivot_rows():
+    pivot = pivot_dense(_rows(), 'category', 'month', ['actual_amount'])
+
+    [rent, food] = pivot.bars('actual_amount', '{series} Actual', group=True,
+                              color=lambda row: np.where(row > 5, 'red', 'green'))
+
+    assert (rent.name, rent.offsetgroup, list(rent.x)) == ('Rent Actual', 'rent', ['1', '2', '3'])
+    assert list(food.y) == [4.0, 6.0, 7.0]
+    assert list(food.marker.color) == ['green', 'red', 'red']
+    assert cycle_colors(['a', 'b'], 3) == ['a', 'b', 'a']
+
+
+def test_chart_keeps_budget_and_actual_of_a_category_together():
+    html = generate_budget_vs_actual_chart(_rows())
+
+    assert html.index('Rent Budget') < html.index('Rent Actual') < html.index('Food Budget')
+
+
+def test_long_spans_fall_back_to_quarters_then_years():
+    df = pd.DataFrame({'year': [2023, 2023, 2024, 2025], 'month': [1, 12, 6, 3]})
+
+    assert bucket_months(df, max_points=36)[0]['period'].tolist() == ['2023-01', '2023-12', '2024-06', '2025-03']
+    quarters, bucket = bucket_months(df, max_points=12)
+    assert bucket == 'quarter'
+    assert quarters['period'].tolist() == ['2023-Q1', '2023-Q4', '2024-Q2', '2025-Q1']
+    assert bucket_months(df, max_points=4)[0]['period'].tolist() == ['2023', '2023', '2024', '2025']
@@ -0,0 +1,136 @@
+import datetime
+import json
+import pytest
+from core.db.scripts.finance_duckdb import refresh_expense_rollup
+from core.services.dashboard_bundle import BUNDLE_QUERY, bundle_params, fetch_dashboard_bundle
+from core.services.date_range import ALL_TIME, DateRange
+from core.services.duckdb_connection import get_connection_manager
+from core.charts.budget_vs_actual_expenses import generate_budget_vs_actual_chart, generate_monthly_variance_chart
+from core.charts.expenses_breakdown_category import generate_sunburst_chart, generate_detailed_breakdown_table
+
+
+def test_bundle_matches_raw_aggregates(duckdb_store):
+    bundle = fetch_dashboard_bundle('lydia', year=2025)
+
+    with get_connection_manager().cursor() as con:
+        expected_income = con.execute("""
+            SELECT SUM(i.income_after_tax + i.additional_income)
+            FROM income i JOIN users u ON i.user_id = u.id
+            WHERE u.username = 'lydia' AND i.year = 2025
+        """).fetchone()[0]
+        expected_spent = con.execute("""
+            SELECT SUM(ue.actual_amount)
+            FROM user_expenses ue JOIN users u ON ue.user_id = u.id
+            WHERE u.username = 'lydia' AND ue.year = 2025
+        """).fetchone()[0]
+
+    assert bundle.total_income() == float(expected_income)
+    assert bundle.total_expenses() == float(expected_spent)
+    assert set(bundle.monthly_category()['month']) == {1, 2, 3, 4, 5}
+
+
+def test_charts_reuse_bundle_without_querying(duckdb_store):
+    bundle = fetch_dashboard_bundle('lydia', year=2025)
+    before = get_connection_manager().stats()
+
+    outputs = [
+        generate_budget_vs_actual_chart(bundle),
+        generate_monthly_variance_chart(bundle),
+        generate_sunburst_chart(bundle),
+        generate_detailed_breakdown_table(bundle),
+    ]
+
+    after = get_connection_manager().stats()
+    assert after['cursors'] + after['reuses'] == before['cursors'] + before['reuses']
+    assert not any(html.startswith('<div><p>Error') for html in outputs)
+    assert 'Lydia' in outputs[3]
+
+
+def test_bundle_for_unknown_user_is_empty(duckdb_store):
+    bundle = fetch_dashboard_bundle('nobody', year=2025)
+    assert not bundle.has_expenses
+    assert bundle.month_summary(1)['income'] == 0
+
+
+def _max_cardinality(node):
+    return max([node.get('operator_cardinality') or 0] + [_max_cardinality(child) for child in node.get('children', [])])
+
+
+@pytest.fixture
+def long_history(duckdb_store):
+    """~1700 days (2021-01 to 2025-09) of history: 12k expense rows, 1.7k income rows and 12k app transactions"""
+    with get_connection_manager().cursor() as con:
+        con.execute("INSERT INTO users (username) VALUES ('longtime')")
+        user_id = con.execute("SELECT id FROM users WHERE username = 'longtime'").fetchone()[0]
+        days = "(SELECT DATE '2021-01-01' + n::INTEGER as day FROM range(1715) r(n)) days"
+        con.execute(f"""
+            INSERT INTO user_expenses (user_id, expenses_id, date, month, year, budget_amount, actual_amount)
+            SELECT ?, e.id, day, month(day), year(day), 10, 9 FROM expenses e, {days}
+        """, [user_id])
+        con.execute(f"""
+            INSERT INTO income (user_id, date, month, year, income_after_tax, additional_income)
+            SELECT ?, day, month(day), year(day), 100, 5 FROM {days}
+        """, [user_id])
+        con.execute("""
+            INSERT INTO transactions
+            SELECT 1000000 + n, ?, 'longtime', CASE WHEN n % 2 = 0 THEN 'expense' ELSE 'income' END, 'rent', 3,
+                   DATE '2021-01-01' + (n % 1715)::INTEGER, month(DATE '2021-01-01' + (n % 1715)::INTEGER),
+                   year(DATE '2021-01-01' + (n % 1715)::INTEGER), now()
+            FROM range(12000) r(n)
+        """, [user_id])
+        refresh_expense_rollup(con, "SELECT user_id, year, month FROM user_expenses WHERE user_id = ?", [user_id])
+
+
+def test_totals_stay_linear_with_long_histories(long_history):
+    with get_connection_manager().cursor() as con:
+        user_id = con.execute("SELECT id FROM users WHERE username = 'longtime'").fetchone()[0]
+        expense_rows = con.execute("SELECT COUNT(*) FROM user_expenses WHERE user_id = ?", [user_id]).fetchone()[0]
+        input_rows = sum(con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                         for table in ('users', 'expenses', 'income', 'expense_rollup', 'transactions'))
+        plan = json.loads(con.execute(
+            f"EXPLAIN (ANALYZE, FORMAT JSON) {BUNDLE_QUERY}", bundle_params('longtime', ALL_TIME),
+        ).fetchone()[1])
+
+    assert expense_rows >= 10_000
+    bundle = fetch_dashboard_bundle('longtime', year=None)
+    assert bundle.total_expenses() == expense_rows * 9 + 6000 * 3
+    assert bundle.total_income() == 1715 * 105 + 6000 * 3
+    breakdown = bundle.category_breakdown()
+    assert breakdown['actual_amount'].sum() == bundle.total_expenses()
+    assert abs(breakdown['pct_of_total_expenses'].sum() - 100) < 1
+    # No operator ever holds more rows than the inputs: an income x expenses join would produce ~20M
+    assert _max_cardinality(plan) <= input_rows
+    assert 'Error' not in generate_sunburst_chart(bundle)
+
+
+def test_range_is_pushed_into_every_scan(long_history):
+    bundle = fetch_dashboard_bundle('longtime', period=DateRange.from_query({'start': '2022-03', 'end': '2023-02-10'}))
+
+    assert bundle.period == DateRange(datetime.date(2022, 3, 1), datetime.date(2023, 2, 28))
+    days = (datetime.date(2023, 3, 1) - datetime.date(2022, 3, 1)).days
+    assert bundle.total_income() == days * 105 + sum(3 for n in range(1, 12000, 2) if _in_range(n))
+    with get_connection_manager().cursor() as con:
+        plan = con.execute(f"EXPLAIN {BUNDLE_QUERY}", bundle_params('longtime', bundle.period)).fetchall()
+    assert plan[0][1].count('year>=2022') >= 4  # filtered while scanning, not after the UNION
+
+
+def _in_range(n):
+    day = datetime.date(2021, 1, 1) + datetime.timedelta(days=n % 1715)
+    return datetime.date(2022, 3, 1) <= day < datetime.date(2023, 3, 1)
+
+
+def test_multi_year_charts_are_downsampled(long_history, settings):
+    settings.CHART_MAX_POINTS = 24
+    bundle = fetch_dashboard_bundle('longtime')
+
+    [budget, *_] = _figure(generate_budget_vs_actual_chart(bundle))['data']
+    assert budget['x'][:2] == ['2021-Q1', '2021-Q2'] and len(budget['x']) == 19
+    settings.CHART_MAX_POINTS = 12
+    assert _figure(generate_monthly_variance_chart(bundle))['data'][0]['x'] == [str(y) for y in range(2021, 2026)]
+    one_year = fetch_dashboard_bundle('longtime', year=2024)
+    assert len(_figure(generate_budget_vs_actual_chart(one_year))['data'][0]['x']) == 12
+
+
+def _figure(html):
+    start = html.index('<script type="application/json">') + len('<script type="application/json">')
+    return json.loads(html[start:html.index('</script>')])
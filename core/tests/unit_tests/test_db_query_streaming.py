@@ -0,0 +1,37 @@
+import pyarrow as pa
+from core.services.db_query import (
+    fetch_monthly_expenses_by_user, fetch_user_data_for_dashboard, fetch_user_summary, iter_user_tables,
+    stream_monthly_expenses, stream_user_summary,
+)
+
+
+def test_batches_are_bounded_and_match_the_dataframe(duckdb_store):
+    batches = list(stream_monthly_expenses(batch_rows=10))
+
+    assert all(isinstance(batch, pa.RecordBatch) and batch.num_rows <= 10 for batch in batches)
+    streamed = pa.Table.from_batches(batches).to_pandas()
+    expected = fetch_monthly_expenses_by_user()
+    assert streamed['user'].tolist() == expected['user'].tolist()
+    assert streamed['actual_amount_spent'].astype(float).tolist() == \
+        expected['actual_amount_spent'].astype(float).tolist()
+
+
+def test_users_are_regrouped_across_batch_boundaries(duckdb_store):
+    expected = fetch_user_summary()
+
+    tables = list(iter_user_tables(stream_user_summary(batch_rows=7)))
+
+    assert [user for user, _ in tables] == sorted(expected['user'].unique())
+    for user, table in tables:
+        assert table.column('user').unique().to_pylist() == [user]
+        assert table.num_rows == (expected['user'] == user).sum()
+
+
+def test_other_queries_can_run_while_a_stream_is_open(duckdb_store):
+    # Consumers typically look things up per user while iterating
+    seen = {}
+    for user, table in iter_user_tables(stream_monthly_expenses(batch_rows=5)):
+        seen[user] = (table.num_rows, len(fetch_user_data_for_dashboard(user)))
+
+    assert seen and all(rows for rows, _ in seen.values())
+    assert sum(rows for rows, _ in seen.values()) == len(fetch_monthly_expenses_by_user())
@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import threading
+from django.conf import settings
+from core.services.duckdb_connection import get_connection_manager, duckdb_cursor
+from core.services.db_query import fetch_all_users, fetch_expense_categories
+
+
+def test_connection_manager_uses_settings_path(duckdb_store):
+    manager = get_connection_manager()
+    assert manager.path == str(duckdb_store)
+
+
+def test_database_opened_once_for_many_queries(duckdb_store):
+    fetch_all_users()
+    fetch_expense_categories()
+    fetch_all_users()
+
+    stats = get_connection_manager().stats()
+    assert stats['opens'] == 1
+    assert stats['cursors'] == 1
+    assert stats['reuses'] == 2
+
+
+def test_each_thread_gets_its_own_cursor(duckdb_store):
+    cursors = []
+
+    def worker():
+        with duckdb_cursor() as con:
+            cursors.append(con)
+            assert con.execute("SELECT COUNT(*) FROM users").fetchone()[0] > 0
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(c) for c in cursors}) == 4
+    assert get_connection_manager().stats()['opens'] == 1
+
+
+def _in_other_process(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60)
+
+
+def test_idle_store_is_handed_to_another_process(duckdb_store, tmp_path):
+    fetch_all_users()
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'mock_expenses_new.csv').write_text(
+        "user,date,expenses_category,budget_amount,actual_amount_spent\nnewcomer,01/06/2025,pets,100,80\n"
+    )
+
+    # The nightly loader, while this process still has the store open
+    loader = _in_other_process(
+        "from core.db.scripts.finance_duckdb import setup_database\n"
+        f"setup_database(db_path={str(duckdb_store)!r}, data_path={str(data)!r})"
+    )
+
+    assert loader.returncode == 0, loader.stderr
+    assert 'newcomer' in fetch_all_users()
+    stats = get_connection_manager().stats()
+    assert (stats['opens'], stats['handoffs']) == (2, 1)
+
+
+def test_store_in_use_is_not_taken_away(duckdb_store):
+    with duckdb_cursor() as con:
+        other = _in_other_process(
+            "from core.db.scripts.finance_duckdb import StoreBusyError, StoreLock\n"
+            f"try:\n    StoreLock({str(duckdb_store)!r}).acquire(timeout=0.5)\n"
+            "except StoreBusyError:\n    print('busy')"
+        )
+        assert con.execute("SELECT COUNT(*) FROM users").fetchone()[0] > 0
+
+    assert other.stdout.strip() == 'busy'
+    assert get_connection_manager().stats()['handoffs'] == 0
@@ -0,0 +1,101 @@
+import datetime
+import os
+import pytest
+from django.contrib.auth.models import User
+from core.db.scripts.finance_duckdb import setup_database, shard_paths
+from core.models import Transaction
+from core.services import db_query
+from core.services.dashboard_bundle import fetch_dashboard_bundle
+from core.services.duckdb_shards import fan_out, shard_cursor, shard_for
+from core.services.parquet_lake import export_lake
+from core.services.synthetic_data import generate_synthetic_data
+from core.services.transaction_replication import get_high_water_mark, replicate_transactions
+
+SHARDS = 3
+
+
+@pytest.fixture
+def sharded_store(tmp_path, settings):
+    db_path = tmp_path / "sharded" / "finance.duckdb"
+    setup_database(db_path=db_path, data_path=settings.BASE_DIR / "core" / "db" / "data", shards=SHARDS)
+    settings.DUCKDB_PATH = db_path
+    settings.DUCKDB_SHARDS = SHARDS
+    return db_path
+
+
+@pytest.fixture
+def single_store_results(duckdb_store):
+    """What the unsharded demo store returns, to compare the shards against"""
+    return {
+        'expenses': db_query.fetch_monthly_expenses_by_user(),
+        'summary': db_query.fetch_user_summary(),
+        'users': db_query.fetch_all_users(),
+        'categories': db_query.fetch_expense_categories(),
+        'lydia_income': db_query.fetch_monthly_income_by_user('lydia'),
+        'lydia_bundle': fetch_dashboard_bundle('lydia', year=None),
+    }
+
+
+def test_each_user_lives_on_exactly_one_shard(sharded_store):
+    assert all(os.path.exists(path) for path in shard_paths(sharded_store, SHARDS))
+
+    per_shard = fan_out(lambda con: [u for u, in con.execute("SELECT username FROM users").fetchall()])
+    assert sum(map(len, per_shard)) == len({u for users in per_shard for u in users}) == 20
+    for shard, users in enumerate(per_shard):
+        assert users and all(shard_for(username) == shard for username in users)
+
+
+def test_routed_and_fanned_out_queries_match_a_single_store(single_store_results, sharded_store):
+    expected = single_store_results
+
+    assert db_query.fetch_monthly_expenses_by_user().equals(expected['expenses'])
+    assert db_query.fetch_user_summary().equals(expected['summary'])
+    assert db_query.fetch_all_users() == expected['users']
+    assert db_query.fetch_expense_categories() == expected['categories']
+    assert db_query.fetch_monthly_income_by_user('lydia').equals(expected['lydia_income'])
+
+    bundle = fetch_dashboard_bundle('lydia', year=None)
+    assert bundle.expenses.equals(expected['lydia_bundle'].expenses)
+    assert bundle.income.equals(expected['lydia_bundle'].income)
+
+
+def test_streams_read_every_shard(sharded_store):
+    streamed = {user: table.num_rows for user, table in db_query.iter_user_tables(db_query.stream_monthly_expenses(5))}
+
+    assert streamed == db_query.fetch_monthly_expenses_by_user().groupby('user').size().to_dict()
+
+
+def test_replication_and_lake_export_follow_the_shards(sharded_store, settings, tmp_path, db):
+    settings.ANALYTICS_LAKE_PATH = tmp_path / 'lake'
+    users = [User.objects.create_user(username=f'shard_user_{i}', password='123') for i in range(6)]
+    for user in users:
+        Transaction.objects.create(user=user, type='expense', category='rent', amount=100, date=datetime.date(2025, 3, 1))
+
+    assert replicate_transactions() == 6
+    for user in users:
+        with shard_cursor(shard_for(user.username)) as con:
+            assert con.execute("SELECT count(*) FROM transactions WHERE username = ?", [user.username]).fetchone() == (1,)
+        assert fetch_dashboard_bundle(user.username, year=2025).total_expenses() == 100.0
+    # Shards without rows of their own still record the mark, so the next run starts after it
+    marks = fan_out(get_high_water_mark)
+    assert len(set(marks)) == 1 and marks[0][1] == Transaction.objects.latest('id').pk
+
+    written = export_lake()
+    assert written['transactions'] == 6
+    assert written['user_expenses'] == 700
+    lake = db_query.fetch_transactions_from_lake(users[0].username)
+    assert lake['amount'].astype(float).tolist() == [100.0]
+
+
+def test_synthetic_data_does_not_depend_on_the_shard_count(db, sharded_store, settings, tmp_path):
+    def synthetic_expenses():
+        generate_synthetic_data(users=6, transactions_per_user=4, months=2, seed=3, replicate=False)
+        df = db_query.fetch_monthly_expenses_by_user()
+        return df[df['user'].str.startswith('synth_')].reset_index(drop=True)
+
+    sharded = synthetic_expenses()
+    assert len({shard_for(user) for user in sharded['user']}) > 1
+
+    settings.DUCKDB_SHARDS = 1
+    settings.DUCKDB_PATH = tmp_path / 'single.duckdb'
+    assert sharded.equals(synthetic_expenses())
@@ -1,9 +1,9 @@
 import pandas as pd
 from io import BytesIO
-from core.models import Transaction
+from core.models import ImportJob, Transaction
 from django.contrib.auth.models import User
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 @pytest.mark.django_db
 def test_upload_excel_creates_transactions(client):
@@ -54,3 +54,242 @@ def test_upload_excel_missing_columns(client):
     )
 
     assert b"Missing columns" in response.content
+
+
+@pytest.mark.django_db
+def test_upload_excel_reports_rejected_rows(client):
+    user = User.objects.create_user(username='test', password='123')
+    client.login(username='test', password='123')
+
+    df = pd.DataFrame([
+        {'type': 'Expense', 'amount': 120.5, 'date': '2025-03-02', 'category': 'Groceries'},
+        {'type': 'gift', 'amount': 10, 'date': '2025-03-03', 'category': 'Misc'},
+        {'type': 'income', 'amount': 'lots', 'date': 'not a date', 'category': 'Salary'},
+    ])
+    excel_buffer = BytesIO()
+    df.to_excel(excel_buffer, index=False)
+    excel_buffer.seek(0)
+
+    response = client.post('/upload/', {'file': excel_buffer}, format='multipart')
+
+    assert response.status_code == 302
+    job = ImportJob.objects.get(user=user)
+    assert response['Location'] == f'/upload/?job={job.pk}'
+    status = client.get(f'/upload/jobs/{job.pk}/').json()
+    assert status['status'] == 'done'
+    assert status['rows_processed'] == 3
+    assert status['rows_failed'] == 2
+    tx = Transaction.objects.get(user=user)
+    assert tx.type == 'expense'
+    assert str(tx.date) == '2025-03-02'
+
+    report = client.get(status['report_url'])
+    lines = report.content.decode().splitlines()
+    assert report['Content-Disposition'].startswith('attachment')
+    assert lines[1].startswith('3,') and 'unknown type' in lines[1]
+    assert 'amount is not a number; invalid date' in lines[2]
+
+
+@pytest.mark.django_db
+def test_import_transactions_uses_batched_inserts(django_assert_max_num_queries):
+    from core.services.transaction_import import import_transactions
+
+    user = User.objects.create_user(username='bulk', password='123')
+    df = pd.DataFrame({
+        'type': ['expense'] * 500,
+        'amount': range(500),
+        'date': ['2025-01-15'] * 500,
+        'category': ['rent'] * 500,
+    })
+
+    # SQLite caps variables per statement, so a few INSERTs instead of 500
+    with django_assert_max_num_queries(15):
+        result = import_transactions(user, df, batch_size=250)
+
+    assert result.created == 500
+    assert result.rejected_count == 0
+    assert Transaction.objects.filter(user=user).count() == 500
+
+
+@pytest.mark.django_db
+def test_upload_csv_streams_in_batches(client):
+    from core.services.transaction_import import import_upload, iter_upload_frames
+
+    user = User.objects.create_user(username='csv', password='123')
+    csv = "type,amount,date,category\n" + "".join(
+        f"expense,{i},2025-02-{(i % 28) + 1:02d},food\n" for i in range(2500)
+    ) + "income,oops,2025-02-01,salary\n"
+
+    frames = list(iter_upload_frames(BytesIO(csv.encode()), chunk_size=1000))
+    assert [len(f) for f in frames] == [1000, 1000, 501]
+
+    result = import_upload(user, BytesIO(csv.encode()), batch_size=1000)
+    assert result.created == 2500
+    assert result.rejected_count == 1
+    assert result.rejected_csv.splitlines()[1].startswith('2502,')
+
+
+@pytest.mark.django_db
+def test_upload_xlsx_read_only_in_batches():
+    from core.services.transaction_import import iter_upload_frames
+
+    df = pd.DataFrame({
+        'type': ['income'] * 25,
+        'amount': range(25),
+        'date': ['2025-01-01'] * 25,
+        'category': ['salary'] * 25,
+    })
+    excel_buffer = BytesIO()
+    df.to_excel(excel_buffer, index=False)
+    excel_buffer.seek(0)
+
+    frames = list(iter_upload_frames(excel_buffer, chunk_size=10))
+
+    assert [len(f) for f in frames] == [10, 10, 5]
+    assert list(frames[0].columns) == ['type', 'amount', 'date', 'category']
+
+
+@pytest.mark.django_db
+def test_upload_xlsx_keeps_reading_past_blank_rows():
+    from core.services.transaction_import import import_upload
+
+    user = User.objects.create_user(username='gaps', password='123')
+    good = {'type': 'expense', 'amount': 10, 'date': '2025-01-01', 'category': 'food'}
+    blank = dict.fromkeys(good)
+    rows = [good] * 3 + [blank] * 12 + [good] * 4 + [dict(good, amount='oops')]
+    excel_buffer = BytesIO()
+    pd.DataFrame(rows).to_excel(excel_buffer, index=False)
+    excel_buffer.seek(0)
+
+    result = import_upload(user, excel_buffer, batch_size=5)
+
+    assert result.created == 7
+    # Sheet row 21: header, 3 rows, 12 blanks, 4 rows, then the bad one
+    assert result.rejected_csv.splitlines()[1].startswith('21,')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_upload_returns_before_import_runs_in_worker_pool(client, settings):
+    import time
+
+    settings.IMPORT_JOBS_EAGER = False
+    user = User.objects.create_user(username='async', password='123')
+    client.login(username='async', password='123')
+    csv = BytesIO(b"type,amount,date,category\nincome,100,2025-01-01,salary\nexpense,40,2025-01-02,food\n")
+    csv.name = 'statement.csv'
+
+    response = client.post('/upload/', {'file': csv}, format='multipart')
+    assert response.status_code == 302
+
+    job = ImportJob.objects.get(user=user)
+    deadline = time.monotonic() + 10
+    status = client.get(f'/upload/jobs/{job.pk}/').json()
+    while status['status'] in ('pending', 'running') and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = client.get(f'/upload/jobs/{job.pk}/').json()
+
+    assert status['status'] == 'done'
+    assert status['rows_processed'] == 2
+    assert status['filename'] == 'statement.csv'
+    assert Transaction.objects.filter(user=user).count() == 2
+
+
+@pytest.mark.django_db
+def test_reimporting_overlapping_upload_skips_seen_rows(django_assert_max_num_queries):
+    from core.services.transaction_import import import_transactions
+
+    user = User.objects.create_user(username='again', password='123')
+    january = pd.DataFrame({
+        'type': ['expense', 'expense', 'income'],
+        'amount': [4.5, 4.5, 3000],
+        'date': ['2025-01-03', '2025-01-03', '2025-01-31'],
+        'category': ['coffee', 'coffee', 'salary'],
+    })
+    first = import_transactions(user, january)
+    assert first.created == 3  # two identical coffees in one file are both real
+
+    overlapping = pd.concat([january, pd.DataFrame({
+        'type': ['expense'], 'amount': [900], 'date': ['2025-02-01'], 'category': ['Rent'],
+    })])
+    with django_assert_max_num_queries(12):
+        second = import_transactions(user, overlapping)
+
+    assert second.skipped == 3
+    assert second.created == 1
+    assert Transaction.objects.filter(user=user).count() == 4
+
+    other = User.objects.create_user(username='other', password='123')
+    assert import_transactions(other, january).created == 3
+
+
+@pytest.mark.django_db
+def test_import_job_keeps_progress_on_its_row(client, monkeypatch):
+    from functools import partial
+    from core.services import import_jobs, transaction_import
+
+    user = User.objects.create_user(username='progress', password='123')
+    client.login(username='progress', password='123')
+    monkeypatch.setattr(import_jobs, 'import_upload', partial(transaction_import.import_upload, batch_size=2))
+    rows = "".join(f"expense,{amount},2025-01-0{amount},food\n" for amount in range(1, 6))
+    csv = BytesIO(("type,amount,date,category\n" + rows).encode())
+    csv.name = 'statement.csv'
+    seen = []
+    apply_rollup_deltas = transaction_import.apply_rollup_deltas
+
+    def fail_third_batch(deltas):
+        # What a poll from another process would read while the import runs
+        seen.append(ImportJob.objects.values_list('rows_processed', flat=True).get(user=user))
+        if len(seen) == 3:
+            raise RuntimeError('worker lost its database')
+        apply_rollup_deltas(deltas)
+
+    monkeypatch.setattr(transaction_import, 'apply_rollup_deltas', fail_third_batch)
+
+    client.post('/upload/', {'file': csv}, format='multipart')
+
+    assert seen == [0, 2, 4]
+    status = client.get(f'/upload/jobs/{ImportJob.objects.get(user=user).pk}/').json()
+    assert status['status'] == 'failed'
+    assert status['rows_processed'] == 4
+    assert Transaction.objects.filter(user=user).count() == 4
+
+
+@pytest.mark.django_db
+def test_running_job_without_progress_is_marked_failed(client):
+    from django.utils import timezone
+
+    user = User.objects.create_user(username='orphan', password='123')
+    client.login(username='orphan', password='123')
+    now = timezone.now()
+    orphan = ImportJob.objects.create(user=user, filename='lost.csv', status='running',
+                                      started_at=now - timedelta(hours=1), heartbeat_at=now - timedelta(hours=1))
+    busy = ImportJob.objects.create(user=user, filename='busy.csv', status='running',
+                                    started_at=now - timedelta(hours=1), heartbeat_at=now)
+
+    status = client.get(f'/upload/jobs/{orphan.pk}/').json()
+
+    assert status['status'] == 'failed'
+    assert 'worker has exited' in status['error']
+    assert client.get(f'/upload/jobs/{busy.pk}/').json()['status'] == 'running'
+
+
+@pytest.mark.django_db
+def test_pending_job_that_never_started_is_marked_failed(client, tmp_path):
+    from core.services.import_jobs import run_import_job
+
+    user = User.objects.create_user(username='queued', password='123')
+    client.login(username='queued', password='123')
+    lost = ImportJob.objects.create(user=user, filename='lost.csv')
+    ImportJob.objects.filter(pk=lost.pk).update(created_at=lost.created_at - timedelta(hours=1))
+    queued = ImportJob.objects.create(user=user, filename='queued.csv')
+
+    assert client.get(f'/upload/jobs/{lost.pk}/').json()['status'] == 'failed'
+    assert client.get(f'/upload/jobs/{queued.pk}/').json()['status'] == 'pending'
+    assert ImportJob.objects.get(pk=lost.pk).finished_at is not None
+
+    # Should its worker turn up after all, the job stays failed and imports nothing
+    spool = tmp_path / 'lost.csv'
+    spool.write_text("type,amount,date,category\nincome,100,2025-01-01,salary\n")
+    assert run_import_job(lost.pk, str(spool)).status == 'failed'
+    assert not spool.exists()
+    assert not Transaction.objects.filter(user=user).exists()
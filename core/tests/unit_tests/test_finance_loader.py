@@ -0,0 +1,131 @@
+import shutil
+import duckdb
+import pytest
+from django.conf import settings
+from core.db.scripts.finance_duckdb import load_inputs
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / 'data'
+    shutil.copytree(settings.BASE_DIR / 'core' / 'db' / 'data', data)
+    return data
+
+
+@pytest.fixture
+def con(tmp_path, data_dir):
+    con = duckdb.connect(str(tmp_path / 'finance.duckdb'))
+    load_inputs(con, data_dir)
+    yield con
+    con.close()
+
+
+def counts(con):
+    tables = ['users', 'expenses', 'income', 'user_expenses', 'goal_progress']
+    return {table: con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def lydia_january_rent(con):
+    return con.execute("""
+        SELECT ue.actual_amount FROM user_expenses ue
+        JOIN users u ON u.id = ue.user_id JOIN expenses e ON e.id = ue.expenses_id
+        WHERE u.username = 'lydia' AND e.category = 'rent' AND ue.date = '2025-01-01'
+    """).fetchone()[0]
+
+
+def rollup_mismatches(con):
+    """expense_rollup rows that differ from aggregating user_expenses directly, either way round"""
+    return con.execute("""
+        WITH raw AS (
+            SELECT user_id, year, month, expenses_id, SUM(budget_amount) as budget_amount,
+                   SUM(actual_amount) as actual_amount, COUNT(*) as row_count
+            FROM user_expenses GROUP BY ALL
+        ),
+        cube AS (SELECT user_id, year, month, expenses_id, budget_amount, actual_amount, row_count FROM expense_rollup)
+        SELECT count(*) FROM ((SELECT * FROM raw EXCEPT ALL SELECT * FROM cube) UNION ALL
+                              (SELECT * FROM cube EXCEPT ALL SELECT * FROM raw))
+    """).fetchone()[0]
+
+
+def test_reload_skips_files_already_loaded(con, data_dir):
+    before = counts(con)
+
+    assert load_inputs(con, data_dir) == {}
+    assert counts(con) == before
+    assert before['user_expenses'] == 700
+    assert con.execute("SELECT COUNT(*) FROM load_log").fetchone()[0] == 3
+
+
+def test_new_files_are_upserted_on_natural_keys(con, data_dir):
+    before = counts(con)
+    (data_dir / 'mock_expenses_2025_06.csv').write_text(
+        "user,date,expenses_category,budget_amount,actual_amount_spent\n"
+        "lydia,01/01/2025,rent,2128,2000\n"  # restates a loaded row
+        "lydia,01/06/2025,rent,2128,1950\n"
+        "newcomer,01/06/2025,pets,100,80\n"
+    )
+
+    loaded = load_inputs(con, data_dir)
+
+    assert list(loaded.values()) == [3]
+    assert lydia_january_rent(con) == 2000
+    after = counts(con)
+    assert after['user_expenses'] == before['user_expenses'] + 2
+    assert after['users'] == before['users'] + 1
+    assert after['expenses'] == before['expenses'] + 1
+    assert rollup_mismatches(con) == 0
+
+
+def test_rollup_is_refreshed_only_for_touched_months(con, data_dir):
+    assert rollup_mismatches(con) == 0
+    assert con.execute("SELECT COUNT(*) FROM expense_rollup").fetchone()[0] == 700
+    # Marks every rollup row; a refresh replaces only the rows it touches
+    con.execute("UPDATE expense_rollup SET row_count = row_count + 100")
+    (data_dir / 'mock_expenses_2025_06.csv').write_text(
+        "user,date,expenses_category,budget_amount,actual_amount_spent\nlydia,01/01/2025,rent,2128,2000\n"
+    )
+
+    load_inputs(con, data_dir)
+
+    untouched = con.execute("SELECT COUNT(*) FROM expense_rollup WHERE row_count > 100").fetchone()[0]
+    assert untouched == 700 - 7  # lydia's January categories were recomputed
+    con.execute("UPDATE expense_rollup SET row_count = row_count - 100 WHERE row_count > 100")
+    assert rollup_mismatches(con) == 0
+
+
+def test_rollup_is_backfilled_for_older_stores(con, data_dir):
+    con.execute("DELETE FROM expense_rollup")
+
+    load_inputs(con, data_dir)
+
+    assert rollup_mismatches(con) == 0
+
+
+def test_failed_file_is_rolled_back_and_retried(con, data_dir):
+    before = counts(con)
+    bad = data_dir / 'mock_expenses_broken.csv'
+    bad.write_text(
+        "user,date,expenses_category,budget_amount,actual_amount_spent\n"
+        "lydia,01/06/2025,rent,2128,1950\n"
+        "lydia,not a date,rent,2128,1950\n"
+    )
+
+    with pytest.raises(duckdb.Error):
+        load_inputs(con, data_dir)
+
+    assert counts(con) == before
+    bad.write_text("user,date,expenses_category,budget_amount,actual_amount_spent\nlydia,01/06/2025,rent,2128,1950\n")
+    assert list(load_inputs(con, data_dir).values()) == [1]
+
+
+def test_repeated_keys_in_a_file_keep_the_last_row(con, data_dir):
+    # Enough repeats to span several of DuckDB's read chunks
+    restated = "".join(f"lydia,01/01/2025,rent,2128,{amount}\n" for amount in range(1, 5001))
+    (data_dir / 'mock_expenses_2025_06.csv').write_text(
+        "user,date,expenses_category,budget_amount,actual_amount_spent\n" + restated
+    )
+
+    load_inputs(con, data_dir)
+
+    assert lydia_january_rent(con) == 5000
+    assert rollup_mismatches(con) == 0
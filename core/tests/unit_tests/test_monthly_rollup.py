@@ -0,0 +1,54 @@
+import pytest
+import pandas as pd
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from core.models import MonthlyRollup, Transaction
+from core.services.transaction_import import import_transactions
+
+
+def rollup(user):
+    return {
+        (r.year, r.month, r.type, r.category): (r.total, r.count)
+        for r in MonthlyRollup.objects.filter(user=user)
+    }
+
+
+@pytest.mark.django_db
+def test_rollup_follows_create_update_and_delete():
+    user = User.objects.create_user(username='roll', password='123')
+    rent = Transaction.objects.create(user=user, type='expense', category='rent', amount=800, date=date(2025, 1, 1))
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=200.5, date=date(2025, 1, 20))
+
+    assert rollup(user) == {(2025, 1, 'expense', 'rent'): (Decimal('1000.50'), 2)}
+
+    rent.date = date(2025, 2, 1)
+    rent.amount = Decimal('850')
+    rent.save()
+    assert rollup(user) == {
+        (2025, 1, 'expense', 'rent'): (Decimal('200.50'), 1),
+        (2025, 2, 'expense', 'rent'): (Decimal('850.00'), 1),
+    }
+
+    rent.delete()
+    assert rollup(user) == {(2025, 1, 'expense', 'rent'): (Decimal('200.50'), 1)}
+
+
+@pytest.mark.django_db
+def test_bulk_import_updates_rollup_and_rebuild_agrees():
+    user = User.objects.create_user(username='bulkroll', password='123')
+    df = pd.DataFrame({
+        'type': ['income', 'expense', 'expense'],
+        'amount': [3000, 45.25, 54.75],
+        'date': ['2025-03-31', '2025-03-02', '2025-03-09'],
+        'category': ['salary', 'food', 'food'],
+    })
+    import_transactions(user, df)
+    incremental = rollup(user)
+
+    assert incremental[(2025, 3, 'expense', 'food')] == (Decimal('100.00'), 2)
+
+    MonthlyRollup.objects.all().delete()
+    call_command('rebuild_monthly_rollup', stdout=open('/dev/null', 'w'))
+    assert rollup(user) == incremental
@@ -0,0 +1,123 @@
+import datetime
+import glob
+import os
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from core.models import Transaction
+from core.services.db_query import (
+    fetch_monthly_expenses_by_user, fetch_monthly_expenses_from_lake, fetch_transactions_from_lake,
+)
+from core.services.duckdb_connection import duckdb_cursor
+from core.services import parquet_lake
+from core.services.parquet_lake import export_lake, lake_filters, lake_relation, user_bucket
+from core.services.transaction_replication import replicate_transactions
+
+
+@pytest.fixture
+def lake(duckdb_store, tmp_path, settings):
+    settings.ANALYTICS_LAKE_PATH = tmp_path / 'lake'
+    call_command('export_parquet_lake')
+    return tmp_path / 'lake'
+
+
+def partition_files(lake, dataset, bucket='*', year='*', month='*'):
+    return glob.glob(os.path.join(lake, dataset, f'user_bucket={bucket}', f'year={year}', f'month={month}', '*.parquet'))
+
+
+def test_lake_matches_the_duckdb_tables(lake):
+    expected = fetch_monthly_expenses_by_user('lydia')
+    from_lake = fetch_monthly_expenses_from_lake('lydia')
+
+    assert from_lake[['year', 'month', 'expenses_category']].values.tolist() == \
+        expected[['year', 'month', 'expenses_category']].values.tolist()
+    assert from_lake['actual_amount_spent'].astype(float).tolist() == \
+        expected['actual_amount_spent'].astype(float).tolist()
+    assert partition_files(lake, 'user_expenses', bucket=user_bucket('lydia'), year=2025, month=1)
+
+
+def test_range_queries_only_open_matching_partitions(lake):
+    where, params = lake_filters('lydia', start=datetime.date(2025, 2, 1), end=datetime.date(2025, 3, 31))
+    with duckdb_cursor() as con:
+        plan = con.execute(
+            f"EXPLAIN SELECT SUM(actual_amount) FROM {lake_relation('user_expenses')} {where}", params,
+        ).fetchall()[0][1]
+
+    matching = len(partition_files(lake, 'user_expenses', bucket=user_bucket('lydia'), year=2025, month='[23]'))
+    assert matching == 2
+    assert f"Scanning Files: {matching}/{len(partition_files(lake, 'user_expenses'))}" in plan
+
+    df = fetch_monthly_expenses_from_lake('lydia', start=datetime.date(2025, 2, 1), end=datetime.date(2025, 3, 31))
+    assert set(df['month']) == {2, 3}
+    assert set(df['user']) == {'lydia'}
+
+
+def test_incremental_export_leaves_older_months_alone(lake, db):
+    user = User.objects.create_user(username='laker', password='123')
+    Transaction.objects.create(user=user, type='expense', category='food', amount=12, date=datetime.date(2025, 1, 10))
+    replicate_transactions()
+    call_command('export_parquet_lake', '--dataset', 'transactions')
+    january = partition_files(lake, 'transactions', year=2025, month=1)
+    stamps = {path: os.stat(path).st_mtime_ns for path in january}
+
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=800, date=datetime.date(2025, 6, 1))
+    replicate_transactions()
+    call_command('export_parquet_lake', '--since', '2025-06')
+
+    assert {path: os.stat(path).st_mtime_ns for path in january} == stamps
+    df = fetch_transactions_from_lake('laker')
+    assert df['category'].tolist() == ['food', 'rent']
+    assert fetch_transactions_from_lake('laker', start=datetime.date(2025, 6, 1))['amount'].tolist() == [800]
+
+
+def test_full_export_replaces_the_dataset_only_when_done(lake, monkeypatch):
+    before = sorted(partition_files(lake, 'user_expenses'))
+    export_shard = parquet_lake._export_shard
+    seen_during_export = []
+
+    def watched(con, query, target, *args):
+        seen_during_export.append(sorted(partition_files(lake, 'user_expenses')))
+        return export_shard(con, query, target, *args)
+
+    monkeypatch.setattr(parquet_lake, '_export_shard', watched)
+    assert export_lake(datasets=['user_expenses'])['user_expenses'] > 0
+    assert seen_during_export == [before]
+    assert sorted(partition_files(lake, 'user_expenses')) == before
+    assert sorted(os.listdir(lake)) == ['transactions', 'user_expenses']
+
+    def broken(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(parquet_lake, '_export_shard', broken)
+    with pytest.raises(OSError):
+        export_lake(datasets=['user_expenses'])
+    assert sorted(partition_files(lake, 'user_expenses')) == before
+    assert sorted(os.listdir(lake)) == ['transactions', 'user_expenses']
+
+
+def test_incremental_export_swaps_months_in_only_when_done(lake, db, monkeypatch):
+    user = User.objects.create_user(username='swapper', password='123')
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=800, date=datetime.date(2025, 6, 1))
+    replicate_transactions()
+    call_command('export_parquet_lake', '--since', '2025-06')
+    before = sorted(partition_files(lake, 'transactions'))
+    export_shard = parquet_lake._export_shard
+    seen_during_export = []
+
+    def watched(*args):
+        seen_during_export.append(fetch_transactions_from_lake('swapper')['amount'].tolist())
+        return export_shard(*args)
+
+    monkeypatch.setattr(parquet_lake, '_export_shard', watched)
+    export_lake(since=(2025, 6), datasets=['transactions'])
+    assert seen_during_export == [[800]]
+    assert fetch_transactions_from_lake('swapper')['amount'].tolist() == [800]
+
+    def broken(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(parquet_lake, '_export_shard', broken)
+    with pytest.raises(OSError):
+        export_lake(since=(2025, 6), datasets=['transactions'])
+    assert sorted(partition_files(lake, 'transactions')) == before
+    assert sorted(os.listdir(lake)) == ['transactions', 'user_expenses']
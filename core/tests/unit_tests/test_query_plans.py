@@ -0,0 +1,46 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.db.models import Count, Sum
+from core.models import Budget, Goal, Transaction
+
+# These read SQLite's EXPLAIN QUERY PLAN. A "SCAN core_transaction" line, or a
+# temp b-tree for the ordering, means a hot query is back to a full scan or sort.
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='plans', password='123')
+
+
+def plan(queryset):
+    return queryset.explain()
+
+
+def test_latest_transactions_walk_the_user_date_index(user):
+    result = plan(Transaction.objects.filter(user=user).order_by('-date')[:10])
+
+    assert 'SEARCH core_transaction USING INDEX tx_user_date_type_amt_idx' in result
+    assert 'TEMP B-TREE FOR ORDER BY' not in result
+
+
+def test_windowed_type_totals_are_covered_by_the_index(user):
+    queryset = (
+        Transaction.objects.filter(user=user, date__gte=date(2025, 1, 2), date__lte=date(2025, 2, 27))
+        .values('type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    result = plan(queryset)
+
+    assert 'SEARCH core_transaction USING COVERING INDEX tx_user_date_type_amt_idx' in result
+    assert 'SCAN core_transaction' not in result
+
+
+def test_budget_and_goal_lookups_use_their_indexes(user):
+    budgets = plan(Budget.objects.filter(user=user, month=date(2025, 1, 1)))
+    goals = plan(Goal.objects.filter(user=user).order_by('due_date'))
+
+    assert 'USING INDEX budget_user_month_cat_idx' in budgets
+    assert 'USING INDEX goal_user_due_date_idx' in goals
+    assert 'TEMP B-TREE FOR ORDER BY' not in goals
@@ -0,0 +1,45 @@
+import datetime
+import duckdb
+import pytest
+from core.services.db_query import fetch_monthly_expenses_by_user, fetch_monthly_income_by_user
+from core.services.duckdb_connection import duckdb_cursor
+from core.services.query_registry import QueryRegistry, registry, sql_literal
+
+
+def test_each_query_is_prepared_once_per_cursor(duckdb_store):
+    registry.reset_stats()
+
+    for username in ['lydia', 'amed', 'lydia']:
+        fetch_monthly_expenses_by_user(username)
+
+    stats = registry.stats()['monthly_expenses_for_user']
+    assert stats['calls'] == 3
+    assert stats['prepares'] == 1
+    assert stats['total_ms'] > 0
+
+
+def test_usernames_are_bound_not_interpolated(duckdb_store):
+    assert fetch_monthly_income_by_user("' OR 1=1 --").empty
+    assert not fetch_monthly_income_by_user('lydia').empty
+
+
+def test_literals_round_trip():
+    con = duckdb.connect()
+    values = [None, True, 42, 1.5, "o'brien; DROP TABLE users", datetime.date(2025, 1, 31),
+              datetime.datetime(2025, 1, 31, 12, 30)]
+    assert con.execute(f"SELECT {', '.join(map(sql_literal, values))}").fetchone() == tuple(values)
+    with pytest.raises(TypeError):
+        sql_literal(object())
+
+
+def test_registry_rejects_conflicting_names(duckdb_store):
+    queries = QueryRegistry()
+    queries.register('one', "SELECT $1 + 1")
+    with pytest.raises(ValueError):
+        queries.register('one', "SELECT 2")
+    with pytest.raises(ValueError):
+        queries.register('DROP TABLE users', "SELECT 1")
+
+    with duckdb_cursor() as con:
+        assert queries.execute(con, 'one', 41).fetchone() == (42,)
+        assert queries.resolve("EXECUTE one(41)") == ('one', "SELECT $1 + 1")
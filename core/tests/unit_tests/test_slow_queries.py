@@ -0,0 +1,80 @@
+import json
+from django.core.management import call_command
+from core.services.db_query import fetch_monthly_expenses_by_user
+from core.services.duckdb_connection import duckdb_cursor
+from core.services.slow_queries import fingerprint, read_slow_queries, summarize_slow_queries
+
+
+def logged(path):
+    return list(read_slow_queries(path))
+
+
+def test_fingerprint_strips_literals():
+    a = fingerprint("SELECT * FROM users u -- who\nWHERE u.username = 'lydia' AND year = 2025 AND id IN (1, 2, 3)")
+    b = fingerprint("SELECT *  FROM users u WHERE u.username = 'o''brien' AND year = 2024 AND id IN (7, 8)")
+
+    assert a == b == "SELECT * FROM users u WHERE u.username = ? AND year = ? AND id IN (...)"
+
+
+def test_slow_reads_are_logged_with_their_profile(duckdb_store, slow_query_log, settings):
+    settings.DUCKDB_SLOW_QUERY_MS = 0
+
+    lydia = fetch_monthly_expenses_by_user('lydia')
+    fetch_monthly_expenses_by_user('vincent')
+
+    # The caller's result is unaffected by the profiling run
+    assert not lydia.empty and set(lydia['user']) == {'lydia'}
+    # Registered queries run as EXECUTE; the profile is the one DuckDB kept of that run
+    records = [r for r in logged(slow_query_log) if r['sql'].startswith('EXECUTE')]
+    assert len(records) == 2
+    assert records[0]['fingerprint'] == 'EXECUTE monthly_expenses_for_user(?)'
+    assert records[0]['fingerprint_id'] == records[1]['fingerprint_id']
+    assert records[0]['caller'] == 'core.services.db_query:fetch_monthly_expenses_by_user'
+    assert 'Total Time' in records[0]['profile'] and 'EXECUTE monthly_expenses_for_user' in records[0]['profile']
+
+
+def test_statements_are_profiled_without_being_rerun(duckdb_store, slow_query_log, settings):
+    settings.DUCKDB_SLOW_QUERY_MS = 0
+
+    with duckdb_cursor() as con:
+        con.execute("CREATE TABLE probe (n INTEGER)")
+        con.execute("INSERT INTO probe VALUES (?)", [1])
+        con.execute("CREATE SEQUENCE ticket")
+        assert con.execute("SELECT nextval('ticket')").fetchone() == (1,)
+        assert con.execute("SELECT nextval('ticket')").fetchone() == (2,)
+        assert con.execute("SELECT count(*) FROM probe").fetchone() == (1,)
+
+    records = logged(slow_query_log)
+    insert = next(r for r in records if r['sql'].startswith('INSERT'))
+    assert insert['params'] == [1]
+    assert 'Total Time' in insert['profile']
+    assert sum(r['sql'] == "SELECT nextval('ticket')" for r in records) == 2
+
+
+def test_fast_queries_and_disabled_log_write_nothing(duckdb_store, slow_query_log, settings):
+    settings.DUCKDB_SLOW_QUERY_MS = 60_000
+    fetch_monthly_expenses_by_user('lydia')
+    settings.DUCKDB_SLOW_QUERY_MS = None
+    with duckdb_cursor() as con:
+        assert not hasattr(con, '_slow_log')
+
+    assert not slow_query_log.exists()
+
+
+def test_report_ranks_fingerprints_by_total_time(tmp_path, capsys):
+    log = tmp_path / 'slow.jsonl'
+    rows = [('a', 'SELECT 1', 100), ('b', 'SELECT 2', 300), ('a', 'SELECT 1', 250)]
+    # The older entries sit in a rotated file
+    (tmp_path / 'slow.jsonl.1').write_text(json.dumps(
+        {'fingerprint_id': rows[0][0], 'fingerprint': rows[0][1], 'ms': rows[0][2], 'profile': 'plan a'}) + '\n')
+    log.write_text(''.join(json.dumps(
+        {'fingerprint_id': fid, 'fingerprint': sql, 'ms': ms, 'profile': f'plan {fid}'}) + '\n'
+        for fid, sql, ms in rows[1:]))
+
+    [first, second] = summarize_slow_queries(read_slow_queries(log))
+    assert (first['fingerprint_id'], first['count'], first['total_ms'], first['max_ms']) == ('a', 2, 350, 250)
+    assert second['fingerprint_id'] == 'b'
+
+    call_command('slow_query_report', log=str(log), top=1, profiles=True)
+    out = capsys.readouterr().out
+    assert '#1 a: 350.0 ms total, 2 runs' in out and 'plan a' in out and '#2' not in out
@@ -0,0 +1,92 @@
+import datetime
+import json
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from core.models import MonthlyRollup, Transaction
+from core.services.chart_cache import get_data_version
+from core.services.dashboard_bundle import fetch_dashboard_bundle
+from core.services.duckdb_connection import duckdb_cursor
+from core.services.monthly_rollup import rebuild_monthly_rollup
+from core.services.synthetic_data import generate_synthetic_data, transaction_frame
+from core.services.transaction_replication import replicate_transactions
+
+
+def test_same_seed_gives_same_transactions():
+    first = transaction_frame(np.random.default_rng(7), [1, 2, 3], 500, months=6)
+    second = transaction_frame(np.random.default_rng(7), [1, 2, 3], 500, months=6)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert set(first['type']) <= {'income', 'expense', 'saving', 'investment', 'debt', 'loan'}
+    assert first['date'].max() < pd.Timestamp('2020-07-01').date()
+
+
+def test_generator_fills_both_stores_and_replaces_itself(db, duckdb_store):
+    generate_synthetic_data(users=3, transactions_per_user=20, months=2, seed=1)
+    summary = generate_synthetic_data(users=4, transactions_per_user=10, months=2, seed=1)
+
+    assert summary.transactions == 40
+    assert Transaction.objects.filter(user__username__startswith='synth_').count() == 40
+    assert User.objects.filter(username__startswith='synth_').count() == 4
+    generated = set(MonthlyRollup.objects.values_list('user_id', 'year', 'month', 'type', 'category', 'total', 'count'))
+    rebuild_monthly_rollup()
+    assert set(MonthlyRollup.objects.values_list('user_id', 'year', 'month', 'type', 'category', 'total', 'count')) == generated
+    with duckdb_cursor() as con:
+        assert con.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 40
+        assert con.execute("SELECT COUNT(*) FROM users WHERE username = 'lydia'").fetchone()[0] == 1
+    assert summary.duckdb_expense_rows == 4 * 2 * 7
+    assert fetch_dashboard_bundle('synth_00003', year=2020).has_expenses
+
+
+def test_benchmark_command_writes_comparable_results(db, duckdb_store, tmp_path, settings):
+    settings.ANALYTICS_LAKE_PATH = tmp_path / 'lake'
+    output = tmp_path / 'bench.json'
+
+    call_command(
+        'run_benchmarks', '--sizes', '2', '--transactions-per-user', '5', '--months', '2',
+        '--repeat', '1', '--upload-rows', '10', '--output', str(output),
+    )
+
+    report = json.loads(output.read_text())
+    names = {(r['group'], r['name']) for r in report['results']}
+    assert ('db_query', 'fetch_monthly_expenses_by_user') in names
+    assert ('charts', 'generate_sunburst_chart') in names
+    assert ('views', 'dashboard_view_with_charts') in names
+    assert ('upload', 'upload_excel_view[10]') in names
+    assert all(r['size'] == 2 and r['runs'] == 1 and r['min_ms'] >= 0 for r in report['results'])
+    assert report['meta']['seed'] == 0
+    # Uploads are rolled back after timing
+    assert Transaction.objects.count() == 10
+
+
+def test_synthetic_set_is_not_rechecked_by_later_passes(db, duckdb_store, django_assert_num_queries):
+    generate_synthetic_data(users=3, transactions_per_user=10, months=2, seed=1)
+    synth = User.objects.get(username='synth_00000')
+    version = get_data_version(synth)
+
+    # The mark sits past the set's OVERLAP: one empty look back, one empty look forward
+    with django_assert_num_queries(2):
+        assert replicate_transactions() == 0
+    assert get_data_version(synth) == version
+
+    tx = Transaction.objects.create(user=synth, type='expense', category='rent', amount=5, date=datetime.date(2020, 1, 2))
+    assert replicate_transactions() == 1
+    with duckdb_cursor() as con:
+        assert con.execute("SELECT COUNT(*) FROM transactions WHERE id = ?", [tx.pk]).fetchone() == (1,)
+
+
+def test_rollup_is_summed_in_the_database_once_for_all_chunks(db, monkeypatch):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from core.services import synthetic_data
+
+    monkeypatch.setattr(synthetic_data, 'CHUNK_SIZE', 7)
+    with CaptureQueriesContext(connection) as queries:
+        synthetic_data.generate_orm_data(np.random.default_rng(3), users=3, transactions_per_user=10, months=3)
+
+    assert len([q for q in queries if MonthlyRollup._meta.db_table in q['sql']]) == 1
+    generated = set(MonthlyRollup.objects.values_list('user_id', 'year', 'month', 'type', 'category', 'total', 'count'))
+    assert sum(count for *_, count in generated) == 30
+    rebuild_monthly_rollup()
+    assert set(MonthlyRollup.objects.values_list('user_id', 'year', 'month', 'type', 'category', 'total', 'count')) == generated
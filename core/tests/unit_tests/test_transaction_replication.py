@@ -0,0 +1,97 @@
+import datetime
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from core.models import Transaction
+from core.services.chart_cache import get_data_version
+from core.services.dashboard_bundle import fetch_dashboard_bundle
+from core.services.duckdb_connection import duckdb_cursor
+from core.services.transaction_replication import get_high_water_mark, replicate_transactions
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='mirror', password='123')
+
+
+def mirrored(user):
+    with duckdb_cursor() as con:
+        return dict(con.execute(
+            "SELECT id, amount FROM transactions WHERE user_id = ? ORDER BY id", [user.pk],
+        ).fetchall())
+
+
+def test_replication_copies_in_batches_and_resumes_from_mark(user, duckdb_store):
+    rows = [
+        Transaction.objects.create(user=user, type='expense', category='food', amount=10 + i, date=datetime.date(2025, 1, 5))
+        for i in range(3)
+    ]
+
+    assert replicate_transactions(batch_size=2) == 3
+    assert mirrored(user) == {tx.pk: Decimal(10 + i) for i, tx in enumerate(rows)}
+    with duckdb_cursor() as con:
+        assert get_high_water_mark(con)[1] == rows[-1].pk
+
+    rows[0].amount = 99
+    rows[0].save()
+    assert replicate_transactions() == 1
+    assert mirrored(user)[rows[0].pk] == Decimal(99)
+    assert len(mirrored(user)) == 3
+    assert replicate_transactions() == 0
+
+
+def test_overlap_recheck_only_copies_late_commits(user, duckdb_store):
+    first = Transaction.objects.create(user=user, type='expense', category='food', amount=10, date=datetime.date(2025, 1, 5))
+    assert replicate_transactions() == 1
+    version = get_data_version(user)
+
+    # Unchanged rows inside the safety window are neither copied nor re-versioned
+    assert replicate_transactions() == 0
+    assert get_data_version(user) == version
+
+    # A row that commits after the pass, stamped just before the mark
+    late = Transaction.objects.create(user=user, type='expense', category='rent', amount=20, date=datetime.date(2025, 1, 6))
+    Transaction.objects.filter(pk=late.pk).update(updated_at=first.updated_at - datetime.timedelta(seconds=1))
+    assert replicate_transactions() == 1
+    assert mirrored(user) == {first.pk: Decimal(10), late.pk: Decimal(20)}
+    assert get_data_version(user) != version
+    assert replicate_transactions() == 0
+
+
+def test_replicated_transactions_reach_the_dashboard_bundle(user, duckdb_store):
+    Transaction.objects.create(user=user, type='income', category='salary', amount=3000, date=datetime.date(2025, 2, 1))
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=1200, date=datetime.date(2025, 2, 3))
+    assert fetch_dashboard_bundle('mirror', year=2025).total_income() == 0
+
+    version = get_data_version(user)
+    replicate_transactions()
+
+    bundle = fetch_dashboard_bundle('mirror', year=2025)
+    assert bundle.month_summary(2) == {'income': 3000.0, 'expense': 1200.0, 'saving': 1800.0, 'investment': 0}
+    assert bundle.category_totals()['category'].tolist() == ['rent']
+    # Charts cached before the rows arrived must not be served any more
+    assert get_data_version(user) != version
+
+
+def test_commits_are_replicated_when_enabled(user, duckdb_store, settings, django_capture_on_commit_callbacks):
+    settings.DUCKDB_REPLICATE_ON_COMMIT = True
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tx = Transaction.objects.create(user=user, type='expense', category='food', amount=25)
+    assert mirrored(user) == {tx.pk: Decimal(25)}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tx.delete()
+    assert mirrored(user) == {}
+
+
+def test_catch_up_command_prunes_missed_deletes(user, duckdb_store):
+    kept = Transaction.objects.create(user=user, type='expense', category='food', amount=5)
+    gone = Transaction.objects.create(user=user, type='expense', category='food', amount=7)
+    replicate_transactions()
+    gone.delete()
+
+    call_command('replicate_transactions', '--prune')
+
+    assert mirrored(user) == {kept.pk: Decimal(5)}
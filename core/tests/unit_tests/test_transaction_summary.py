@@ -0,0 +1,40 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from core.models import Transaction
+from core.services.transaction_summary import summarize_by_type
+from core.views.dashboard import summarize_transactions
+
+
+@pytest.fixture
+def user_with_history(db):
+    user = User.objects.create_user(username='summary', password='123')
+    Transaction.objects.create(user=user, type='income', category='salary', amount=3000, date=date(2025, 1, 31))
+    Transaction.objects.create(user=user, type='expense', category='rent', amount=900, date=date(2025, 1, 1))
+    Transaction.objects.create(user=user, type='expense', category='food', amount=60, date=date(2025, 2, 14))
+    Transaction.objects.create(user=user, type='loan', category='student_loan', amount=250, date=date(2025, 3, 5))
+    return user
+
+
+def test_summarize_transactions_matches_old_loop(user_with_history):
+    summary = summarize_transactions(user_with_history)
+
+    assert summary == {
+        'income': Decimal('3000'), 'expense': Decimal('960'), 'saving': 0,
+        'investment': 0, 'debt': 0, 'loan': Decimal('250'),
+    }
+
+
+def test_month_window_and_day_window_agree(user_with_history, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        by_month = summarize_by_type(user_with_history, start=date(2025, 1, 1), end=date(2025, 2, 28))
+    with django_assert_num_queries(1):
+        by_day = summarize_by_type(user_with_history, start=date(2025, 1, 1), end=date(2025, 2, 27))
+
+    assert by_month['expense'] == {'total': Decimal('960'), 'count': 2}
+    assert by_month == by_day
+    assert by_month['loan']['count'] == 0
+
+    mid_month = summarize_by_type(user_with_history, start=date(2025, 1, 2))
+    assert mid_month['expense'] == {'total': Decimal('60'), 'count': 1}
@@ -3,7 +3,8 @@ from django.urls import path
 from core.views.auth import home_view, signup_view
 from core.views.transaction import add_transaction_view
 from core.views.dashboard import dashboard_view
-from core.views.upload import upload_excel_view
+from core.views.upload import upload_excel_view, import_job_status_view, upload_report_view
+from core.views.charts import chart_data_view, plotly_js_view
 
 urlpatterns = [
     path('', home_view, name='home'),  # Homepage view
@@ -11,4 +12,8 @@ urlpatterns = [
     path('dashboard/', dashboard_view, name='dashboard'), #Dashboard view
     path('add/', add_transaction_view, name='add_transaction'),  # Transaction view
     path('upload/', upload_excel_view, name='upload_excel'), #Upload the excel file view
+    path('upload/jobs/<int:job_id>/', import_job_status_view, name='import_job_status'), #Progress of a background import, polled by the upload page
+    path('upload/jobs/<int:job_id>/report/', upload_report_view, name='upload_report'), #Download the rows an import rejected
+    path('dashboard/charts/<slug:name>/', chart_data_view, name='dashboard_chart'), #One chart as JSON, loaded lazily by the dashboard
+    path('assets/plotly-<str:version>.min.js', plotly_js_view, name='plotly_js'), #Shared, long-cached plotly.js
 ]
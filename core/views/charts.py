@@ -0,0 +1,60 @@
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.cache import cache_control
+from core.charts.rendering import PLOTLY_JS_PATH, PLOTLY_JS_VERSION
+from core.charts.income_expenses import generate_monthly_income_vs_expense
+from core.charts.expenses_breakdown_category import generate_detailed_breakdown_table, generate_sunburst_chart
+from core.charts.budget_vs_actual_expenses import generate_budget_vs_actual_chart, generate_monthly_variance_chart
+from core.services.dashboard_bundle import fetch_dashboard_bundle
+from core.services.date_range import DateRange
+from core.services.chart_cache import ERROR_FRAGMENT_PREFIX, cached_chart, get_data_version
+from core.services.request_timing import timed
+
+# Chart name -> generator(user, period, get_bundle); each one is served by chart_data_view
+DASHBOARD_CHARTS = {
+    'income-vs-expense': lambda user, period, get_bundle: generate_monthly_income_vs_expense(user, period),
+    'budget-vs-actual': lambda user, period, get_bundle: generate_budget_vs_actual_chart(get_bundle()),
+    'variance': lambda user, period, get_bundle: generate_monthly_variance_chart(get_bundle()),
+    'sunburst': lambda user, period, get_bundle: generate_sunburst_chart(get_bundle()),
+    'breakdown': lambda user, period, get_bundle: generate_detailed_breakdown_table(get_bundle()),
+}
+
+
+def get_dashboard_bundle(user, period, version):
+    """The user's DuckDB bundle, shared through the fragment cache by the shell and every chart request"""
+    return cached_chart('bundle', user, str(period), lambda: fetch_dashboard_bundle(user.username, period=period), version=version)
+
+
+@login_required
+def chart_data_view(request, name):
+    if name not in DASHBOARD_CHARTS:
+        raise Http404("Unknown chart")
+
+    try:
+        period = DateRange.from_query(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    user = request.user
+    version = get_data_version(user)
+
+    def render():
+        # Chart code's own time (pandas reshaping, building the figure) is 'charts';
+        # the DuckDB queries and Plotly serialization inside it are timed separately
+        with timed('charts'):
+            try:
+                return DASHBOARD_CHARTS[name](user, period, lambda: get_dashboard_bundle(user, period, version))
+            except Exception as e:
+                # The bundle is fetched before the generator's own try, so its errors land here
+                return f"{ERROR_FRAGMENT_PREFIX} loading the {name} chart: {str(e)}</p></div>"
+
+    html = cached_chart(name, user, str(period), render, version=version)
+    return JsonResponse({'chart': name, 'html': html})
+
+
+@cache_control(public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+def plotly_js_view(request, version):
+    # The version is part of the URL, so browsers can keep the file forever
+    if version != PLOTLY_JS_VERSION:
+        raise Http404("Unknown plotly.js version")
+    return FileResponse(open(PLOTLY_JS_PATH, 'rb'), content_type='text/javascript')
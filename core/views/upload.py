@@ -1,9 +1,11 @@
-import pandas as pd
-from django.shortcuts import render, redirect
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
 from core.forms import UploadFileForm
-from core.models import Transaction
-from datetime import datetime
+from core.models import ImportJob
+from core.services.import_jobs import fail_if_stale, submit_import_job
+from core.services.transaction_import import REQUIRED_COLUMNS, read_upload_columns
 
 @login_required
 def upload_excel_view(request):
@@ -11,27 +13,47 @@ def upload_excel_view(request):
     if request.method == 'POST':
         form = UploadFileForm(request.POST, request.FILES)
         if form.is_valid():
-            excel_file = request.FILES['file']
+            upload = request.FILES['file']
             try:
-                df = pd.read_excel(excel_file)
-
-                required_columns = {'type', 'amount', 'date', 'category'}
-                if not required_columns.issubset(df.columns):
-                    message = f"Missing columns. Required: {required_columns}"
+                # Only the header is checked here; the rows are imported by a background job
+                if not REQUIRED_COLUMNS.issubset(read_upload_columns(upload)):
+                    message = f"Missing columns. Required: {REQUIRED_COLUMNS}"
                 else:
-                    for _, row in df.iterrows():
-                        Transaction.objects.create(
-                            user=request.user,
-                            type=row['type'].lower(),
-                            amount=row['amount'],
-                            date=pd.to_datetime(row['date']),
-                            category=row['category'],
-                            note=row.get('note', '')
-                        )
-                    return redirect('dashboard')
+                    job = submit_import_job(request.user, upload)
+                    return redirect(f"{reverse('upload_excel')}?job={job.pk}")
             except Exception as e:
                 message = f"Upload failed: {str(e)}"
     else:
         form = UploadFileForm()
 
-    return render(request, 'upload.html', {'form': form, 'message': message})
+    job = None
+    if request.GET.get('job', '').isdigit():
+        job = ImportJob.objects.filter(user=request.user, pk=request.GET['job']).first()
+        if job:
+            job = fail_if_stale(job)
+
+    return render(request, 'upload.html', {'form': form, 'message': message, 'job': job})
+
+
+@login_required
+def import_job_status_view(request, job_id):
+    job = fail_if_stale(get_object_or_404(ImportJob, pk=job_id, user=request.user))
+    return JsonResponse({
+        'id': job.pk,
+        'filename': job.filename,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'rows_failed': job.rows_failed,
+        'rows_skipped': job.rows_skipped,
+        'error': job.error,
+        'duration_seconds': job.duration_seconds,
+        'report_url': reverse('upload_report', args=[job.pk]) if job.rows_failed else None,
+    })
+
+
+@login_required
+def upload_report_view(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id, user=request.user)
+    response = HttpResponse(job.rejected_report, content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="rejected_rows.csv"'
+    return response